@@ -1,3 +1,92 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Max, Q
+from django.db.models.functions import Lower
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+from django.utils.functional import cached_property
 
-# Register your models here.
+from accounts.models import CustomUser
+
+# the highest code point, `prefix <= value < prefix + MAX_CHAR` is a prefix match an index can answer
+MAX_CHAR = '\U0010ffff'
+
+
+def estimate_count(model, using='default'):
+    """
+    number of rows of the table of `model` from the database statistics, without COUNT(*)
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        elif connection.vendor == 'mysql':
+            cursor.execute('SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s', [table])
+            row = cursor.fetchone()
+            if row and row[0] is not None:
+                return row[0]
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 is filled by ANALYZE (or PRAGMA optimize), the first number of an index row is its
+            # row count. a partial index (the unique email) only counts the rows it covers, so it is left out
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute(f'PRAGMA index_list({connection.ops.quote_name(table)})')
+                partial = {name for _, name, _, _, is_partial in cursor.fetchall() if is_partial}
+                cursor.execute('SELECT idx, stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+                counts = [int(stat.split()[0]) for index, stat in cursor.fetchall() if index not in partial]
+                if counts:
+                    return max(counts)
+    # no statistics: the highest primary key, read from the primary key index
+    return model._default_manager.using(using).aggregate(last=Max('pk'))['last'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    the unfiltered changelist of a large table is counted from the database statistics,
+    filtered ones and small tables keep the exact COUNT(*)
+    """
+
+    exact_count_below = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model, queryset.db)
+            if estimate >= self.exact_count_below:
+                return estimate
+        return super().count
+
+
+def prefix_match(expression, prefix):
+    return Q(GreaterThanOrEqual(expression, prefix)) & Q(LessThan(expression, prefix + MAX_CHAR))
+
+
+@admin.register(CustomUser)
+class CustomUserAdmin(UserAdmin):
+    """
+    the users changelist stays fast with millions of rows: no COUNT(*) of the whole table,
+    and the search is a prefix match on the username and lower(email) indexes
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # the list only shows columns of the user row, nothing to join
+    list_select_related = False
+    autocomplete_fields = ('groups',)
+    filter_horizontal = ('user_permissions',)
+    search_fields = ('username', 'email')
+    search_help_text = 'Beginning of the username or of the email address.'
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        `username LIKE '%term%'` reads the whole table, a prefix range is answered by the indexes
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(prefix_match(F('username'), term) | prefix_match(Lower('email'), term.lower())), False
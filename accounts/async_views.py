@@ -0,0 +1,146 @@
+from asgiref.sync import sync_to_async
+from django.shortcuts import redirect
+from django.contrib.auth import alogin, alogout
+from django.contrib import messages
+from django.contrib.auth.tokens import default_token_generator
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from .forms import NewUserForm, CustomPasswordResetForm, AsyncAuthenticationForm, AsyncSetPasswordForm
+from .availability import availability
+from .export import aiter_export
+from .models import email_iexact
+from .outbox import aenqueue_mail
+from .views import export_users_response
+from home.async_views import arender, alogin_required, astaff_member_required
+from registration import metrics
+from registration.query_budget import query_budget
+
+User = get_user_model()
+
+
+# async versions of the views in views.py, they are routed by registration/asgi_urls.py
+# and served when the project runs under an ASGI server (uvicorn, daphne)
+
+@query_budget(10)
+async def login_view(request):
+    """
+    async version of `views.login_view`, the credentials are checked once with `aauthenticate`
+    """
+    if request.method == 'POST':
+        login_form = AsyncAuthenticationForm(request=request, data=request.POST)
+        if await login_form.ais_valid():
+            await alogin(request, login_form.get_user())
+            metrics.inc('auth_logins_total', result='success')
+            messages.success(request, 'logged in successfully')
+            return redirect('home')
+        metrics.inc('auth_logins_total', result='failure')
+        messages.error(request, 'Password and/or username are wrong. Please enter the correct information')
+    else:
+        login_form = AsyncAuthenticationForm
+    return await arender(request, 'accounts/login.html', {'login_form': login_form})
+
+
+@query_budget(10)
+async def register_view(request):
+    """
+    async version of `views.register_view`
+    """
+    if request.method == 'POST':
+        register_form = NewUserForm(request.POST)
+        # form validation checks the database (unique email/username), it has no async api
+        if await sync_to_async(register_form.is_valid)():
+            user = await register_form.asave()
+            metrics.inc('auth_registrations_total')
+            availability.add(user.username, user.email)
+            await alogin(request, user)
+            messages.success(request, 'Registration is successful')
+            return redirect('home')
+        for field, errors in register_form.errors.items():
+            for error in errors:
+                messages.error(request, f"{field.capitalize()}: {error}")
+    else:
+        register_form = NewUserForm()
+    return await arender(request, 'accounts/register.html', {'register_form': register_form})
+
+
+@query_budget(4)
+@alogin_required
+async def logout_view(request):
+    """
+    async version of `views.logout_view`
+    """
+    # alogout runs the sync logout, which reads request.user: without this it loads the user a second time
+    request.user = await request.auser()
+    await alogout(request)
+    return redirect('index')
+
+
+@astaff_member_required
+async def export_users_view(request):
+    """
+    async version of `views.export_users_view`, the file is served from an async iterator
+    """
+    return export_users_response(request, aiter_export)
+
+
+@query_budget(2)
+async def password_reset_request(request):
+    """
+    async version of `views.password_reset_request`
+    """
+    if request.method == 'POST':
+        form = CustomPasswordResetForm(request.POST)
+        if form.is_valid():
+            email = form.cleaned_data['email']
+            try:
+                user = await User.objects.aget(email_iexact(email))
+            except User.DoesNotExist:
+                # do not tell the visitor whether the email has an account
+                return redirect('password_reset_done')
+            token = default_token_generator.make_token(user)
+
+            reset_url = request.build_absolute_uri(reverse('password_reset_confirm', kwargs={'uidb64': user.pk, 'token': token}))
+            await aenqueue_mail(
+                'Password Reset Request',
+                f'Click the link below to reset your password:\n\n{reset_url}',
+                'contact@infinite.com',
+                [email],
+            )
+            return redirect('password_reset_done')
+    else:
+        form = CustomPasswordResetForm()
+    return await arender(request, 'password-reset/password_reset_request.html', {'form': form})
+
+
+@query_budget(2)
+async def password_reset_confirm(request, uidb64, token):
+    """
+    async version of `views.password_reset_confirm`
+    """
+    try:
+        user = await User.objects.aget(pk=uidb64)
+    except (TypeError, ValueError, OverflowError, User.DoesNotExist):
+        user = None
+
+    if user is not None and default_token_generator.check_token(user, token):
+        if request.method == 'POST':
+            form = AsyncSetPasswordForm(user, request.POST)
+            if form.is_valid():
+                await form.asave()
+                return redirect('login')
+            for errors in form.errors.values():
+                for error in errors:
+                    messages.error(request, error)
+        return await arender(request, 'password-reset/password_reset_confirm.html', {'uidb64': uidb64, 'token': token})
+    else:
+        messages.error(request, 'Invalid reset link.')
+        return redirect('password_reset_request')
+
+
+@query_budget(0)
+async def password_reset_done(request):
+    """
+    async version of `views.password_reset_done`
+    """
+    return await arender(request, 'password-reset/password_reset_done.html')
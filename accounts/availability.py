@@ -0,0 +1,169 @@
+"""
+Username / email availability for the live check of the register form.
+
+A Bloom filter of the taken usernames and emails answers "definitely free"
+without touching the database, only a possible hit (taken, or a false
+positive) is confirmed with a query. The filter is rebuilt from the database
+every `AVAILABILITY_FILTER_TTL` seconds, in a background thread, and the
+register views add the new users to it in between.
+
+Users created by another process show up after the next rebuild, so the
+answer is a hint for the form, the form itself always checks the database.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+
+from .models import email_iexact, email_in
+
+User = get_user_model()
+
+
+class BloomFilter:
+    """
+    a fixed size set that can answer "maybe in the set" (with `error_rate` false positives
+    once `capacity` items are added) or "definitely not in the set"
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def _username_key(username):
+    return f'username:{username}'
+
+
+def _email_key(email):
+    return f'email:{email.lower()}'
+
+
+def taken_in_database(username=None, email=None):
+    """
+    return (username_taken, email_taken), with a single query
+    """
+    lookup = Q()
+    if username:
+        lookup |= Q(username=username)
+    if email:
+        lookup |= Q(email_iexact(email))
+    if not lookup:
+        return False, False
+
+    username_taken = email_taken = False
+    for taken_username, taken_email in User.objects.filter(lookup).values_list('username', 'email'):
+        username_taken |= bool(username) and taken_username == username
+        email_taken |= bool(email) and taken_email.lower() == email.lower()
+    return username_taken, email_taken
+
+
+def taken_in_database_many(usernames, emails):
+    """
+    `taken_in_database` for a batch: return the set of taken usernames and the set of taken
+    (lower cased) emails among the given ones, with a single query
+    """
+    usernames, emails = set(usernames), {email.lower() for email in emails}
+    lookup = Q()
+    if usernames:
+        lookup |= Q(username__in=usernames)
+    if emails:
+        lookup |= Q(email_in(emails))
+    if not lookup:
+        return set(), set()
+
+    taken_usernames, taken_emails = set(), set()
+    for taken_username, taken_email in User.objects.filter(lookup).values_list('username', 'email'):
+        taken_usernames.add(taken_username)
+        taken_emails.add(taken_email.lower())
+    return taken_usernames & usernames, taken_emails & emails
+
+
+class AvailabilityFilter:
+
+    def __init__(self):
+        self._filter = None
+        self._built_at = 0.0
+        self._rebuilding = threading.Lock()
+
+    def rebuild(self):
+        """
+        build a new filter from the database and swap it in
+        """
+        # room for the users registered until the next rebuild
+        bloom = BloomFilter(capacity=2 * User.objects.count() + 1000, error_rate=getattr(settings, 'AVAILABILITY_FILTER_ERROR_RATE', 0.01))
+        for username, email in User.objects.values_list('username', 'email').iterator(chunk_size=5000):
+            bloom.add(_username_key(username))
+            if email:
+                bloom.add(_email_key(email))
+        self._filter, self._built_at = bloom, time.monotonic()
+
+    def _background_rebuild(self):
+        try:
+            self.rebuild()
+        finally:
+            connection.close()
+            self._rebuilding.release()
+
+    def current(self):
+        """
+        the filter to answer with, or None when there is none yet.
+        a missing or stale filter is rebuilt (in a thread unless AVAILABILITY_FILTER_BACKGROUND_REBUILD is off)
+        """
+        stale = time.monotonic() - self._built_at > getattr(settings, 'AVAILABILITY_FILTER_TTL', 300)
+        if (self._filter is None or stale) and self._rebuilding.acquire(blocking=False):
+            if getattr(settings, 'AVAILABILITY_FILTER_BACKGROUND_REBUILD', True):
+                threading.Thread(target=self._background_rebuild, daemon=True).start()
+            else:
+                try:
+                    self.rebuild()
+                finally:
+                    self._rebuilding.release()
+        return self._filter
+
+    def add(self, username, email):
+        """
+        add a newly registered user, so it is reported as taken before the next rebuild
+        """
+        bloom = self._filter
+        if bloom is not None:
+            bloom.add(_username_key(username))
+            if email:
+                bloom.add(_email_key(email))
+
+    def check(self, username=None, email=None):
+        """
+        return (username_available, email_available), without query when the filter says both are free
+        """
+        bloom = self.current()
+        maybe_username = bool(username) and (bloom is None or _username_key(username) in bloom)
+        maybe_email = bool(email) and (bloom is None or _email_key(email) in bloom)
+        if not (maybe_username or maybe_email):
+            return True, True
+        username_taken, email_taken = taken_in_database(
+            username if maybe_username else None,
+            email if maybe_email else None,
+        )
+        return not username_taken, not email_taken
+
+
+availability = AvailabilityFilter()
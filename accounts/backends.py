@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from . import hashing
+from .user_cache import user_cache
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    the default model backend, but the password is verified in the hashing pool (see hashing.py)
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # hash the password anyway, so a missing user takes as long as a wrong password
+            hashing.make_password(password)
+        else:
+            if hashing.check_user_password(user, password) and self.user_can_authenticate(user):
+                return user
+
+
+class CachedModelBackend(PooledModelBackend):
+    """
+    the pooled backend, plus the users loaded for each request are kept in `user_cache`
+    so a logged in user cost no query per page view (see user_cache.py)
+    """
+
+    def get_user(self, user_id):
+        user_id = UserModel._meta.pk.to_python(user_id)
+        user = user_cache.get(user_id)
+        if user is None:
+            # read before the load: an invalidation while loading leaves an outdated entry, not a stale user
+            version = user_cache.version(user_id)
+            user = super().get_user(user_id)
+            if user is not None:
+                user_cache.set(user_id, user, version)
+        return user
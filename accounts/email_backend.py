@@ -0,0 +1,126 @@
+import atexit
+import smtplib
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+
+from registration.profiling import span
+
+
+class SMTPConnectionPool:
+    """
+    keeps authenticated (and TLS established) SMTP connections alive between requests and threads.
+    connections are grouped by server and credentials, and each one is used by one backend at a time
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = {}
+        self.stats = {'handshakes': 0, 'reused': 0, 'discarded': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def checkout(self, key):
+        """
+        return a healthy idle connection for the key, or None if a new one must be opened
+        """
+        max_idle = getattr(settings, 'EMAIL_POOL_MAX_IDLE', 60)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    return None
+                connection, released_at = idle.pop()
+            if time.monotonic() - released_at <= max_idle and self._is_healthy(connection):
+                self._count('reused')
+                return connection
+            self._discard(connection)
+
+    def checkin(self, key, connection):
+        """
+        give the connection back to the pool, it is closed when the pool is full or the connection is broken
+        """
+        try:
+            # reset any half finished transaction left by a failed send
+            connection.rset()
+        except (smtplib.SMTPException, OSError):
+            self._discard(connection)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < getattr(settings, 'EMAIL_POOL_SIZE', 4):
+                idle.append((connection, time.monotonic()))
+                return
+        self._discard(connection, count=False)
+
+    def clear(self):
+        """
+        close every idle connection
+        """
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection, _ in idle]
+            self._idle.clear()
+        for connection in connections:
+            self._discard(connection, count=False)
+
+    def _is_healthy(self, connection):
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _discard(self, connection, count=True):
+        if count:
+            self._count('discarded')
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+
+pool = SMTPConnectionPool()
+atexit.register(pool.clear)
+
+
+def pool_stats():
+    """
+    counters of the shared pool, `reused` is the number of SMTP handshakes saved
+    """
+    return dict(pool.stats)
+
+
+class PooledEmailBackend(EmailBackend):
+    """
+    the django SMTP backend, but `close()` gives the connection back to a process wide pool
+    and `open()` takes one from it, so the TCP/TLS handshake and the login are not paid per email
+    """
+
+    @property
+    def pool_key(self):
+        return (self.host, self.port, self.username, self.use_tls, self.use_ssl)
+
+    def open(self):
+        if self.connection:
+            return False
+        self.connection = pool.checkout(self.pool_key)
+        if self.connection:
+            return True
+        opened = super().open()
+        if opened:
+            pool._count('handshakes')
+        return opened
+
+    def close(self):
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        pool.checkin(self.pool_key, connection)
+
+    def send_messages(self, email_messages):
+        with span('mail'):
+            return super().send_messages(email_messages)
@@ -0,0 +1,99 @@
+"""
+Streaming export of the users, for the `export_users` command and view.
+
+The users are read page after page with keyset pagination (`pk > last pk`,
+never OFFSET) as tuples, and written out as CSV or JSONL lines, optionally
+gzip compressed, so the memory used does not depend on the number of users.
+`aiter_export` serves the same blocks to the ASGI server, which would read a
+sync iterator whole before sending it.
+"""
+import csv
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'date_joined', 'last_login')
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def iter_users(chunk_size=2000):
+    """
+    yield every user as a tuple of `FIELDS`, ordered by primary key, one query per `chunk_size` users
+    """
+    last_pk = 0
+    while True:
+        page = User.objects.filter(pk__gt=last_pk).order_by('pk').values_list(*FIELDS)[:chunk_size]
+        count = 0
+        for row in page.iterator(chunk_size=chunk_size):
+            count += 1
+            yield row
+        if count < chunk_size:
+            return
+        last_pk = row[0]
+
+
+class _Line:
+    """
+    file like object for csv.writer, `write` returns the line instead of storing it
+    """
+    def write(self, value):
+        return value
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def iter_lines(rows, file_format):
+    if file_format == 'csv':
+        writer = csv.writer(_Line())
+        yield writer.writerow(FIELDS)
+        for row in rows:
+            yield writer.writerow(map(_value, row))
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(FIELDS, map(_value, row)))) + '\n'
+
+
+def iter_export(file_format='csv', compress=False, chunk_size=2000, buffer_size=64 * 1024):
+    """
+    yield the export as bytes, in blocks of about `buffer_size` bytes
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer, size = [], 0
+    for line in iter_lines(iter_users(chunk_size), file_format):
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            block = b''.join(buffer)
+            buffer, size = [], 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    block = b''.join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+async def aiter_export(*args, **kwargs):
+    """
+    `iter_export` as an async iterator, each block is read in a thread, one at a time
+    """
+    blocks = iter_export(*args, **kwargs)
+    next_block = sync_to_async(next)
+    try:
+        while (block := await next_block(blocks, None)) is not None:
+            yield block
+    finally:
+        # a client gone before the end: the query cursor is closed from the thread that opened it
+        await sync_to_async(blocks.close)()
@@ -1,10 +1,16 @@
-from django.contrib.auth.forms import UserCreationForm
-from django.contrib.auth.models import User
+from django.contrib.auth import aauthenticate
+from django.contrib.auth.forms import BaseUserCreationForm, UserCreationForm, AuthenticationForm
+from django.contrib.auth import get_user_model
 from django import forms
 from django.core.exceptions import ValidationError
 from django.core.validators import EmailValidator
 from django.contrib.auth.forms import PasswordResetForm, SetPasswordForm
 
+from . import hashing
+from .availability import taken_in_database
+
+User = get_user_model()
+
 class NewUserForm(UserCreationForm):
     email = forms.EmailField(widget=forms.EmailInput(attrs={'class': 'form-control'}), validators=[EmailValidator(message='Invalid email format.')],required=True)
     first_name = forms.CharField(max_length=10, widget=forms.TextInput(attrs={'class': 'form-control'}))
@@ -49,24 +55,112 @@ class NewUserForm(UserCreationForm):
         return username
     
     def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
-            raise ValidationError('Email address is already in use.')
+        # emails are stored in lower case, Foo@x.com and foo@x.com are the same address
+        email = self.cleaned_data.get('email').lower()
         if '@' not in email:
             raise ValidationError('Invalid email format. Email must contain "@" symbol.')
         if not (email.endswith('.com') or email.endswith('.net')):
             raise ValidationError('Invalid email domain. Email must end with ".com" or ".net".')
         return email
 
+    def clean(self):
+        cleaned_data = super(NewUserForm, self).clean()
+        self.check_unique()
+        return cleaned_data
+
+    def check_unique(self):
+        """
+        check the username and the email are not used, with a single query
+        """
+        username_taken, email_taken = taken_in_database(self.cleaned_data.get('username'), self.cleaned_data.get('email'))
+        if username_taken:
+            self.add_error('username', self.instance.unique_error_message(User, ['username']))
+        if email_taken:
+            self.add_error('email', 'Email address is already in use.')
+
+    def validate_unique(self):
+        # already done by check_unique(), in one query instead of one per unique field
+        pass
+
+    def _get_validation_exclusions(self):
+        # same for the email unique constraint of the model
+        exclude = super(NewUserForm, self)._get_validation_exclusions()
+        exclude.add('email')
+        return exclude
+
     def save(self, commit=True):
-        user = super(NewUserForm, self).save(commit=False)
+        # skip UserCreationForm.save, it hashes the password on the request thread
+        user = super(BaseUserCreationForm, self).save(commit=False)
+        user.password = hashing.make_password(self.cleaned_data['password1'])
         if commit:
             user.save()
         return user
-    
+
+    async def asave(self):
+        """
+        async version of `save`, the event loop is free while the password is hashed
+        """
+        user = super(BaseUserCreationForm, self).save(commit=False)
+        user.password = await hashing.amake_password(self.cleaned_data['password1'])
+        await user.asave()
+        return user
+
+
+
+class ImportUserForm(NewUserForm):
+    """
+    `NewUserForm` for the rows of `import_users`, the uniqueness is checked by the command for
+    a whole batch at once, and the password can be left out when the row brings a hashed one
+    """
+    def __init__(self, *args, password_optional=False, **kwargs):
+        super(ImportUserForm, self).__init__(*args, **kwargs)
+        if password_optional:
+            self.fields['password1'].required = False
+            self.fields['password2'].required = False
+
+    def check_unique(self):
+        pass
+
 
 class CustomPasswordResetForm(PasswordResetForm):
     def __init__(self, *args, **kwargs):
         super(CustomPasswordResetForm, self).__init__(*args, **kwargs)
         self.fields["email"].widget.attrs.update({"class": "form-control"})
 
+
+class AsyncAuthenticationForm(AuthenticationForm):
+    """
+    login form for the async views, `clean` only validates the fields
+    and the credentials are checked by `ais_valid` with `aauthenticate`
+    """
+    def clean(self):
+        return self.cleaned_data
+
+    async def ais_valid(self):
+        if not self.is_valid():
+            return False
+        username = self.cleaned_data.get('username')
+        password = self.cleaned_data.get('password')
+        self.user_cache = await aauthenticate(self.request, username=username, password=password)
+        if self.user_cache is None:
+            self.add_error(None, self.get_invalid_login_error())
+            return False
+        try:
+            self.confirm_login_allowed(self.user_cache)
+        except ValidationError as e:
+            self.add_error(None, e)
+            return False
+        return True
+
+
+class AsyncSetPasswordForm(SetPasswordForm):
+    """
+    new password form of the async reset view, `asave` hashes the password in the hashing pool
+    """
+    async def asave(self):
+        """
+        async version of `save`, the event loop is free while the password is hashed
+        """
+        self.user.password = await hashing.amake_password(self.cleaned_data['new_password1'])
+        await self.user.asave(update_fields=['password'])
+        return self.user
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+# costs used when PASSWORD_HASHER_COST does not set them, run `python manage.py calibrate_hasher` to size them
+DEFAULT_COST = {
+    'argon2': {'time_cost': 2, 'memory_cost': 65536, 'parallelism': 2},
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+}
+
+
+def hasher_cost(algorithm, name):
+    return getattr(settings, 'PASSWORD_HASHER_COST', {}).get(algorithm, {}).get(name, DEFAULT_COST[algorithm][name])
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    argon2 with the costs of PASSWORD_HASHER_COST['argon2'].
+    a hash made with other costs is rehashed at the next successful login (`must_update`)
+    """
+
+    @property
+    def time_cost(self):
+        return hasher_cost('argon2', 'time_cost')
+
+    @property
+    def memory_cost(self):
+        return hasher_cost('argon2', 'memory_cost')
+
+    @property
+    def parallelism(self):
+        return hasher_cost('argon2', 'parallelism')
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt with the costs of PASSWORD_HASHER_COST['scrypt'], it needs no extra package
+    """
+
+    @property
+    def work_factor(self):
+        return hasher_cost('scrypt', 'work_factor')
+
+    @property
+    def block_size(self):
+        return hasher_cost('scrypt', 'block_size')
+
+    @property
+    def parallelism(self):
+        return hasher_cost('scrypt', 'parallelism')
+
+    # scrypt needs 128 * r * N bytes, openssl refuses more than 32 MiB by default
+    maxmem = 2 ** 30
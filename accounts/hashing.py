@@ -0,0 +1,226 @@
+"""
+Password hashing executor.
+
+Verifying and creating password hashes is the most CPU heavy work of the
+application. Instead of running it on the request thread (and holding the
+GIL of the worker), the hashes are computed by a pool of processes:
+
+- `PASSWORD_HASHING_WORKERS` processes (0 runs the hashes inline, on the calling thread, or
+  on a thread of the default executor for the async views, never on the event loop).
+- at most `PASSWORD_HASHING_QUEUE_SIZE` hashes wait for a free process, when the queue is
+  full `HashingPoolSaturated` is raised straight away, and `HashingPoolMiddleware` turns it
+  into a 503 response.
+- `PASSWORD_HASHING_TIMEOUT` seconds to wait for a result.
+
+This module must not import models, the worker processes import it before the apps are loaded.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from registration.profiling import span
+
+
+class HashingPoolSaturated(Exception):
+    """
+    raised when every worker is busy and the queue is full
+    """
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def _verify(password, encoded):
+    return _timed(hashers.verify_password, password, encoded)
+
+
+def _make(password):
+    return _timed(hashers.make_password, password)
+
+
+class HashingPool:
+
+    def __init__(self, workers, queue_size, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def _record(self, operation, total, run=None, rejected=False):
+        with self._lock:
+            stats = self.stats.setdefault(operation, {
+                'calls': 0, 'rejected': 0, 'seconds': 0.0, 'wait_seconds': 0.0, 'max_seconds': 0.0,
+            })
+            if rejected:
+                stats['rejected'] += 1
+                return
+            stats['calls'] += 1
+            stats['seconds'] += total
+            stats['wait_seconds'] += total - run
+            stats['max_seconds'] = max(stats['max_seconds'], total)
+
+    def _acquire(self, operation):
+        if not self._slots.acquire(blocking=False):
+            self._record(operation, 0, rejected=True)
+            raise HashingPoolSaturated(f'password hashing pool is saturated ({operation})')
+
+    def run(self, operation, function, *args):
+        """
+        run one of the hashing functions in the pool, and return its result
+        """
+        self._acquire(operation)
+        start = time.perf_counter()
+        if not self.workers:
+            try:
+                result, run = function(*args)
+            finally:
+                self._slots.release()
+        else:
+            future = self.executor.submit(function, *args)
+            # the slot is free once the process is done, even if we stop waiting before
+            future.add_done_callback(lambda _: self._slots.release())
+            try:
+                result, run = future.result(timeout=self.timeout)
+            except TimeoutError:
+                self._record(operation, 0, rejected=True)
+                raise HashingPoolSaturated(f'password hashing timed out ({operation})')
+        self._record(operation, time.perf_counter() - start, run)
+        return result
+
+    async def arun(self, operation, function, *args):
+        """
+        async version of `run`, the event loop is not blocked while the process works
+        (or, without workers, while a thread hashes)
+        """
+        if not self.workers:
+            return await sync_to_async(self.run, thread_sensitive=False)(operation, function, *args)
+        self._acquire(operation)
+        start = time.perf_counter()
+        future = self.executor.submit(function, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result, run = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._record(operation, 0, rejected=True)
+            raise HashingPoolSaturated(f'password hashing timed out ({operation})')
+        self._record(operation, time.perf_counter() - start, run)
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(
+                workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', 0),
+                queue_size=getattr(settings, 'PASSWORD_HASHING_QUEUE_SIZE', 32),
+                timeout=getattr(settings, 'PASSWORD_HASHING_TIMEOUT', 5),
+            )
+        return _pool
+
+
+@receiver(setting_changed)
+def reset_pool(*, setting, **kwargs):
+    global _pool
+    if setting.startswith('PASSWORD_HASHING_') or setting == 'PASSWORD_HASHERS':
+        with _pool_lock:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = None
+
+
+def hashing_stats():
+    """
+    per operation counters: calls, rejected calls, total/queue wait/max seconds
+    """
+    pool = get_pool()
+    with pool._lock:
+        return {operation: dict(stats) for operation, stats in pool.stats.items()}
+
+
+def verify_password(password, encoded):
+    """
+    return (is_correct, must_update), like `django.contrib.auth.hashers.verify_password`
+    """
+    with span('hashing'):
+        return get_pool().run('verify', _verify, password, encoded)
+
+
+def make_password(password):
+    with span('hashing'):
+        return get_pool().run('make', _make, password)
+
+
+async def amake_password(password):
+    with span('hashing'):
+        return await get_pool().arun('make', _make, password)
+
+
+def batch_executor(workers):
+    """
+    a process pool for the batch jobs (`import_users`), unlike the request pool
+    it has no queue limit and no timeout
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+def make_passwords(passwords, executor=None, chunksize=16):
+    """
+    hash many passwords, spread over the processes of `executor` (from `batch_executor`), or inline
+    """
+    if executor is None:
+        return [hashers.make_password(password) for password in passwords]
+    return [encoded for encoded, _ in executor.map(_make, passwords, chunksize=chunksize)]
+
+
+def check_user_password(user, password):
+    """
+    same as `user.check_password(password)`, including the upgrade of outdated hashes,
+    but the hashing runs in the pool
+    """
+    is_correct, must_update = verify_password(password, user.password)
+    if is_correct and must_update:
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+    return is_correct
@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from accounts.hashers import DEFAULT_COST, TunedArgon2PasswordHasher, TunedScryptPasswordHasher, hasher_cost
+
+
+class Command(BaseCommand):
+    help = 'Benchmark this host and print the password hasher costs that hit a target verify time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=['argon2', 'scrypt'], default='argon2')
+        parser.add_argument('--target-ms', type=float, default=50, help='wanted verify time of one password, in milliseconds')
+        parser.add_argument('--memory-kib', type=int, default=DEFAULT_COST['argon2']['memory_cost'], help='argon2 memory cost to start from')
+        parser.add_argument('--parallelism', type=int, default=None, help='argon2/scrypt parallelism (default: keep the current one, from PASSWORD_HASHER_COST)')
+        parser.add_argument('--samples', type=int, default=5, help='verifications timed for each candidate')
+
+    def verify_ms(self, hasher_class, cost, samples):
+        """
+        median time to verify a password with the given costs
+        """
+        with override_settings(PASSWORD_HASHER_COST=cost):
+            hasher = hasher_class()
+            encoded = hasher.encode('calibration-password', hasher.salt())
+            timings = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                hasher.verify('calibration-password', encoded)
+                timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def closest(self, target, *candidates):
+        return min((candidate for candidate in candidates if candidate), key=lambda candidate: abs(candidate[1] - target))
+
+    def calibrate_argon2(self, target, options):
+        memory_cost = options['memory_kib']
+        parallelism = options['parallelism'] or hasher_cost('argon2', 'parallelism')
+        while True:
+            time_cost, previous = 1, None
+            while True:
+                params = {'time_cost': time_cost, 'memory_cost': memory_cost, 'parallelism': parallelism}
+                elapsed = self.verify_ms(TunedArgon2PasswordHasher, {'argon2': params}, options['samples'])
+                self.stdout.write(f'  time_cost={time_cost} memory_cost={memory_cost} KiB: {elapsed:.1f} ms')
+                if elapsed >= target:
+                    break
+                time_cost, previous = time_cost + 1, (params, elapsed)
+            # the cheapest pass is already too slow, use less memory
+            if time_cost == 1 and elapsed > target * 1.5 and memory_cost > 8 * parallelism * 1024:
+                memory_cost //= 2
+                continue
+            return self.closest(target, previous, (params, elapsed))
+
+    def calibrate_scrypt(self, target, options):
+        parallelism = options['parallelism'] or hasher_cost('scrypt', 'parallelism')
+        block_size = DEFAULT_COST['scrypt']['block_size']
+        work_factor, previous = 2 ** 10, None
+        while True:
+            params = {'work_factor': work_factor, 'block_size': block_size, 'parallelism': parallelism}
+            elapsed = self.verify_ms(TunedScryptPasswordHasher, {'scrypt': params}, options['samples'])
+            self.stdout.write(f'  work_factor=2**{work_factor.bit_length() - 1}: {elapsed:.1f} ms')
+            if elapsed >= target or work_factor >= 2 ** 20:
+                return self.closest(target, previous, (params, elapsed))
+            work_factor, previous = work_factor * 2, (params, elapsed)
+
+    def handle(self, *args, **options):
+        if options['target_ms'] <= 0:
+            raise CommandError('--target-ms must be positive.')
+        algorithm = options['algorithm']
+        self.stdout.write(f"calibrating {algorithm} for {options['target_ms']:.0f} ms per verify:")
+        calibrate = self.calibrate_argon2 if algorithm == 'argon2' else self.calibrate_scrypt
+        params, elapsed = calibrate(options['target_ms'], options)
+
+        self.stdout.write(self.style.SUCCESS(f'{algorithm} verifies in {elapsed:.1f} ms with {params}'))
+        self.stdout.write('add these lines to your .env, logins will rehash the existing passwords:')
+        self.stdout.write(f'PASSWORD_HASHER={algorithm}')
+        for name, value in params.items():
+            self.stdout.write(f'{algorithm.upper()}_{name.upper()}={value}')
@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from accounts.export import FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Write every user as CSV or JSONL, streamed page after page so the memory stays flat.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(FORMATS), default='csv', help='output format')
+        parser.add_argument('--gzip', action='store_true', help='gzip the output')
+        parser.add_argument('--output', default='-', help='output file (default: standard output)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='users read per query')
+
+    def handle(self, *args, **options):
+        blocks = iter_export(options['format'], options['gzip'], options['chunk_size'])
+        if options['output'] != '-':
+            with open(options['output'], 'wb') as output:
+                for block in blocks:
+                    output.write(block)
+        elif options['gzip']:
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
+        else:
+            # the blocks end with a whole line, they decode on their own
+            for block in blocks:
+                self.stdout.write(block.decode(), ending='')
@@ -0,0 +1,126 @@
+import csv
+import itertools
+import json
+import os
+import time
+
+from django.contrib.auth.hashers import identify_hasher
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts import hashing
+from accounts.availability import taken_in_database_many
+from accounts.forms import ImportUserForm
+
+User = get_user_model()
+
+FIELDS = ('first_name', 'last_name', 'username', 'email')
+
+
+def read_rows(path, file_format):
+    """
+    stream the rows of a CSV (with a header line) or a JSONL file as dicts
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def validate_row(row):
+    """
+    return (user, password, errors), the user is not saved and the password is None
+    when the row brings an already hashed password (`password_hash`)
+    """
+    password_hash = row.get('password_hash') or ''
+    if password_hash:
+        try:
+            identify_hasher(password_hash)
+        except ValueError:
+            return None, None, 'password_hash: unknown hash format'
+    password = row.get('password') or ''
+    form = ImportUserForm(
+        {**{field: row.get(field) or '' for field in FIELDS}, 'password1': password, 'password2': password},
+        password_optional=bool(password_hash),
+    )
+    if not form.is_valid():
+        return None, None, '; '.join(f'{field}: {" ".join(errors)}' for field, errors in form.errors.items())
+    user = form.instance
+    if password_hash:
+        user.password = password_hash
+        return user, None, None
+    return user, password, None
+
+
+class Command(BaseCommand):
+    help = 'Import users from a CSV or JSONL file (first_name, last_name, username, email and password or password_hash).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header line, or JSONL file (one user object per line)')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None, help='file format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='users validated, checked and written per transaction')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes hashing the passwords (0 hashes inline)')
+        parser.add_argument('--offset', type=int, default=0, help='skip the first rows, to resume an interrupted import')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.json')) else 'csv')
+        if not os.path.exists(options['path']):
+            raise CommandError(f"{options['path']} does not exist")
+
+        self.counts = {'created': 0, 'invalid': 0, 'duplicates': 0}
+        rows = itertools.islice(read_rows(options['path'], file_format), options['offset'], None)
+        offset = options['offset']
+        start = time.perf_counter()
+        executor = hashing.batch_executor(options['workers']) if options['workers'] else None
+        try:
+            while batch := list(itertools.islice(rows, options['batch_size'])):
+                self.import_batch(batch, offset, executor)
+                offset += len(batch)
+                rate = (offset - options['offset']) / (time.perf_counter() - start)
+                self.stdout.write(
+                    f"offset {offset}: created {self.counts['created']}, invalid {self.counts['invalid']}, "
+                    f"duplicates {self.counts['duplicates']} ({rate:.0f} rows/s)"
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"done, {self.counts['created']} users created"))
+
+    def import_batch(self, batch, offset, executor):
+        users, passwords = [], []
+        usernames, emails = set(), set()
+        for number, row in enumerate(batch, start=offset):
+            user, password, errors = validate_row(row)
+            if errors:
+                self.counts['invalid'] += 1
+                self.stderr.write(f'row {number}: {errors}')
+            elif user.username in usernames or user.email in emails:
+                self.counts['duplicates'] += 1
+            else:
+                usernames.add(user.username)
+                emails.add(user.email)
+                users.append(user)
+                passwords.append(password)
+
+        # one query for the whole batch, the rows of the previous batches are already committed
+        taken_usernames, taken_emails = taken_in_database_many(usernames, emails)
+        new = [
+            (user, password) for user, password in zip(users, passwords)
+            if user.username not in taken_usernames and user.email not in taken_emails
+        ]
+        self.counts['duplicates'] += len(users) - len(new)
+
+        # hash outside of the transaction, the database is only locked for the inserts
+        hashed = iter(hashing.make_passwords([password for _, password in new if password is not None], executor))
+        users = [user for user, _ in new]
+        for user, password in new:
+            if password is not None:
+                user.password = next(hashed)
+
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+        self.counts['created'] += len(users)
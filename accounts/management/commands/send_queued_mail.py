@@ -0,0 +1,36 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.outbox import drain_outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deliver the emails queued in the outbox, in batches over one reused mail connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='emails sent per connection (default: OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--max-attempts', type=int, default=None, help='attempts before an email is dead lettered (default: OUTBOX_MAX_ATTEMPTS)')
+        parser.add_argument('--loop', action='store_true', help='keep polling the outbox instead of exiting once it is drained')
+        parser.add_argument('--interval', type=float, default=2.0, help='seconds to sleep when the outbox is empty (with --loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                stats = drain_outbox(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+            except Exception:
+                if not options['loop']:
+                    raise
+                # a worker that dies on a database hiccup stops the delivery of every email, keep polling
+                logger.exception('draining the outbox failed, retrying in %s seconds', options['interval'])
+                time.sleep(options['interval'])
+                continue
+            if any(stats.values()):
+                self.stdout.write(f"sent: {stats['sent']}, retried: {stats['retried']}, dead: {stats['dead']}")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
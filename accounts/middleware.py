@@ -0,0 +1,28 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse
+
+from .hashing import HashingPoolSaturated
+
+
+class HashingPoolMiddleware:
+    """
+    answer with a fast 503 when the password hashing pool is saturated,
+    instead of queueing more requests behind it
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # the coroutine of the async chain, awaited by django
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingPoolSaturated):
+            response = HttpResponse('The server is busy, please try again in a moment.', status=503, content_type='text/plain')
+            response['Retry-After'] = '1'
+            return response
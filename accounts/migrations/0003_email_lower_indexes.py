@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:49
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models, router
+from django.db.models.functions import Lower
+
+AUTH_USER_EMAIL_INDEX = models.Index(Lower('email'), name='auth_user_email_lower_idx')
+
+
+def add_auth_user_email_index(apps, schema_editor):
+    # auth.User belongs to django, so its lower(email) index is created from here
+    # (there is no auth_user table when AUTH_USER_MODEL is accounts.CustomUser)
+    User = apps.get_model('auth', 'User')
+    if not User._meta.swapped and router.allow_migrate_model(schema_editor.connection.alias, User):
+        schema_editor.add_index(User, AUTH_USER_EMAIL_INDEX)
+
+
+def remove_auth_user_email_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    if not User._meta.swapped and router.allow_migrate_model(schema_editor.connection.alias, User):
+        schema_editor.remove_index(User, AUTH_USER_EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_outboundemail'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='email',
+            field=models.EmailField(max_length=254),
+        ),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='accounts_customuser_email_ci_unique'),
+        ),
+        migrations.RunPython(add_auth_user_email_index, remove_auth_user_email_index),
+    ]
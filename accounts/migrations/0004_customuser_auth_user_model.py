@@ -0,0 +1,210 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:09
+
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.db.models.functions.text
+import django.utils.timezone
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+# auth_user ids copied per statement
+BATCH_SIZE = 5000
+
+USER_COLUMNS = [
+    'id', 'password', 'last_login', 'is_superuser', 'username', 'first_name',
+    'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+]
+
+
+def has_auth_user_table(connection):
+    # only the databases created before AUTH_USER_MODEL was accounts.CustomUser have one
+    return 'auth_user' in connection.introspection.table_names()
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    auth.User never made the emails unique, the lower(email) constraint added at the end would fail
+    on the auth_user rows sharing an address, so name them before anything is changed
+    """
+    connection = schema_editor.connection
+    if not has_auth_user_table(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT id, username, email FROM auth_user WHERE email <> '' AND LOWER(email) IN ("
+            "SELECT LOWER(email) FROM auth_user WHERE email <> '' GROUP BY LOWER(email) HAVING COUNT(*) > 1"
+            ") ORDER BY LOWER(email), id"
+        )
+        rows = cursor.fetchall()
+    if rows:
+        listed = '\n'.join(f'  id {pk}, username {username!r}: {email}' for pk, username, email in rows[:100])
+        raise RuntimeError(
+            f'{len(rows)} auth_user rows share an email address (whatever the case), change or clear the emails '
+            f'of all but one user of each address, then run the migration again:\n{listed}'
+        )
+
+
+def delete_user_copies(apps, schema_editor):
+    # the rows only held a copy of the username and email of their auth_user row,
+    # the auth_user rows are copied again, in full, by copy_auth_users
+    if has_auth_user_table(schema_editor.connection):
+        CustomUser = apps.get_model('accounts', 'CustomUser')
+        schema_editor.execute(f'DELETE FROM {schema_editor.quote_name(CustomUser._meta.db_table)}')
+
+
+def copy_auth_users(apps, schema_editor):
+    """
+    copy auth_user (and the groups and permissions of the users) into accounts_customuser,
+    keeping the ids so the sessions and the admin log still point to the same users
+    """
+    connection = schema_editor.connection
+    if not has_auth_user_table(connection):
+        return
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    quote = schema_editor.quote_name
+    columns = ', '.join(quote(column) for column in USER_COLUMNS)
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT MAX(id) FROM auth_user')
+        max_id = cursor.fetchone()[0] or 0
+        for first_id in range(0, max_id, BATCH_SIZE):
+            cursor.execute(
+                f'INSERT INTO {quote(CustomUser._meta.db_table)} ({columns}) '
+                f'SELECT {columns} FROM auth_user WHERE id > %s AND id <= %s',
+                [first_id, first_id + BATCH_SIZE],
+            )
+
+        for field_name, table in [('groups', 'auth_user_groups'), ('user_permissions', 'auth_user_user_permissions')]:
+            field = CustomUser._meta.get_field(field_name)
+            through = quote(field.remote_field.through._meta.db_table)
+            user_column, other_column = quote(field.m2m_column_name()), quote(field.m2m_reverse_name())
+            cursor.execute(
+                f'INSERT INTO {through} ({user_column}, {other_column}) '
+                f'SELECT user_id, {other_column} FROM {table}'
+            )
+
+        # the new users get the ids after the copied ones (postgresql, oracle)
+        for sql in connection.ops.sequence_reset_sql(no_style(), [CustomUser]):
+            cursor.execute(sql)
+
+
+def point_admin_log_to_custom_user(apps, schema_editor):
+    """
+    the admin log of a database created with auth.User still has a foreign key to auth_user
+    """
+    connection = schema_editor.connection
+    if 'django_admin_log' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        relations = connection.introspection.get_relations(cursor, 'django_admin_log')
+    if relations.get('user_id', (None, None))[1] != 'auth_user':
+        return
+
+    LogEntry = apps.get_model('admin', 'LogEntry')
+    old_field = models.ForeignKey(apps.get_model('auth', 'User'), on_delete=models.CASCADE)
+    old_field.set_attributes_from_name('user')
+    old_field.model = LogEntry
+    schema_editor.alter_field(LogEntry, old_field, LogEntry._meta.get_field('user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_email_lower_indexes'),
+        ('admin', '0003_logentry_add_action_flag_choices'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails),
+        migrations.AlterModelOptions(
+            name='customuser',
+            options={'verbose_name': 'user', 'verbose_name_plural': 'users'},
+        ),
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='customuser',
+            name='accounts_customuser_email_ci_unique',
+        ),
+        migrations.RunPython(delete_user_copies),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='user',
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='date_joined',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='first_name',
+            field=models.CharField(blank=True, max_length=150, verbose_name='first name'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='groups',
+            field=models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='is_active',
+            field=models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='is_staff',
+            field=models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='is_superuser',
+            field=models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='last_login',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='last login'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='last_name',
+            field=models.CharField(blank=True, max_length=150, verbose_name='last name'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='password',
+            field=models.CharField(default='!', max_length=128, verbose_name='password'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='user_permissions',
+            field=models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254, verbose_name='email address'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='username',
+            field=models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username'),
+        ),
+        migrations.RunPython(copy_auth_users),
+        migrations.RunPython(point_admin_log_to_custom_user),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='accounts_user_email_lower_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='accounts_customuser_email_ci_unique'),
+        ),
+    ]
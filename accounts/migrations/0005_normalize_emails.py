@@ -0,0 +1,21 @@
+from django.db import migrations
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+
+def lower_emails(apps, schema_editor):
+    # the emails stored before the forms lower cased them (admin, createsuperuser, copied auth_user rows),
+    # the unique lower(email) constraint guarantees no two rows end with the same address
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    CustomUser.objects.using(schema_editor.connection.alias).filter(~Q(email=Lower('email'))).update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_customuser_auth_user_model'),
+    ]
+
+    operations = [
+        migrations.RunPython(lower_emails, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,76 @@
 from django.db import models
-from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact, In
+from django.utils import timezone
+from django.contrib.auth.models import AbstractUser
 
-class CustomUser(models.Model):
-    user = models.OneToOneField(User, related_name='user', on_delete=models.CASCADE)
-    email = models.EmailField(unique=True)
-    username = models.CharField(max_length=20, unique=True)
+
+def email_iexact(email, field='email'):
+    """
+    case insensitive email lookup, `LOWER(email) = 'foo@x.com'` is answered by the
+    lower(email) indexes, unlike `email__iexact` (a LIKE on sqlite)
+
+        CustomUser.objects.get(email_iexact('Foo@x.com'))
+    """
+    return Exact(Lower(field), email.lower())
+
+
+def email_in(emails, field='email'):
+    """
+    `email_iexact` for many emails at once, `LOWER(email) IN (...)`
+    """
+    # the output field is given, `In` needs it before the query resolves `field`
+    return In(Lower(field, output_field=models.EmailField()), [email.lower() for email in emails])
+
+
+class CustomUser(AbstractUser):
+    """
+    the user model of the project (AUTH_USER_MODEL), loading a user is one row of one table
+    """
+    email = models.EmailField('email address', blank=True)
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # unique whatever the case, Foo@x.com and foo@x.com are the same address (users without email apart)
+            models.UniqueConstraint(Lower('email'), condition=~models.Q(email=''), name='accounts_customuser_email_ci_unique'),
+        ]
+        indexes = [
+            # answers the email_iexact() lookups, the partial unique index above can not
+            models.Index(Lower('email'), name='accounts_user_email_lower_idx'),
+        ]
+
+
+class OutboundEmail(models.Model):
+    """
+    a queued email waiting to be delivered by the `send_queued_mail` worker,
+    so the request that created it never waits on the mail server
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Dead'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.TextField(help_text='comma separated list of recipients')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='accounts_outbox_due_idx'),
+        ]
 
     def __str__(self):
-        return f'{self.user.username}'
\ No newline at end of file
+        return f'{self.subject} -> {self.to} ({self.status})'
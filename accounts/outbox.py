@@ -0,0 +1,143 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from registration import metrics
+from registration.profiling import span
+
+from .models import OutboundEmail
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    """
+    store the email in the outbox instead of sending it, the `send_queued_mail`
+    command delivers it later, so this costs one INSERT and no SMTP round trip
+    """
+    with span('mail'):
+        return OutboundEmail.objects.create(
+            subject=subject,
+            body=message,
+            from_email=from_email,
+            to=','.join(recipient_list),
+        )
+
+
+async def aenqueue_mail(subject, message, from_email, recipient_list):
+    """
+    async version of `enqueue_mail`
+    """
+    with span('mail'):
+        return await OutboundEmail.objects.acreate(
+            subject=subject,
+            body=message,
+            from_email=from_email,
+            to=','.join(recipient_list),
+        )
+
+
+def retry_delay(attempts):
+    """
+    exponential backoff between two delivery attempts of the same email
+    """
+    base = _setting('OUTBOX_RETRY_BACKOFF', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), _setting('OUTBOX_RETRY_MAX_DELAY', 3600)))
+
+
+def claim_batch(batch_size):
+    """
+    mark up to `batch_size` due emails as sending and return them.
+    a claimed email that is not finished before the lease ends (crashed worker)
+    becomes due again, so no email is lost
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=_setting('OUTBOX_LEASE_SECONDS', 300))
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status__in=[OutboundEmail.PENDING, OutboundEmail.SENDING], next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        # the status check makes the claim safe on databases without row locks (sqlite)
+        OutboundEmail.objects.filter(
+            pk__in=ids, status__in=[OutboundEmail.PENDING, OutboundEmail.SENDING], next_attempt_at__lte=now,
+        ).update(status=OutboundEmail.SENDING, next_attempt_at=lease_until)
+    return list(OutboundEmail.objects.filter(pk__in=ids, status=OutboundEmail.SENDING, next_attempt_at=lease_until))
+
+
+def _failed(email, error, max_attempts, stats):
+    """
+    count a failed delivery attempt of a claimed email: retried with backoff, or dead lettered
+    """
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboundEmail.DEAD
+        stats['dead'] += 1
+    else:
+        email.status = OutboundEmail.PENDING
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        stats['retried'] += 1
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def drain_outbox(batch_size=None, max_attempts=None, connection=None):
+    """
+    deliver one batch of due emails over a single mail connection.
+    failed emails are retried with backoff, and after `max_attempts` they are dead lettered,
+    a mail server that cannot be reached fails the whole batch the same way.
+    returns a dict with the number of sent, retried and dead emails
+    """
+    batch_size = batch_size or _setting('OUTBOX_BATCH_SIZE', 100)
+    max_attempts = max_attempts or _setting('OUTBOX_MAX_ATTEMPTS', 5)
+    stats = {'sent': 0, 'retried': 0, 'dead': 0}
+
+    batch = claim_batch(batch_size)
+    if not batch:
+        return stats
+
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        try:
+            connection.open()
+        except Exception as e:
+            for email in batch:
+                _failed(email, e, max_attempts, stats)
+            return stats
+        for i, email in enumerate(batch):
+            message = EmailMessage(email.subject, email.body, email.from_email, email.to.split(','), connection=connection)
+            start = time.perf_counter()
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                metrics.observe('outbox_send_duration_seconds', time.perf_counter() - start, result='failed')
+                _failed(email, e, max_attempts, stats)
+                # the connection might be broken, start a fresh one for the rest of the batch
+                connection.close()
+                try:
+                    connection.open()
+                except Exception as e:
+                    for rest in batch[i + 1:]:
+                        _failed(rest, e, max_attempts, stats)
+                    break
+            else:
+                metrics.observe('outbox_send_duration_seconds', time.perf_counter() - start, result='sent')
+                email.attempts += 1
+                email.status = OutboundEmail.SENT
+                email.sent_at = timezone.now()
+                email.save(update_fields=['attempts', 'status', 'sent_at'])
+                metrics.observe('outbox_delivery_delay_seconds', (email.sent_at - email.created_at).total_seconds())
+                stats['sent'] += 1
+    finally:
+        connection.close()
+        metrics.flush()
+    return stats
@@ -0,0 +1,220 @@
+"""
+Token bucket rate limits for the login and password reset views, and for the
+availability check of the register form (which tells whether an email has an account).
+
+Every limited view has buckets keyed by the client IP and by what the client
+posts (the username for the login, the email for the reset), each one is
+configured as "<tokens>/<period>" in `RATELIMIT_RULES`, e.g. `5/m` allows a
+burst of 5 requests and gives a token back every 12 seconds.
+
+A bucket is stored as a single number, its "theoretical arrival time" (GCRA),
+so taking a token is one read and one write:
+
+- `LocalMemoryBackend` keeps the buckets in a dict of the process, without lock
+  (two requests racing on the same key can both get the last token).
+- `CacheBackend` keeps them in the `RATELIMIT_CACHE` cache, shared by every worker.
+  The read and the write hold a per key lock taken with `cache.add`, so two
+  workers can not spend the same token. `add` is atomic with memcached, redis,
+  the database and the local memory caches, not with the file cache: there two
+  workers racing on the same key can still both get the last token.
+
+`RateLimitMiddleware` answers 429 before the view runs, so a rejected request
+costs neither a password hash nor a database query.
+"""
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    '5/m' -> (5, 60)
+    """
+    tokens, period = rate.split('/')
+    return int(tokens), PERIODS[period]
+
+
+class LocalMemoryBackend:
+    """
+    buckets in memory, for a single process
+    """
+
+    # drop the full buckets every `prune_every` hits, so the dict does not grow forever
+    prune_every = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._hits = 0
+
+    def get(self, key):
+        return self._buckets.get(key)
+
+    def set(self, key, value, timeout):
+        self._buckets[key] = value
+        self._hits += 1
+        if self._hits % self.prune_every == 0:
+            self.prune()
+
+    def update(self, key, function):
+        result, value, timeout = function(self.get(key))
+        if value is not None:
+            self.set(key, value, timeout)
+        return result
+
+    def prune(self):
+        now = time.time()
+        for key, value in list(self._buckets.items()):
+            if value <= now:
+                self._buckets.pop(key, None)
+
+
+class CacheBackend:
+    """
+    buckets in a django cache, shared by all the workers
+    """
+
+    # a worker waits up to lock_attempts * lock_wait seconds for the lock of a bucket, then the request is limited
+    lock_attempts = 50
+    lock_wait = 0.002
+    # a worker dying while holding a lock blocks its bucket for this many seconds
+    lock_timeout = 1
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(f'ratelimit:{key}')
+
+    def set(self, key, value, timeout):
+        self.cache.set(f'ratelimit:{key}', value, timeout)
+
+    def update(self, key, function):
+        """
+        `function(value)` -> (result, new value or None, timeout), applied while holding the lock of `key`,
+        None when the lock could not be taken
+        """
+        lock = f'ratelimit-lock:{key}'
+        for _ in range(self.lock_attempts):
+            if self.cache.add(lock, 1, self.lock_timeout):
+                try:
+                    result, value, timeout = function(self.get(key))
+                    if value is not None:
+                        self.set(key, value, timeout)
+                    return result
+                finally:
+                    self.cache.delete(lock)
+            time.sleep(self.lock_wait)
+        return None
+
+
+def take_token(backend, key, rate, now=None):
+    """
+    take a token from the bucket `key`, return 0 if it was allowed,
+    or else the seconds to wait for the next token
+    """
+    tokens, period = rate
+    interval = period / tokens
+    now = time.time() if now is None else now
+
+    def take(stored):
+        arrival = max(stored or now, now) + interval
+        wait = arrival - now - period
+        if wait > 0:
+            return wait, None, None
+        return 0, arrival, math.ceil(arrival - now)
+
+    wait = backend.update(key, take)
+    # the bucket stayed locked (a burst on the same key): limited, without spending a token
+    return interval if wait is None else wait
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record(view, rejected_by=None):
+    with _stats_lock:
+        stats = _stats.setdefault(view, {'allowed': 0, 'rejected': 0, 'rejected_by': {}})
+        if rejected_by is None:
+            stats['allowed'] += 1
+        else:
+            stats['rejected'] += 1
+            stats['rejected_by'][rejected_by] = stats['rejected_by'].get(rejected_by, 0) + 1
+
+
+def ratelimit_stats():
+    """
+    per view counters: allowed and rejected requests, and which bucket rejected them
+    """
+    with _stats_lock:
+        return {view: {**stats, 'rejected_by': dict(stats['rejected_by'])} for view, stats in _stats.items()}
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _request_keys(request):
+    return {
+        'ip': client_ip(request),
+        'username': request.POST.get('username', '').strip().lower(),
+        'email': request.POST.get('email', '').strip().lower(),
+    }
+
+
+class RateLimitMiddleware:
+    """
+    apply `RATELIMIT_RULES` to the requests of the limited views (by url name), the POSTs
+    unless `RATELIMIT_METHODS` gives other methods for the view
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.local = LocalMemoryBackend()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # the coroutine of the async chain, awaited by django. the checks are in process_view,
+        # which django runs in a thread under ASGI (the cache backend blocks on its lock)
+        return self.get_response(request)
+
+    @property
+    def backend(self):
+        if getattr(settings, 'RATELIMIT_BACKEND', 'local') == 'cache':
+            return CacheBackend(getattr(settings, 'RATELIMIT_CACHE', 'default'))
+        return self.local
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(settings, 'RATELIMIT_ENABLED', True):
+            return None
+        view = request.resolver_match.url_name
+        if request.method not in getattr(settings, 'RATELIMIT_METHODS', {}).get(view, ['POST']):
+            return None
+        rules = getattr(settings, 'RATELIMIT_RULES', {}).get(view)
+        if not rules:
+            return None
+
+        backend = self.backend
+        keys = _request_keys(request)
+        for kind, rate in rules.items():
+            if not keys.get(kind):
+                continue
+            wait = take_token(backend, f'{view}:{kind}:{keys[kind]}', parse_rate(rate))
+            if wait:
+                _record(view, rejected_by=kind)
+                response = HttpResponse('Too many attempts, please try again later.', status=429, content_type='text/plain')
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+        _record(view)
+        return None
@@ -0,0 +1,110 @@
+import socket
+import socketserver
+import threading
+import time
+
+from django.test import override_settings
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    speaks just enough SMTP for django's smtp backend (no TLS, no AUTH)
+    """
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        try:
+            self.converse()
+        except ConnectionError:
+            # the client dropped the connection (pooled connections closed by the tests)
+            return
+
+    def converse(self):
+        server = self.server
+        server.connections += 1
+        server.open_sockets.append(self.request)
+        time.sleep(server.connect_delay)
+        self.reply('220 localhost stand-in SMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 localhost')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b'.\r\n', b''):
+                        break
+                    data.append(data_line)
+                time.sleep(server.message_delay)
+                server.messages.append(b''.join(data).decode())
+                self.reply('250 OK queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    a local SMTP server for tests, `connect_delay` and `message_delay` simulate a slow mail provider.
+
+        with StandInSMTPServer(connect_delay=0.5) as server:
+            ... EMAIL_HOST='127.0.0.1', EMAIL_PORT=server.port ...
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_delay=0.0, message_delay=0.0):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.connections = 0
+        self.messages = []
+        self.open_sockets = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def drop_connections(self):
+        """
+        close every client connection from the server side, like a provider timing out idle clients
+        """
+        for sock in self.open_sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.open_sockets.clear()
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+def smtp_settings(server, backend='django.core.mail.backends.smtp.EmailBackend'):
+    """
+    settings that point the mail backend to a stand-in server
+    """
+    return override_settings(
+        EMAIL_BACKEND=backend,
+        EMAIL_HOST='127.0.0.1',
+        EMAIL_PORT=server.port,
+        EMAIL_USE_TLS=False,
+        EMAIL_HOST_USER='',
+        EMAIL_HOST_PASSWORD='',
+    )
@@ -0,0 +1,94 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.test import TestCase, Client
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.admin import CustomUserAdmin, EstimatedCountPaginator, estimate_count
+
+User = get_user_model()
+
+
+### test the users admin
+class CustomUserAdminTest(TestCase):
+    def setUp(self):
+        User.objects.bulk_create([User(username=f'user{i}', email=f'User{i}@example.com') for i in range(30)])
+        self.admin_user = User.objects.create_superuser(username='admin', email='admin@example.com', password='Test#12345')
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+        self.url = reverse('admin:accounts_customuser_changelist')
+
+    def search(self, term):
+        queryset, _ = CustomUserAdmin(User, admin.site).get_search_results(None, User.objects.all(), term)
+        return queryset
+
+    def test_changelist(self):
+        """
+        test the changelist is listed with the exact count on a small table
+        """
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 31)
+
+    def test_changelist_estimated_count(self):
+        """
+        test the unfiltered changelist of a large table is not counted with COUNT(*)
+        """
+        with patch.object(EstimatedCountPaginator, 'exact_count_below', 0), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].paginator.count, self.admin_user.pk)
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql'].upper()])
+
+    @skipUnless(connection.vendor == 'sqlite', 'sqlite_stat1 is the SQLite statistics table')
+    def test_estimated_count_with_users_without_email(self):
+        """
+        test the estimate counts the users without an email, left out of the partial unique email index
+        """
+        User.objects.bulk_create([User(username=f'noemail{i}', email='') for i in range(20)])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        self.assertEqual(estimate_count(User), 51)
+
+    def test_changelist_queries_do_not_grow_with_users(self):
+        """
+        test the changelist runs the same queries for 31 and 131 users
+        """
+        # the first request also loads the session user
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        User.objects.bulk_create([User(username=f'other{i}', email=f'other{i}@example.com') for i in range(100)])
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url)
+
+        self.assertEqual(len(small), len(large))
+
+    def test_search_prefix(self):
+        """
+        test the search matches the beginning of the username or of the email, whatever the case of the email
+        """
+        self.assertEqual(set(self.search('user1').values_list('username', flat=True)), {'user1', *(f'user1{i}' for i in range(10))})
+        self.assertEqual(list(self.search('USER25@').values_list('username', flat=True)), ['user25'])
+        self.assertFalse(self.search('example').exists())
+        self.assertEqual(self.search('  ').count(), 31)
+
+    @skipUnless(connection.vendor == 'sqlite', 'the query plan is checked on sqlite')
+    def test_search_use_indexes(self):
+        """
+        test the search is answered by the username and lower(email) indexes, not a table scan
+        """
+        sql, params = self.search('user1').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+        self.assertIn('accounts_user_email_lower_idx', plan)
+        self.assertNotIn('SCAN', plan)
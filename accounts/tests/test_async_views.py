@@ -0,0 +1,171 @@
+from unittest.mock import patch
+
+from django.test import TestCase, AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.urls import reverse, resolve
+
+from accounts import async_views, hashing
+from accounts.forms import AsyncAuthenticationForm
+from accounts.models import OutboundEmail
+from accounts.user_cache import user_cache
+
+User = get_user_model()
+
+
+### test the async urls
+@override_settings(ROOT_URLCONF='registration.asgi_urls')
+class AsyncUrlsTest(TestCase):
+    def test_endpoints_use_async_views(self):
+        """
+        test the asgi url configuration routes to the async views, with the same url names
+        """
+        self.assertEqual(resolve(reverse('login')).func, async_views.login_view)
+        self.assertEqual(resolve(reverse('register')).func, async_views.register_view)
+        self.assertEqual(resolve(reverse('password_reset_request')).func, async_views.password_reset_request)
+        self.assertEqual(resolve(reverse('password_reset_done')).func, async_views.password_reset_done)
+
+
+### test async login view
+@override_settings(ROOT_URLCONF='registration.asgi_urls')
+class AsyncLoginViewTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='david@123', password='Test#12345')
+
+    async def test_login_view_get_request(self):
+        """
+        test GET request for the async login view
+        """
+        response = await AsyncClient().get(reverse('login'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'accounts/login.html')
+
+    async def test_login_view_post_request_with_valid_data(self):
+        """
+        test POST request for the async login view with valid data
+        """
+        client = AsyncClient()
+        response = await client.post(reverse('login'), {'username': 'david@123', 'password': 'Test#12345'})
+
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        response = await client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'home/home.html')
+
+    async def test_login_view_post_request_with_invalid_data(self):
+        """
+        test POST request for the async login view with a wrong password
+        """
+        response = await AsyncClient().post(reverse('login'), {'username': 'david@123', 'password': 'Test@123'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.context['login_form'], AsyncAuthenticationForm)
+        self.assertTrue(response.context['login_form'].non_field_errors())
+        messages = list(get_messages(response.asgi_request))
+        self.assertEqual(str(messages[0]), 'Password and/or username are wrong. Please enter the correct information')
+
+
+### test async register and logout views
+@override_settings(ROOT_URLCONF='registration.asgi_urls')
+class AsyncRegisterViewTest(TestCase):
+    @classmethod
+    def get_user_data(cls):
+        return {
+            'first_name': 'david',
+            'last_name': 'calob',
+            'username': 'david@123',
+            'email': 'david@example.com',
+            'password1': 'Test#12345',
+            'password2': 'Test#12345'
+        }
+
+    async def test_register_then_logout(self):
+        """
+        test register a user with the async view, then logout
+        """
+        client = AsyncClient()
+        response = await client.post(reverse('register'), AsyncRegisterViewTest.get_user_data())
+
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertTrue(await User.objects.filter(username='david@123').aexists())
+
+        response = await client.get(reverse('logout'))
+        self.assertRedirects(response, reverse('index'), fetch_redirect_response=False)
+        response = await client.get(reverse('home'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_loads_the_user_once(self):
+        """
+        test the async logout loads the user once, the user cache missing (another worker, a login just before)
+        """
+        client = Client()
+        client.force_login(User.objects.create_user(username='david@123'))
+
+        with patch.object(user_cache, 'get', return_value=None), CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('logout'))
+
+        self.assertEqual(response.status_code, 302)
+        user_loads = [query for query in queries if query['sql'].startswith('SELECT') and User._meta.db_table in query['sql']]
+        self.assertEqual(len(user_loads), 1)
+
+    async def test_register_with_invalid_data(self):
+        """
+        test the async register view show the form errors
+        """
+        data = AsyncRegisterViewTest.get_user_data()
+        data['email'] = 'exampletest.com'
+
+        response = await AsyncClient().post(reverse('register'), data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'accounts/register.html')
+        self.assertIn('email', response.context['register_form'].errors)
+
+
+### test async reset password views
+@override_settings(ROOT_URLCONF='registration.asgi_urls')
+class AsyncPasswordResetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='david@123', email='david@example.com', password='Test#12345')
+
+    async def test_password_reset_request_queue_email(self):
+        """
+        test the async reset view queue the reset email
+        """
+        response = await AsyncClient().post(reverse('password_reset_request'), {'email': 'david@example.com'})
+
+        self.assertRedirects(response, reverse('password_reset_done'), fetch_redirect_response=False)
+        self.assertEqual(await OutboundEmail.objects.acount(), 1)
+
+    async def test_password_reset_request_with_unknown_email(self):
+        """
+        test the async reset view with an email without account
+        """
+        response = await AsyncClient().post(reverse('password_reset_request'), {'email': 'invalid@example.com'})
+
+        self.assertRedirects(response, reverse('password_reset_done'), fetch_redirect_response=False)
+        self.assertEqual(await OutboundEmail.objects.acount(), 0)
+
+    async def test_password_reset_confirm(self):
+        """
+        test the async confirm view change the password
+        """
+        token = default_token_generator.make_token(self.user)
+        url = reverse('password_reset_confirm', kwargs={'uidb64': self.user.pk, 'token': token})
+        client = AsyncClient()
+
+        response = await client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        with patch('accounts.forms.hashing.amake_password', wraps=hashing.amake_password) as amake_password, \
+                patch('django.contrib.auth.base_user.make_password') as make_password:
+            response = await client.post(url, {'new_password1': 'Test@123', 'new_password2': 'Test@123'})
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        # hashed by the pool, off the event loop, not by `set_password`
+        amake_password.assert_awaited_once_with('Test@123')
+        make_password.assert_not_called()
+        await self.user.arefresh_from_db()
+        self.assertTrue(self.user.check_password('Test@123'))
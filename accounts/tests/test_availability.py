@@ -0,0 +1,78 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from accounts.availability import BloomFilter, availability, taken_in_database
+
+User = get_user_model()
+
+
+### test the bloom filter
+class BloomFilterTest(TestCase):
+    def test_added_items_are_found(self):
+        """
+        test every added item is reported as maybe in the set, and the false positive rate stay low
+        """
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'user{i}')
+
+        self.assertTrue(all(f'user{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+### test the availability check
+@override_settings(AVAILABILITY_FILTER_BACKGROUND_REBUILD=False)
+class AvailabilityTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='david@123', email='David@Example.com', password='Test#12345')
+        availability.rebuild()
+
+    def check(self, **params):
+        return Client().get(reverse('check_availability'), params)
+
+    def test_free_username_without_query(self):
+        """
+        test a free username and email are answered from the filter, without database query
+        """
+        with self.assertNumQueries(0):
+            response = self.check(username='sara@123', email='sara@example.com')
+
+        self.assertEqual(response.json(), {
+            'username': {'value': 'sara@123', 'available': True},
+            'email': {'value': 'sara@example.com', 'available': True},
+        })
+
+    def test_taken_values_are_confirmed(self):
+        """
+        test a filter hit is confirmed with one query, and the email is case insensitive
+        """
+        with self.assertNumQueries(1):
+            response = self.check(username='david@123', email='david@example.com')
+
+        self.assertFalse(response.json()['username']['available'])
+        self.assertFalse(response.json()['email']['available'])
+
+    def test_missing_parameters(self):
+        """
+        test the view answer 400 without username and email
+        """
+        self.assertEqual(self.check().status_code, 400)
+
+    def test_register_add_the_user(self):
+        """
+        test a registered user is reported as taken before the next rebuild
+        """
+        Client().post(reverse('register'), {
+            'first_name': 'sara',
+            'last_name': 'calob',
+            'username': 'sara@123',
+            'email': 'sara@example.com',
+            'password1': 'Test#12345',
+            'password2': 'Test#12345'
+        })
+
+        self.assertEqual(taken_in_database('sara@123', 'SARA@example.com'), (True, True))
+        with self.assertNumQueries(1):
+            self.assertEqual(availability.check('sara@123'), (False, True))
@@ -0,0 +1,86 @@
+import threading
+
+from django.test import SimpleTestCase, override_settings
+from django.core.mail import send_mail, get_connection
+
+from accounts.email_backend import pool, pool_stats
+from accounts.tests.smtp_server import StandInSMTPServer, smtp_settings
+
+POOLED_BACKEND = 'accounts.email_backend.PooledEmailBackend'
+
+
+### test the pooled SMTP backend
+class PooledEmailBackendTest(SimpleTestCase):
+    def setUp(self):
+        pool.clear()
+        pool.stats.update(handshakes=0, reused=0, discarded=0)
+        self.addCleanup(pool.clear)
+
+    def send(self, count):
+        for i in range(count):
+            send_mail('Subject', f'body {i}', 'contact@infinite.com', [f'user{i}@example.com'])
+
+    def test_connection_reused_across_send_mail_calls(self):
+        """
+        test many send_mail calls share one SMTP connection
+        """
+        with StandInSMTPServer() as server, smtp_settings(server, POOLED_BACKEND):
+            self.send(10)
+
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(len(server.messages), 10)
+        self.assertEqual(pool_stats(), {'handshakes': 1, 'reused': 9, 'discarded': 0})
+
+    def test_many_messages_per_connection(self):
+        """
+        test a batch of messages is sent over a single connection
+        """
+        with StandInSMTPServer() as server, smtp_settings(server, POOLED_BACKEND):
+            connection = get_connection()
+            connection.open()
+            for i in range(5):
+                send_mail('Subject', f'body {i}', 'contact@infinite.com', ['a@example.com'], connection=connection)
+            connection.close()
+            self.send(1)
+
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(len(server.messages), 6)
+
+    def test_broken_connection_not_reused(self):
+        """
+        test a connection dropped by the server is discarded and a new one is opened
+        """
+        with StandInSMTPServer() as server, smtp_settings(server, POOLED_BACKEND):
+            self.send(1)
+            server.drop_connections()
+            self.send(1)
+
+        self.assertEqual(server.connections, 2)
+        self.assertEqual(len(server.messages), 2)
+        self.assertEqual(pool_stats()['discarded'], 1)
+
+    @override_settings(EMAIL_POOL_MAX_IDLE=0)
+    def test_idle_connection_expired(self):
+        """
+        test a connection idle for longer than EMAIL_POOL_MAX_IDLE is not reused
+        """
+        with StandInSMTPServer() as server, smtp_settings(server, POOLED_BACKEND):
+            self.send(2)
+
+        self.assertEqual(server.connections, 2)
+
+    @override_settings(EMAIL_POOL_SIZE=2)
+    def test_concurrent_senders_bounded_pool(self):
+        """
+        test threads sending at the same time never keep more than EMAIL_POOL_SIZE idle connections
+        """
+        with StandInSMTPServer(message_delay=0.01) as server, smtp_settings(server, POOLED_BACKEND):
+            threads = [threading.Thread(target=self.send, args=(5,)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(len(server.messages), 20)
+            self.assertLessEqual(server.connections, 4)
+            self.assertLessEqual(sum(len(idle) for idle in pool._idle.values()), 2)
@@ -0,0 +1,121 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from functools import partial
+from io import StringIO
+from unittest.mock import patch
+
+from django.test import TestCase, AsyncClient, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+
+from accounts.export import aiter_export, iter_users
+
+User = get_user_model()
+
+
+### test the users export
+class ExportUsersTest(TestCase):
+    def setUp(self):
+        for i in range(5):
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com')
+        self.staff = User.objects.create_user(username='admin', password='Test#12345', is_staff=True)
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_keyset_pagination(self):
+        """
+        test the users are read in pages of chunk_size by primary key, one query per page
+        """
+        with self.assertNumQueries(3):
+            rows = list(iter_users(chunk_size=3))
+
+        self.assertEqual([row[1] for row in rows], ['user0', 'user1', 'user2', 'user3', 'user4', 'admin'])
+
+    def test_export_csv(self):
+        """
+        test the staff can download the users as CSV
+        """
+        response = self.client.get(reverse('export_users'))
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="users.csv"')
+        rows = list(csv.DictReader(self.content(response).decode().splitlines()))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['email'], 'user0@example.com')
+
+    def test_export_jsonl_gzip(self):
+        """
+        test the gzipped JSONL export
+        """
+        response = self.client.get(reverse('export_users'), {'format': 'jsonl', 'gzip': '1'})
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="users.jsonl.gz"')
+        rows = [json.loads(line) for line in gzip.decompress(self.content(response)).splitlines()]
+        self.assertEqual(rows[-1]['username'], 'admin')
+        self.assertTrue(rows[-1]['is_staff'])
+
+    def test_export_bad_format(self):
+        self.assertEqual(self.client.get(reverse('export_users'), {'format': 'xml'}).status_code, 400)
+
+    def test_export_not_staff(self):
+        """
+        test a user who is not staff is sent to the admin login
+        """
+        client = Client()
+        client.force_login(User.objects.get(username='user0'))
+
+        response = client.get(reverse('export_users'))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response.url)
+
+    @override_settings(ROOT_URLCONF='registration.asgi_urls')
+    async def test_export_streamed_under_asgi(self):
+        """
+        test the ASGI export is an async iterator sending the file block after block, not read whole first
+        """
+        client = AsyncClient()
+        await client.aforce_login(self.staff)
+
+        with patch('accounts.async_views.aiter_export', partial(aiter_export, chunk_size=2, buffer_size=100)):
+            response = await client.get(reverse('export_users'))
+            self.assertTrue(response.is_async)
+            blocks = [block async for block in response.streaming_content]
+
+        self.assertGreater(len(blocks), 2)
+        rows = list(csv.DictReader(b''.join(blocks).decode().splitlines()))
+        self.assertEqual([row['username'] for row in rows], ['user0', 'user1', 'user2', 'user3', 'user4', 'admin'])
+
+    @override_settings(ROOT_URLCONF='registration.asgi_urls')
+    async def test_export_not_staff_under_asgi(self):
+        """
+        test the async export sends a user who is not staff to the admin login
+        """
+        client = AsyncClient()
+        await client.aforce_login(await User.objects.aget(username='user0'))
+
+        response = await client.get(reverse('export_users'))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response.url)
+
+    def test_export_command(self):
+        """
+        test the command write the users to stdout or to a gzipped file
+        """
+        out = StringIO()
+        call_command('export_users', format='jsonl', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 6)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'users.csv.gz')
+            call_command('export_users', gzip=True, output=path, chunk_size=2)
+            with gzip.open(path, 'rt') as file:
+                self.assertEqual(len(file.read().splitlines()), 7)
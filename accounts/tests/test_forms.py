@@ -1,7 +1,9 @@
 from django.test import TestCase
-from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
 from accounts.forms import NewUserForm, CustomPasswordResetForm
 
+User = get_user_model()
+
 ### test new user form
 class NewUserFormTest(TestCase):
     @classmethod
@@ -191,6 +193,62 @@ class NewUserFormTest(TestCase):
         self.assertEqual(form.fields["password2"].widget.attrs.get("class"), "form-control")
 
 
+    def test_username_already_exist(self):
+        """
+        test if the username is used by another user
+        """
+        User.objects.create_user(username='david@123', email='other@example.com', password='Test#12345')
+
+        form = NewUserForm(data=NewUserFormTest.get_user_form_data())
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['username'], ['A user with that username already exists.'])
+        self.assertFalse('email' in form.errors)
+
+    def test_email_already_exist(self):
+        """
+        test if the email is used by another user
+        """
+        User.objects.create_user(username='other', email='david@example.com', password='Test#12345')
+
+        form = NewUserForm(data=NewUserFormTest.get_user_form_data())
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['email'], ['Email address is already in use.'])
+        self.assertFalse('username' in form.errors)
+
+    def test_email_already_exist_with_other_case(self):
+        """
+        test if the email is used by another user with a different case
+        """
+        User.objects.create_user(username='other', email='David@Example.com', password='Test#12345')
+
+        form = NewUserForm(data=NewUserFormTest.get_user_form_data())
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['email'], ['Email address is already in use.'])
+
+    def test_email_saved_in_lower_case(self):
+        """
+        test the email is stored in lower case
+        """
+        form_data = NewUserFormTest.get_user_form_data()
+        form_data['email'] = 'David@Example.COM'
+        form = NewUserForm(data=form_data)
+        self.assertTrue(form.is_valid())
+
+        self.assertEqual(form.save().email, 'david@example.com')
+
+    def test_uniqueness_checked_in_one_query(self):
+        """
+        test validating the form check the username and the email with a single query
+        """
+        form = NewUserForm(data=NewUserFormTest.get_user_form_data())
+
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid())
+
+
 ### test new user form
 class CustomPasswordResetFormTest(TestCase):
     def test_widget_attrs(self):
@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+
+User = get_user_model()
+
+ARGON2_COST = {'argon2': {'time_cost': 1, 'memory_cost': 8192, 'parallelism': 1}}
+# the hashers of settings.py, the fast test settings hash with MD5
+HASHERS = [
+    'accounts.hashers.TunedArgon2PasswordHasher',
+    'accounts.hashers.TunedScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+]
+
+
+### test the tuned password hashers
+@override_settings(PASSWORD_HASHERS=HASHERS, PASSWORD_HASHER_COST=ARGON2_COST)
+class TunedHashersTest(TestCase):
+    def login(self):
+        return Client().post(reverse('login'), {'username': 'david@123', 'password': 'Test#12345'})
+
+    def test_new_password_use_argon2(self):
+        """
+        test new passwords are hashed with argon2 and the configured costs
+        """
+        user = User.objects.create_user(username='david@123', password='Test#12345')
+
+        self.assertEqual(identify_hasher(user.password).algorithm, 'argon2')
+        self.assertIn('m=8192,t=1,p=1', user.password)
+
+    def test_login_rehash_pbkdf2_password(self):
+        """
+        test login through login_view rehash an old PBKDF2 hash in place
+        """
+        User.objects.create(username='david@123', password=make_password('Test#12345', hasher='pbkdf2_sha256'))
+
+        self.assertRedirects(self.login(), reverse('home'), fetch_redirect_response=False)
+
+        user = User.objects.get(username='david@123')
+        self.assertEqual(identify_hasher(user.password).algorithm, 'argon2')
+        self.assertTrue(user.check_password('Test#12345'))
+
+    def test_login_rehash_when_cost_change(self):
+        """
+        test a hash made with older costs is rehashed with the new costs
+        """
+        User.objects.create_user(username='david@123', password='Test#12345')
+
+        with self.settings(PASSWORD_HASHER_COST={'argon2': {'time_cost': 2, 'memory_cost': 8192, 'parallelism': 1}}):
+            self.login()
+
+        self.assertIn('m=8192,t=2,p=1', User.objects.get(username='david@123').password)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'accounts.hashers.TunedScryptPasswordHasher',
+        'accounts.hashers.TunedArgon2PasswordHasher',
+    ], PASSWORD_HASHER_COST={'scrypt': {'work_factor': 2 ** 12, 'block_size': 8, 'parallelism': 1}})
+    def test_scrypt_hasher(self):
+        """
+        test the scrypt hasher use the configured work factor
+        """
+        user = User.objects.create_user(username='david@123', password='Test#12345')
+
+        self.assertTrue(user.password.startswith('scrypt$4096$'))
+        self.assertTrue(user.check_password('Test#12345'))
+
+
+### test the calibration command
+class CalibrateHasherCommandTest(TestCase):
+    def test_calibrate_scrypt(self):
+        """
+        test the command print the settings for the wanted verify time
+        """
+        out = StringIO()
+        call_command('calibrate_hasher', algorithm='scrypt', target_ms=1, samples=1, stdout=out)
+
+        self.assertIn('PASSWORD_HASHER=scrypt', out.getvalue())
+        self.assertIn('SCRYPT_WORK_FACTOR=', out.getvalue())
+
+    @override_settings(PASSWORD_HASHER_COST={'scrypt': {'parallelism': 2}})
+    def test_calibrate_keeps_current_parallelism(self):
+        """
+        test the parallelism of the settings is kept when --parallelism is not given
+        """
+        out = StringIO()
+        call_command('calibrate_hasher', algorithm='scrypt', target_ms=1, samples=1, stdout=out)
+
+        self.assertIn('SCRYPT_PARALLELISM=2', out.getvalue())
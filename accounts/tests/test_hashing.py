@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+from django.test import TestCase, Client, override_settings, tag
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from accounts import hashing
+from accounts.forms import NewUserForm
+from registration.test_runner import SERIAL_TAG
+
+User = get_user_model()
+
+
+### test the password hashing pool
+class HashingPoolTest(TestCase):
+    def setUp(self):
+        hashing.get_pool().stats.clear()
+
+    def test_make_and_verify_password_inline(self):
+        """
+        test hashing without worker processes, on the calling thread
+        """
+        encoded = hashing.make_password('Test#12345')
+
+        self.assertTrue(check_password('Test#12345', encoded))
+        self.assertEqual(hashing.verify_password('Test#12345', encoded), (True, False))
+        self.assertEqual(hashing.verify_password('wrong', encoded), (False, False))
+
+        stats = hashing.hashing_stats()
+        self.assertEqual(stats['make']['calls'], 1)
+        self.assertEqual(stats['verify']['calls'], 2)
+        self.assertGreater(stats['verify']['max_seconds'], 0)
+
+    def test_async_hashing_inline_off_the_event_loop(self):
+        """
+        test hashing without worker processes does not block the event loop of the async views
+        """
+        async def hash_on_loop():
+            loop_thread = threading.get_ident()
+            hash_thread = await hashing.get_pool().arun('make', lambda: (threading.get_ident(), 0.0))
+            return loop_thread, hash_thread
+
+        loop_thread, hash_thread = asyncio.run(hash_on_loop())
+
+        self.assertNotEqual(loop_thread, hash_thread)
+        self.assertEqual(hashing.hashing_stats()['make']['calls'], 1)
+
+    @tag(SERIAL_TAG)
+    @override_settings(PASSWORD_HASHING_WORKERS=2)
+    def test_make_and_verify_password_in_processes(self):
+        """
+        test hashing in worker processes
+        """
+        encoded = hashing.make_password('Test#12345')
+
+        self.assertTrue(check_password('Test#12345', encoded))
+        self.assertEqual(hashing.verify_password('Test#12345', encoded), (True, False))
+        stats = hashing.hashing_stats()
+        self.assertEqual(stats['make']['calls'], 1)
+        self.assertGreaterEqual(stats['make']['wait_seconds'], 0)
+
+    @override_settings(PASSWORD_HASHING_QUEUE_SIZE=0)
+    def test_saturated_pool_rejects(self):
+        """
+        test a call is rejected straight away when no slot is free
+        """
+        pool = hashing.get_pool()
+        pool._slots.acquire()
+        self.addCleanup(pool._slots.release)
+
+        with self.assertRaises(hashing.HashingPoolSaturated):
+            hashing.make_password('Test#12345')
+        self.assertEqual(hashing.hashing_stats()['make']['rejected'], 1)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_authenticate_upgrade_outdated_hash(self):
+        """
+        test the backend rehash a password stored with an outdated hasher
+        """
+        user = User.objects.create(username='david@123', password=make_password('Test#12345', hasher='md5'))
+
+        self.assertEqual(authenticate(username='david@123', password='Test#12345'), user)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertIsNone(authenticate(username='david@123', password='wrong'))
+        self.assertIsNone(authenticate(username='nobody', password='Test#12345'))
+
+    def test_register_form_hash_in_pool(self):
+        """
+        test the register form hash the password with the pool
+        """
+        form = NewUserForm(data={
+            'first_name': 'david',
+            'last_name': 'calob',
+            'username': 'david@123',
+            'email': 'david@example.com',
+            'password1': 'Test#12345',
+            'password2': 'Test#12345'
+        })
+        self.assertTrue(form.is_valid())
+
+        user = form.save()
+
+        self.assertTrue(user.check_password('Test#12345'))
+        self.assertEqual(hashing.hashing_stats()['make']['calls'], 1)
+
+
+### test the 503 response when the pool is saturated
+@override_settings(PASSWORD_HASHING_QUEUE_SIZE=0)
+class HashingPoolMiddlewareTest(TestCase):
+    def test_login_when_pool_saturated(self):
+        """
+        test the login view answer 503 when the hashing pool is saturated
+        """
+        User.objects.create_user(username='david@123', password='Test#12345')
+        pool = hashing.get_pool()
+        pool._slots.acquire()
+        self.addCleanup(pool._slots.release)
+
+        response = Client().post(reverse('login'), {'username': 'david@123', 'password': 'Test#12345'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.test import TestCase, override_settings, tag
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from registration.test_runner import SERIAL_TAG
+
+
+User = get_user_model()
+
+ARGON2_COST = {'argon2': {'time_cost': 1, 'memory_cost': 8192, 'parallelism': 1}}
+
+
+### test the import_users command
+@override_settings(PASSWORD_HASHER_COST=ARGON2_COST)
+class ImportUsersTest(TestCase):
+    def write_file(self, name, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def import_users(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_users', path, workers=0, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        """
+        test valid rows are created with a hashed password, invalid and duplicated rows are skipped
+        """
+        User.objects.create_user(username='taken', email='taken@example.com')
+        path = self.write_file('users.csv', '\n'.join([
+            'first_name,last_name,username,email,password',
+            'david,calob,david@123,David@Example.com,Test#12345',
+            'sara,calob,sara@123,sara@example.org,Test#12345',
+            'sara,calob,sara@123,sara@example.com,Test#12345',
+            'taken,user,other,TAKEN@example.com,Test#12345',
+            'david,calob,david@123,david2@example.com,Test#12345',
+        ]))
+
+        out, err = self.import_users(path, batch_size=2)
+
+        self.assertTrue(User.objects.get(username='david@123').check_password('Test#12345'))
+        self.assertEqual(User.objects.get(username='david@123').email, 'david@example.com')
+        self.assertTrue(User.objects.filter(username='sara@123').exists())
+        self.assertEqual(User.objects.count(), 3)
+        self.assertIn('row 1: email: Invalid email domain', err)
+        self.assertIn('offset 5: created 2, invalid 1, duplicates 2', out)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher'])
+    def test_import_jsonl_with_hashed_password_and_offset(self):
+        """
+        test a JSONL import resumed at an offset, keeping the already hashed passwords
+        """
+        encoded = make_password('Test#12345', hasher='pbkdf2_sha256')
+        rows = [
+            {'first_name': 'david', 'last_name': 'calob', 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': encoded}
+            for i in range(4)
+        ]
+        path = self.write_file('users.jsonl', '\n'.join(json.dumps(row) for row in rows))
+
+        # uniqueness check, the insert and the savepoint of the transaction (inside the test one)
+        with self.assertNumQueries(4):
+            self.import_users(path, offset=1)
+
+        self.assertEqual(sorted(User.objects.values_list('username', flat=True)), ['user1', 'user2', 'user3'])
+        self.assertEqual(User.objects.get(username='user3').password, encoded)
+
+    @tag(SERIAL_TAG)
+    def test_hash_in_processes(self):
+        """
+        test the passwords are hashed by the worker processes
+        """
+        path = self.write_file('users.csv', 'first_name,last_name,username,email,password\ndavid,calob,david@123,david@example.com,Test#12345\n')
+
+        call_command('import_users', path, workers=1, stdout=StringIO())
+
+        self.assertTrue(User.objects.get(username='david@123').check_password('Test#12345'))
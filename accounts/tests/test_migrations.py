@@ -0,0 +1,103 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+
+User = get_user_model()
+
+migration = import_module('accounts.migrations.0004_customuser_auth_user_model')
+
+
+### test the move of auth_user into accounts_customuser
+class CopyAuthUsersTest(TestCase):
+    def setUp(self):
+        """
+        setup the auth tables of a database created before AUTH_USER_MODEL was accounts.CustomUser
+        """
+        self.group = Group.objects.create(name='staff')
+        self.permission = Permission.objects.first()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE auth_user (id integer PRIMARY KEY, password varchar(128), last_login datetime NULL, '
+                'is_superuser bool, username varchar(150), first_name varchar(150), last_name varchar(150), '
+                'email varchar(254), is_staff bool, is_active bool, date_joined datetime)'
+            )
+            cursor.execute('CREATE TABLE auth_user_groups (id integer PRIMARY KEY, user_id integer, group_id integer)')
+            cursor.execute('CREATE TABLE auth_user_user_permissions (id integer PRIMARY KEY, user_id integer, permission_id integer)')
+            cursor.executemany(
+                'INSERT INTO auth_user VALUES (%s, %s, NULL, %s, %s, %s, %s, %s, %s, %s, %s)',
+                [
+                    (3, 'pbkdf2_sha256$1$salt$hash', False, 'david', 'david', 'calob', 'david@example.com', False, True, '2024-02-09 19:15:00'),
+                    (7, '!', True, 'admin', '', '', 'admin@example.com', True, True, '2024-02-10 08:00:00'),
+                ],
+            )
+            cursor.execute('INSERT INTO auth_user_groups (user_id, group_id) VALUES (%s, %s)', [7, self.group.pk])
+            cursor.execute('INSERT INTO auth_user_user_permissions (user_id, permission_id) VALUES (%s, %s)', [7, self.permission.pk])
+
+    def test_copy_auth_users(self):
+        """
+        test the users keep their id, password, groups and permissions
+        """
+        migration.copy_auth_users(apps, connection.schema_editor())
+
+        self.assertEqual(list(User.objects.order_by('pk').values_list('pk', 'username')), [(3, 'david'), (7, 'admin')])
+        david = User.objects.get(pk=3)
+        self.assertEqual(david.password, 'pbkdf2_sha256$1$salt$hash')
+        self.assertEqual((david.first_name, david.last_name, david.email), ('david', 'calob', 'david@example.com'))
+        admin = User.objects.get(pk=7)
+        self.assertTrue(admin.is_superuser and admin.is_staff)
+        self.assertEqual(list(admin.groups.all()), [self.group])
+        self.assertEqual(list(admin.user_permissions.all()), [self.permission])
+
+    def test_duplicate_emails_named(self):
+        """
+        test the migration stops before changing anything when auth_user rows share an email, whatever its case
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO auth_user VALUES (%s, %s, NULL, %s, %s, %s, %s, %s, %s, %s, %s)',
+                (9, '!', False, 'david2', '', '', 'David@Example.com', False, True, '2024-02-11 08:00:00'),
+            )
+
+        with self.assertRaises(RuntimeError) as error:
+            migration.check_duplicate_emails(apps, connection.schema_editor())
+
+        self.assertIn("2 auth_user rows share an email address", str(error.exception))
+        self.assertIn("id 3, username 'david': david@example.com", str(error.exception))
+        self.assertIn("id 9, username 'david2': David@Example.com", str(error.exception))
+        self.assertNotIn('admin', str(error.exception))
+
+    def test_no_auth_user_table(self):
+        """
+        test nothing is copied in a database created with accounts.CustomUser
+        """
+        with connection.cursor() as cursor:
+            for table in ['auth_user', 'auth_user_groups', 'auth_user_user_permissions']:
+                cursor.execute(f'DROP TABLE {table}')
+
+        migration.check_duplicate_emails(apps, connection.schema_editor())
+        migration.copy_auth_users(apps, connection.schema_editor())
+
+        self.assertFalse(User.objects.exists())
+
+
+### test the emails are stored in lower case
+class NormalizeEmailsTest(TestCase):
+    def test_lower_emails(self):
+        """
+        test the stored emails are lower cased, the views look them up with email_iexact()
+        """
+        User.objects.create_user(username='david', email='David@Example.com')
+        User.objects.create_user(username='admin', email='admin@example.com')
+        User.objects.create_user(username='nomail')
+
+        normalize = import_module('accounts.migrations.0005_normalize_emails')
+        normalize.lower_emails(apps, connection.schema_editor())
+
+        self.assertEqual(
+            list(User.objects.order_by('username').values_list('username', 'email')),
+            [('admin', 'admin@example.com'), ('david', 'david@example.com'), ('nomail', '')],
+        )
@@ -1,7 +1,11 @@
 from django.test import TestCase
-from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
 from django.db.utils import IntegrityError
-from accounts.models import CustomUser
+from accounts.models import CustomUser, email_iexact
+from unittest import skipUnless
+
+User = get_user_model()
 
 class CustomUserModelTest(TestCase):
 
@@ -17,13 +21,13 @@ class CustomUserModelTest(TestCase):
         """
         setup new user credential
         """
-        test_user = User.objects.create_user(username=CustomUserModelTest.get_user_data()['username'], email=CustomUserModelTest.get_user_data()['email'], password=CustomUserModelTest.get_user_data()['password'])
-        CustomUser.objects.create(user=test_user, email=CustomUserModelTest.get_user_data()['email'], username=CustomUserModelTest.get_user_data()['username'])
+        User.objects.create_user(username=CustomUserModelTest.get_user_data()['username'], email=CustomUserModelTest.get_user_data()['email'], password=CustomUserModelTest.get_user_data()['password'])
 
     def test_create_custom_user(self):
         """
-        test create a user correctly
+        test create a user correctly, CustomUser is the user model
         """
+        self.assertIs(User, CustomUser)
         # find the user
         custom_user = CustomUser.objects.get(username=CustomUserModelTest.get_user_data()['username'])
         # return object if it is created successfully 
@@ -65,6 +69,31 @@ class CustomUserModelTest(TestCase):
             self.assertIn('unique constraint', error_message.lower())
             self.assertIn('email', error_message.lower())
 
+    def test_custom_user_email_unique_ignore_case(self):
+        """
+        test the email of CustomUser is unique whatever the case, except the empty one
+        """
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='test2', email='TEST@example.com', password='anotherpassword')
 
+        User.objects.create_user(username='test3', password='anotherpassword')
+        User.objects.create_user(username='test4', password='anotherpassword')
+        self.assertEqual(User.objects.filter(email='').count(), 2)
 
+    def test_email_iexact_lookup(self):
+        """
+        test the case insensitive email lookup
+        """
+        self.assertEqual(User.objects.get(email_iexact('Test@Example.com')).username, 'test')
+        self.assertEqual(User.objects.get(email_iexact('TEST@example.com')).username, 'test')
 
+    @skipUnless(connection.vendor == 'sqlite', 'the query plan is checked on sqlite')
+    def test_email_lookup_use_lower_index(self):
+        """
+        test the email lookups are answered by the lower(email) index, not a table scan
+        """
+        sql, params = User.objects.filter(email_iexact('Test@Example.com')).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('accounts_user_email_lower_idx', plan)
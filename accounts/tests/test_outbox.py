@@ -0,0 +1,208 @@
+import math
+import time
+from io import StringIO
+from unittest.mock import patch
+from datetime import timedelta
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import OutboundEmail
+from accounts.outbox import enqueue_mail, drain_outbox
+from accounts.tests.smtp_server import StandInSMTPServer, smtp_settings
+
+User = get_user_model()
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """
+    a mail backend that is always down
+    """
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('mail server is down')
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+    """
+    a mail backend that cannot even connect to the mail server
+    """
+    def open(self):
+        raise ConnectionRefusedError('connection refused')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('sent without a connection')
+
+
+### test the outbox queue
+class OutboxTest(TestCase):
+    def queue(self, count=1):
+        for i in range(count):
+            enqueue_mail('Subject', f'body {i}', 'contact@infinite.com', [f'user{i}@example.com'])
+
+    def test_enqueue_mail(self):
+        """
+        test queue an email without sending it
+        """
+        self.queue()
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(email.to, 'user0@example.com')
+
+    def test_drain_outbox(self):
+        """
+        test drain the outbox send every queued email once
+        """
+        self.queue(3)
+
+        stats = drain_outbox()
+
+        self.assertEqual(stats, {'sent': 3, 'retried': 0, 'dead': 0})
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.SENT).exists())
+        self.assertEqual(drain_outbox(), {'sent': 0, 'retried': 0, 'dead': 0})
+
+    def test_drain_outbox_reuse_one_smtp_connection(self):
+        """
+        test a batch is sent over a single SMTP connection
+        """
+        self.queue(5)
+
+        with StandInSMTPServer() as server, smtp_settings(server):
+            drain_outbox()
+
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(len(server.messages), 5)
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.test_outbox.FailingEmailBackend', OUTBOX_RETRY_BACKOFF=30)
+    def test_failed_email_retried_with_backoff(self):
+        """
+        test a failed email is rescheduled with exponential backoff
+        """
+        self.queue()
+
+        self.assertEqual(drain_outbox(max_attempts=3), {'sent': 0, 'retried': 1, 'dead': 0})
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, 'mail server is down')
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+        # not due yet
+        self.assertEqual(drain_outbox(max_attempts=3), {'sent': 0, 'retried': 0, 'dead': 0})
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.test_outbox.FailingEmailBackend')
+    def test_email_dead_lettered_after_max_attempts(self):
+        """
+        test an email that keeps failing ends in the dead letter status
+        """
+        self.queue()
+
+        for _ in range(3):
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            stats = drain_outbox(max_attempts=3)
+
+        self.assertEqual(stats, {'sent': 0, 'retried': 0, 'dead': 1})
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.DEAD)
+        self.assertEqual(email.attempts, 3)
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.test_outbox.UnreachableEmailBackend', OUTBOX_RETRY_BACKOFF=30)
+    def test_unreachable_server_fails_the_batch(self):
+        """
+        test the claimed emails are retried with backoff, then dead lettered, when the mail server cannot be reached
+        """
+        self.queue(2)
+
+        self.assertEqual(drain_outbox(max_attempts=2), {'sent': 0, 'retried': 2, 'dead': 0})
+        for email in OutboundEmail.objects.all():
+            self.assertEqual(email.status, OutboundEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, 'connection refused')
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox(max_attempts=2), {'sent': 0, 'retried': 0, 'dead': 2})
+
+    def test_expired_claim_is_sent_again(self):
+        """
+        test an email claimed by a crashed worker is picked up after its lease
+        """
+        self.queue()
+        OutboundEmail.objects.update(status=OutboundEmail.SENDING, next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(drain_outbox()['sent'], 1)
+
+    def test_send_queued_mail_command(self):
+        """
+        test the management command drain the whole outbox
+        """
+        self.queue(3)
+
+        call_command('send_queued_mail', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_send_queued_mail_loop_survives_errors(self):
+        """
+        test the worker logs a failed drain and keeps polling
+        """
+        self.queue()
+        calls = []
+
+        def drain(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise DatabaseError('database is locked')
+            if len(calls) == 2:
+                return drain_outbox(**kwargs)
+            raise KeyboardInterrupt
+
+        with patch('accounts.management.commands.send_queued_mail.drain_outbox', drain), \
+                self.assertLogs('accounts.management.commands.send_queued_mail', 'ERROR') as logs, \
+                self.assertRaises(KeyboardInterrupt):
+            call_command('send_queued_mail', loop=True, interval=0, stdout=StringIO())
+
+        self.assertIn('database is locked', logs.output[0])
+        self.assertEqual(len(mail.outbox), 1)
+
+
+### test the reset endpoint does not wait for the mail server
+# (the same email is reset many times, more than the rate limits allow)
+@override_settings(RATELIMIT_ENABLED=False)
+class PasswordResetLatencyTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='david@123', email='david@example.com', password='Test#12345')
+
+    def test_reset_latency_independent_of_smtp_speed(self):
+        """
+        test p99 latency of the reset endpoint stay below the delay of a slow SMTP server
+        """
+        smtp_delay = 0.5
+        client = Client()
+        timings = []
+
+        with StandInSMTPServer(connect_delay=smtp_delay) as server, smtp_settings(server):
+            for _ in range(20):
+                start = time.perf_counter()
+                response = client.post(reverse('password_reset_request'), {'email': 'david@example.com'})
+                timings.append(time.perf_counter() - start)
+                self.assertRedirects(response, reverse('password_reset_done'))
+
+            timings.sort()
+            p99 = timings[math.ceil(len(timings) * 0.99) - 1]
+            self.assertLess(p99, smtp_delay)
+            self.assertEqual(server.connections, 0)
+
+            # the worker delivers everything later over one connection
+            drain_outbox()
+
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(len(server.messages), 20)
@@ -0,0 +1,180 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from accounts import hashing
+from accounts.models import OutboundEmail
+from accounts.ratelimit import CacheBackend, LocalMemoryBackend, parse_rate, ratelimit_stats, take_token
+
+User = get_user_model()
+
+RULES = {
+    'login': {'ip': '20/m', 'username': '3/m'},
+    'password_reset_request': {'ip': '20/m', 'email': '2/h'},
+}
+
+
+### test the token bucket
+class TokenBucketTest(TestCase):
+    def test_burst_then_refill(self):
+        """
+        test a bucket allow a burst of its size, then one request per refill interval
+        """
+        backend = LocalMemoryBackend()
+        rate = parse_rate('3/m')
+
+        self.assertEqual([take_token(backend, 'key', rate, now=0) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(take_token(backend, 'key', rate, now=0), 20)
+        self.assertAlmostEqual(take_token(backend, 'key', rate, now=15), 5)
+        self.assertEqual(take_token(backend, 'key', rate, now=20), 0)
+        self.assertEqual(take_token(backend, 'other', rate, now=20), 0)
+
+    def test_cache_backend_concurrent_takes(self):
+        """
+        test workers racing on a shared bucket do not spend more tokens than it holds
+        """
+        cache.clear()
+        self.addCleanup(cache.clear)
+        rate = parse_rate('5/m')
+        results = []
+        read = CacheBackend.get
+
+        def slow_read(backend, key):
+            # a cache round trip, the other workers run meanwhile
+            value = read(backend, key)
+            time.sleep(0.001)
+            return value
+
+        def take():
+            results.append(take_token(CacheBackend(), 'race', rate))
+
+        threads = [threading.Thread(target=take) for _ in range(20)]
+        with patch.object(CacheBackend, 'get', slow_read):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results.count(0), 5)
+
+    def test_cache_backend_locked_bucket(self):
+        """
+        test a bucket locked by another worker limits the request without spending a token
+        """
+        cache.clear()
+        self.addCleanup(cache.clear)
+        backend = CacheBackend()
+        backend.lock_attempts = 2
+        rate = parse_rate('3/m')
+
+        cache.add('ratelimit-lock:key', 1)
+        self.assertEqual(take_token(backend, 'key', rate, now=0), 20)
+        cache.delete('ratelimit-lock:key')
+
+        self.assertEqual([take_token(backend, 'key', rate, now=0) for _ in range(3)], [0, 0, 0])
+
+    def test_prune_full_buckets(self):
+        """
+        test the buckets back to full are dropped from memory
+        """
+        backend = LocalMemoryBackend()
+        take_token(backend, 'key', parse_rate('3/s'), now=time.time() - 10)
+
+        backend.prune()
+
+        self.assertIsNone(backend.get('key'))
+
+
+### test the rate limit middleware
+@override_settings(RATELIMIT_RULES=RULES)
+class RateLimitMiddlewareTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='david@123', email='david@example.com', password='Test#12345')
+        self.client = Client()
+
+    def login(self, username='david@123', password='wrong'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password})
+
+    def test_login_limited_per_username(self):
+        """
+        test the 4th login of a username in a minute get 429, other usernames still pass
+        """
+        statuses = [self.login(username='David@123').status_code for _ in range(4)]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        response = self.login()
+        self.assertEqual(response['Retry-After'], '20')
+        self.assertEqual(self.login(username='sara@123').status_code, 200)
+        self.assertGreaterEqual(ratelimit_stats()['login']['rejected_by']['username'], 2)
+
+    def test_password_reset_limited_per_email(self):
+        """
+        test the reset emails of one address are limited, no email is queued once rejected
+        """
+        url = reverse('password_reset_request')
+        statuses = [self.client.post(url, {'email': 'david@example.com'}).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [302, 302, 429])
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_get_is_not_limited(self):
+        """
+        test only the POST requests take tokens
+        """
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+
+    @override_settings(RATELIMIT_RULES={'check_availability': {'ip': '3/m'}}, RATELIMIT_METHODS={'check_availability': ['GET']})
+    def test_availability_check_limited_per_ip(self):
+        """
+        test the availability check (it tells whether an email has an account) is limited per IP on GET
+        """
+        url = reverse('check_availability')
+        statuses = [self.client.get(url, {'email': f'user{i}@example.com'}).status_code for i in range(4)]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertGreaterEqual(ratelimit_stats()['check_availability']['rejected_by']['ip'], 1)
+
+    @override_settings(RATELIMIT_ENABLED=False)
+    def test_disabled(self):
+        """
+        test nothing is limited with RATELIMIT_ENABLED off
+        """
+        self.assertEqual({self.login().status_code for _ in range(5)}, {200})
+
+    @override_settings(RATELIMIT_BACKEND='cache')
+    def test_cache_backend_shared_between_workers(self):
+        """
+        test the cache backend share the buckets between middleware instances (workers)
+        """
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        statuses = [Client().post(reverse('login'), {'username': 'david@123', 'password': 'wrong'}).status_code for _ in range(4)]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    @override_settings(RATELIMIT_RULES={'login': {'ip': '10/m'}})
+    def test_attack_cost_stay_flat(self):
+        """
+        load test: a credential stuffing burst from one IP only hash the passwords of the allowed
+        requests, the rejected ones are answered without hashing nor query
+        """
+        hashing.get_pool().stats.clear()
+        before = ratelimit_stats().get('login', {'allowed': 0, 'rejected': 0})
+
+        allowed = [self.login(username=f'user{i}').status_code for i in range(10)]
+        with self.assertNumQueries(0):
+            rejected = [self.login(username=f'user{i}').status_code for i in range(10, 110)]
+
+        self.assertEqual(set(allowed), {200})
+        self.assertEqual(set(rejected), {429})
+        self.assertEqual(hashing.hashing_stats()['make']['calls'], 10)
+        stats = ratelimit_stats()['login']
+        self.assertEqual(stats['allowed'] - before['allowed'], 10)
+        self.assertEqual(stats['rejected'] - before['rejected'], 100)
@@ -6,7 +6,9 @@ from accounts.views import (
     logout_view,
     password_reset_request,
     password_reset_confirm,
-    password_reset_done
+    password_reset_done,
+    check_availability_view,
+    export_users_view
 )
 
 class TestUrls(SimpleTestCase):
@@ -14,6 +16,14 @@ class TestUrls(SimpleTestCase):
         url = reverse('register')
         self.assertEqual(resolve(url).func, register_view)
 
+    def test_check_availability_endpoint(self):
+        url = reverse('check_availability')
+        self.assertEqual(resolve(url).func, check_availability_view)
+
+    def test_export_users_endpoint(self):
+        url = reverse('export_users')
+        self.assertEqual(resolve(url).func, export_users_view)
+
     def test_login_endpoint(self):
         url = reverse('login')
         self.assertEqual(resolve(url).func, login_view)
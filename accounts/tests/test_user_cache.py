@@ -0,0 +1,148 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.urls import reverse
+
+from accounts.user_cache import UserCache, user_cache
+
+User = get_user_model()
+
+
+### test the cached users of the authentication backend
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', USER_CACHE_ENABLED=True)
+class UserCacheTest(TestCase):
+    @classmethod
+    def get_user_data(cls):
+        return {
+            'username': 'david@123',
+            'password': 'Test#12345',
+            'email': 'david@example.com',
+        }
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(**UserCacheTest.get_user_data())
+        self.client = Client()
+        self.client.login(username=UserCacheTest.get_user_data()['username'], password=UserCacheTest.get_user_data()['password'])
+
+    def test_home_page_without_query(self):
+        """
+        test the pages after the first one do not load the user (nor the session) from the database
+        """
+        self.client.get(reverse('home'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_save_invalidate(self):
+        """
+        test saving the user drop the cached copy
+        """
+        self.client.get(reverse('home'))
+        self.user.first_name = 'david'
+        self.user.save()
+
+        response = self.client.get(reverse('home'))
+
+        self.assertEqual(response.wsgi_request.user.first_name, 'david')
+
+    def test_password_reset_invalidate(self):
+        """
+        test the sessions of a user are logged out once the password is reset
+        """
+        self.client.get(reverse('home'))
+        # the login changed last_login, which is part of the token
+        self.user.refresh_from_db()
+        token = default_token_generator.make_token(self.user)
+
+        Client().post(
+            reverse('password_reset_confirm', kwargs={'uidb64': str(self.user.pk), 'token': token}),
+            {'new_password1': 'Test#54321', 'new_password2': 'Test#54321'},
+        )
+
+        self.assertEqual(self.client.get(reverse('home')).status_code, 302)
+
+    def test_logout_invalidate(self):
+        """
+        test logging out drop the cached copy
+        """
+        self.client.get(reverse('home'))
+
+        self.client.get(reverse('logout'))
+
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+    def test_cached_user_is_a_copy(self):
+        """
+        test a change made by one request is not seen by the next one
+        """
+        user_cache.set(self.user.pk, self.user, user_cache.version(self.user.pk))
+        user_cache.get(self.user.pk).first_name = 'changed'
+
+        self.assertEqual(user_cache.get(self.user.pk).first_name, '')
+
+    @override_settings(USER_CACHE_SIZE=2)
+    def test_least_recently_used_evicted(self):
+        """
+        test the least recently used user is dropped when the cache is full
+        """
+        users = [User.objects.create_user(username=f'user{i}') for i in range(3)]
+        user_cache.set(users[0].pk, users[0], user_cache.version(users[0].pk))
+        user_cache.set(users[1].pk, users[1], user_cache.version(users[1].pk))
+        user_cache.get(users[0].pk)
+        user_cache.set(users[2].pk, users[2], user_cache.version(users[2].pk))
+
+        self.assertIsNone(user_cache.get(users[1].pk))
+        self.assertIsNotNone(user_cache.get(users[0].pk))
+
+    @override_settings(USER_CACHE_TTL=-1)
+    def test_expired(self):
+        """
+        test an expired user is loaded again
+        """
+        user_cache.set(self.user.pk, self.user, user_cache.version(self.user.pk))
+
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+    def test_invalidated_while_loading(self):
+        """
+        test a user changed between its load and `set` is not served from the cache
+        """
+        version = user_cache.version(self.user.pk)
+        loaded = User.objects.get(pk=self.user.pk)
+        # a password reset in another worker, while this one was loading the user
+        self.user.set_password('Test#54321')
+        self.user.save()
+
+        user_cache.set(self.user.pk, loaded, version)
+
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+    def test_evicted_version(self):
+        """
+        test a copy stored before its version was evicted from the shared cache is not served
+        """
+        key = f'user_cache:{self.user.pk}:version'
+        cache.delete(key)
+        user_cache.set(self.user.pk, self.user, user_cache.version(self.user.pk))
+        # a password reset in another worker, then the version culled from the shared cache
+        UserCache().invalidate(self.user.pk)
+        cache.delete(key)
+
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+    @override_settings(USER_CACHE_ENABLED=False)
+    def test_disabled(self):
+        """
+        test nothing is kept without a shared cache, every request loads the user
+        """
+        user_cache.set(self.user.pk, self.user, user_cache.version(self.user.pk))
+
+        self.assertIsNone(user_cache.get(self.user.pk))
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('home'))
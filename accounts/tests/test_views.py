@@ -1,5 +1,7 @@
-from django.test import TestCase, Client
-from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.db import connection
 
 from django.urls import reverse
 from django.contrib.auth.forms import AuthenticationForm
@@ -8,6 +10,27 @@ from django.core import mail
 
 from django.contrib.messages import get_messages
 from accounts.forms import NewUserForm
+from accounts.models import OutboundEmail
+from accounts.availability import availability
+from accounts.outbox import drain_outbox
+from accounts import urls, async_urls
+
+User = get_user_model()
+
+# queries each endpoint may run, the @query_budget of its sync and async views.
+# a view needing more queries must raise its budget here too. with the db session store a flushed
+# session costs 2 queries (SELECT then DELETE), after the session and the user are loaded
+QUERY_BUDGETS = {
+    'login': 10,
+    'register': 10,
+    'check_availability': 1,
+    'logout': 4,
+    # streamed after the view and the middlewares returned, a budget would count nothing
+    'export_users': None,
+    'password_reset_request': 2,
+    'password_reset_confirm': 2,
+    'password_reset_done': 0,
+}
 
 
 ### test register view
@@ -125,11 +148,12 @@ class LogoutViewTest(TestCase):
             'password': 'Test#12345',
         }
     
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """
-        setup new user credential
+        setup new user credential, once for the test case
         """
-        self.user = User.objects.create_user(username=LogoutViewTest.get_user_data()['username'], password=LogoutViewTest.get_user_data()['password'])
+        cls.user = User.objects.create_user(username=cls.get_user_data()['username'], password=cls.get_user_data()['password'])
 
     def test_logout_view(self):
         """
@@ -153,11 +177,12 @@ class PasswordResetRequestTest(TestCase):
             'password': 'Test#12345',
         }
     
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """
-        setup new user credential
+        setup new user credential, once for the test case
         """
-        User.objects.create_user(username=PasswordResetRequestTest.get_user_data()['username'], email=PasswordResetRequestTest.get_user_data()['email'], password=PasswordResetRequestTest.get_user_data()['password'])
+        User.objects.create_user(username=cls.get_user_data()['username'], email=cls.get_user_data()['email'], password=cls.get_user_data()['password'])
 
     def test_password_reset_request_with_valid_email(self):
         """
@@ -167,9 +192,24 @@ class PasswordResetRequestTest(TestCase):
         response = client.post(reverse('password_reset_request'), {'email': PasswordResetRequestTest.get_user_data()['email']})
         
         self.assertRedirects(response, reverse('password_reset_done'))
+        # the email is queued, not sent during the request
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.PENDING).count(), 1)
+
+        drain_outbox()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject, 'Password Reset Request')
 
+    def test_password_reset_request_ignore_email_case(self):
+        """
+        test reset password view find the user whatever the case of the email
+        """
+        client = Client()
+        response = client.post(reverse('password_reset_request'), {'email': 'David@Example.com'})
+
+        self.assertRedirects(response, reverse('password_reset_done'))
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
     def test_password_reset_request_with_invalid_email(self):
         """
         test reset password view with invalid email
@@ -191,13 +231,14 @@ class PasswordResetConfirmTestCase(TestCase):
             'password': 'Test#12345',
         }
     
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """
-        setup new user credential
+        setup new user credential, once for the test case
         """
-        self.user = User.objects.create_user(username=PasswordResetConfirmTestCase.get_user_data()['username'], email=PasswordResetConfirmTestCase.get_user_data()['email'], password=PasswordResetConfirmTestCase.get_user_data()['password'])
-        self.token = default_token_generator.make_token(self.user)
-        self.uidb64 = str(self.user.pk)
+        cls.user = User.objects.create_user(username=cls.get_user_data()['username'], email=cls.get_user_data()['email'], password=cls.get_user_data()['password'])
+        cls.token = default_token_generator.make_token(cls.user)
+        cls.uidb64 = str(cls.user.pk)
 
     def test_password_reset_confirm_get_request_with_valid_token(self):
         """
@@ -258,3 +299,55 @@ class PasswordResetDoneTest(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'password-reset/password_reset_done.html')
+
+### test the query budgets of the endpoints
+@override_settings(RATELIMIT_ENABLED=False)
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='david@123', email='david@example.com', password='Test#12345')
+
+    def setUp(self):
+        # a missing filter is built by a thread, outside of the test transaction
+        availability.rebuild()
+
+    def test_every_endpoint_has_its_budget(self):
+        """
+        test the sync and async view of every endpoint have the budget pinned in QUERY_BUDGETS
+        """
+        for urlconf in [urls, async_urls]:
+            budgets = {pattern.name: getattr(pattern.callback, 'query_budget', None) for pattern in urlconf.urlpatterns}
+            self.assertEqual(budgets, QUERY_BUDGETS, urlconf.__name__)
+
+    def test_endpoints_within_budget(self):
+        """
+        test the requests of every endpoint, cold caches included, run at most the queries of their budget
+        """
+        logged_in = Client()
+        logged_in.force_login(self.user)
+        confirm_url = reverse('password_reset_confirm', kwargs={
+            'uidb64': self.user.pk, 'token': default_token_generator.make_token(self.user),
+        })
+        new_user = {
+            'first_name': 'new', 'last_name': 'user', 'username': 'newuser', 'email': 'new@example.com',
+            'password1': 'Test#12345', 'password2': 'Test#12345',
+        }
+        requests = [
+            ('login', lambda: Client().get(reverse('login'))),
+            ('login', lambda: Client().post(reverse('login'), {'username': 'david@123', 'password': 'wrong'})),
+            ('login', lambda: Client().post(reverse('login'), {'username': 'david@123', 'password': 'Test#12345'})),
+            ('register', lambda: Client().get(reverse('register'))),
+            ('register', lambda: Client().post(reverse('register'), new_user)),
+            ('register', lambda: Client().post(reverse('register'), {**new_user, 'email': 'invalid'})),
+            ('check_availability', lambda: Client().get(reverse('check_availability'), {'username': 'david@123', 'email': 'x@example.com'})),
+            ('password_reset_request', lambda: Client().get(reverse('password_reset_request'))),
+            ('password_reset_request', lambda: Client().post(reverse('password_reset_request'), {'email': 'david@example.com'})),
+            ('password_reset_confirm', lambda: Client().get(confirm_url)),
+            ('password_reset_done', lambda: Client().get(reverse('password_reset_done'))),
+            ('logout', lambda: logged_in.get(reverse('logout'))),
+            ('password_reset_confirm', lambda: Client().post(confirm_url, {'new_password1': 'Test@1234x', 'new_password2': 'Test@1234x'})),
+        ]
+        for name, request in requests:
+            with self.subTest(name), CaptureQueriesContext(connection) as queries:
+                request()
+            self.assertLessEqual(len(queries), QUERY_BUDGETS[name], f'{name}: ' + '\n'.join(q['sql'] for q in queries))
@@ -1,10 +1,12 @@
 from django.urls import path
-from .views import login_view, register_view, logout_view, password_reset_request, password_reset_confirm, password_reset_done
+from .views import login_view, register_view, logout_view, password_reset_request, password_reset_confirm, password_reset_done, check_availability_view, export_users_view
 
 urlpatterns = [
     path("login", login_view, name='login'),
     path("register", register_view, name='register'),
+    path("register/check", check_availability_view, name='check_availability'),
     path("logout", logout_view, name='logout'),
+    path("users/export", export_users_view, name='export_users'),
     path('password-reset/', password_reset_request, name='password_reset_request'),
     path('password-reset/confirm/<uidb64>/<token>/', password_reset_confirm, name='password_reset_confirm'),
     path('password-reset-done', password_reset_done, name='password_reset_done'),
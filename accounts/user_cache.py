@@ -0,0 +1,124 @@
+"""
+Cache of the users loaded by the authentication middleware.
+
+`CachedModelBackend.get_user` runs on every request of a logged in user, the
+users it loads are kept in memory (LRU, at most `USER_CACHE_SIZE` users for
+`USER_CACHE_TTL` seconds) so a page view does not query the users table.
+
+Each user has a version in the django cache, a random nonce: saving or deleting
+a user and logging out replace it, which drops the copies kept by every worker
+sharing that cache. The version is read before the user is loaded, so a user
+changed in between is stored under the old version and dropped at the next
+request. A version evicted from the cache is seeded again with a new nonce,
+so it never matches the copies stored before the eviction.
+
+The versions are only seen by every worker with a shared cache, so the cache
+is off (`USER_CACHE_ENABLED`) with the per-process locmem cache.
+"""
+import copy
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+def _version_key(user_id):
+    return f'user_cache:{user_id}:version'
+
+
+def _nonce():
+    return secrets.token_hex(8)
+
+
+class UserCache:
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def enabled(self):
+        return getattr(settings, 'USER_CACHE_ENABLED', True)
+
+    def version(self, user_id):
+        """
+        the current version of the user, read it before loading the user to store with `set`
+        """
+        key = _version_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            # missing or evicted, the first worker to seed it wins
+            cache.add(key, _nonce(), timeout=None)
+            version = cache.get(key)
+        return version
+
+    def get(self, user_id):
+        """
+        a copy of the cached user, or None when it is missing, expired or outdated
+        """
+        if not self.enabled():
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+        # the shared cache is read outside of the lock, the other threads do not wait on it
+        current = self.version(user_id)
+        version, expires_at, user = entry
+        with self._lock:
+            if expires_at < time.monotonic() or version != current:
+                if self._entries.get(user_id) is entry:
+                    del self._entries[user_id]
+                self.stats['misses'] += 1
+                return None
+            if user_id in self._entries:
+                self._entries.move_to_end(user_id)
+            self.stats['hits'] += 1
+        # every request gets its own instance, changes made by a view stay in that request
+        return copy.copy(user)
+
+    def set(self, user_id, user, version):
+        """
+        keep the user, loaded after reading its `version()`
+        """
+        if not self.enabled():
+            return
+        entry = (version, time.monotonic() + getattr(settings, 'USER_CACHE_TTL', 300), copy.copy(user))
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > getattr(settings, 'USER_CACHE_SIZE', 1000):
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, user_id):
+        cache.set(_version_key(user_id), _nonce(), timeout=None)
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_saved_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        user_cache.invalidate(user.pk)
@@ -1,18 +1,27 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth.forms import AuthenticationForm
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.tokens import default_token_generator
 from django.urls import reverse
 from django.contrib.auth.forms import SetPasswordForm
-from django.contrib.auth.models import User
-from django.core.mail import send_mail
+from django.contrib.auth import get_user_model
 
 from .forms import NewUserForm, CustomPasswordResetForm
+from .availability import availability
+from .export import FORMATS, iter_export
+from .models import email_iexact
+from .outbox import enqueue_mail
 from home.views import home_page_view, index_view
+from registration import metrics
+from registration.query_budget import query_budget
 
+User = get_user_model()
+
+@query_budget(10)
 def login_view(request):
     """
     login view has 2 requests, one is the get request and when it happens:
@@ -23,20 +32,22 @@ def login_view(request):
     if request.method == 'POST':
         login_form = AuthenticationForm(request=request, data=request.POST)
         if login_form.is_valid():
-            username = login_form.cleaned_data.get('username')
-            password = login_form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
+            # the form already authenticated the user, do not hash the password a second time
+            user = login_form.get_user()
             if user is not None:
                 login(request, user)
+                metrics.inc('auth_logins_total', result='success')
                 messages.success(request, 'logged in successfully')
                 return redirect(home_page_view)
         else:
+          metrics.inc('auth_logins_total', result='failure')
           messages.error(request, 'Password and/or username are wrong. Please enter the correct information')  
     elif request.method == 'GET':
         login_form = AuthenticationForm
     return render(request, 'accounts/login.html', {'login_form': login_form})
 
 
+@query_budget(10)
 def register_view(request):
     """
     register view is to register/create new user/s in the application
@@ -45,6 +56,8 @@ def register_view(request):
         register_form = NewUserForm(request.POST)
         if register_form.is_valid():
             user = register_form.save()
+            metrics.inc('auth_registrations_total')
+            availability.add(user.username, user.email)
             login(request, user)
             messages.success(request, 'Registration is successful')
             return redirect(home_page_view)
@@ -60,6 +73,56 @@ def register_view(request):
     return render(request, 'accounts/register.html', {'register_form': register_form})
 
 
+@query_budget(1)
+def check_availability_view(request):
+    """
+    live check of the register form, tells if the `username` and/or `email` query parameters are free.
+    most answers come from an in memory bloom filter, without any database query
+    """
+    username = request.GET.get('username', '').strip()
+    email = request.GET.get('email', '').strip()
+    if not (username or email):
+        return JsonResponse({'error': 'pass a username and/or an email'}, status=400)
+
+    username_available, email_available = availability.check(username, email)
+    data = {}
+    if username:
+        data['username'] = {'value': username, 'available': username_available}
+    if email:
+        data['email'] = {'value': email, 'available': email_available}
+    return JsonResponse(data)
+
+
+def export_users_response(request, export):
+    """
+    the streamed file of the export views, `export` is `iter_export` or `aiter_export`
+    """
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in FORMATS:
+        return JsonResponse({'error': f'format must be one of {", ".join(FORMATS)}'}, status=400)
+    compress = request.GET.get('gzip') == '1'
+
+    response = StreamingHttpResponse(
+        export(file_format, compress),
+        content_type='application/gzip' if compress else FORMATS[file_format],
+    )
+    filename = f'users.{file_format}.gz' if compress else f'users.{file_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# no query budget: the users are read while the response is sent, after the view and the middlewares returned
+@staff_member_required
+def export_users_view(request):
+    """
+    download every user, for the staff only. `?format=csv` (default) or `?format=jsonl`, and `?gzip=1`
+    to compress it. the file is streamed while the users are read, the memory used stays the same
+    whatever the number of users
+    """
+    return export_users_response(request, iter_export)
+
+
+@query_budget(4)
 @login_required
 def logout_view(request):
     """
@@ -68,6 +131,7 @@ def logout_view(request):
     logout(request)
     return redirect(index_view)
 
+@query_budget(2)
 def password_reset_request(request):
     """
     to reset the password if the user forget it by sending email of the confirm link for the user
@@ -77,17 +141,17 @@ def password_reset_request(request):
         form = CustomPasswordResetForm(request.POST)
         if form.is_valid():
             email = form.cleaned_data['email']
-            user = User.objects.get(email=email)
+            user = User.objects.get(email_iexact(email))
             token = default_token_generator.make_token(user)
 
             reset_url = request.build_absolute_uri(reverse('password_reset_confirm', kwargs={'uidb64': user.pk, 'token': token}))
+            # the email is queued and sent by the `send_queued_mail` worker, so the request never waits on SMTP
             try:
-                send_mail(
+                enqueue_mail(
                     'Password Reset Request',
                     f'Click the link below to reset your password:\n\n{reset_url}',
                     'contact@infinite.com',
                     [email],
-                    fail_silently=True
                 )
             except Exception as e:
                 return JsonResponse({
@@ -100,6 +164,7 @@ def password_reset_request(request):
     return render(request, 'password-reset/password_reset_request.html', {'form': form})
 
 
+@query_budget(2)
 def password_reset_confirm(request, uidb64, token):
     """
     after the user receive the email from forget password button and check their is no error and authenticated
@@ -123,6 +188,7 @@ def password_reset_confirm(request, uidb64, token):
         messages.error(request, 'Invalid reset link.')
         return redirect('password_reset_request')
     
+@query_budget(0)
 def password_reset_done(request):
     """
     small view to show the user that the email is sent
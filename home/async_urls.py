@@ -0,0 +1,14 @@
+from django.urls import path
+
+
+from .async_views import (
+    index_view,
+    home_page_view,
+    )
+from .views import profiling_view
+
+urlpatterns = [
+    path("", index_view, name='index'),
+    path('home', home_page_view, name='home'),
+    path('profiling', profiling_view, name='profiling'),
+]
@@ -0,0 +1,66 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import render
+from django.urls import reverse
+
+from registration.query_budget import query_budget
+
+from .page_cache import cache_anonymous_page
+
+
+async def arender(request, template_name, context=None, status=None):
+    """
+    render a template from an async view.
+    the user and the session are loaded first, so the template never hits the database from the event loop
+    """
+    request.user = await request.auser()
+    # sessions have no async api in django 5.0, load it with a single hop
+    await sync_to_async(request.session.keys)()
+    return render(request, template_name, context, status=status)
+
+
+def alogin_required(view_func):
+    """
+    async version of the `login_required` decorator
+    """
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        user = await request.auser()
+        if user.is_authenticated:
+            return await view_func(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+    return _wrapped_view
+
+
+def astaff_member_required(view_func):
+    """
+    async version of the `staff_member_required` decorator
+    """
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        user = await request.auser()
+        if user.is_active and user.is_staff:
+            return await view_func(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path(), reverse('admin:login'))
+    return _wrapped_view
+
+
+@query_budget(4)
+@cache_anonymous_page
+async def index_view(request):
+    """
+    landing page when user navigates into the website
+    """
+    return await arender(request, "home/index.html")
+
+
+@query_budget(4)
+@alogin_required
+async def home_page_view(request):
+    """
+    home page view when user logged in
+    """
+    return await arender(request, "home/home.html")
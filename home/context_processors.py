@@ -0,0 +1,48 @@
+import functools
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.template.utils import get_app_template_dirs
+
+
+@functools.cache
+def templates_fingerprint():
+    """
+    hash of the templates of the project, a deploy that changes one of them changes the hash
+    (and so the keys of the cached fragments)
+    """
+    digest = hashlib.sha256()
+    for directory in get_app_template_dirs('templates'):
+        for path in sorted(Path(directory).rglob('*.html')):
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def current_release():
+    """
+    RELEASE, or else the hash of the templates
+    """
+    return settings.RELEASE or templates_fingerprint()
+
+
+def nav_variant(request):
+    """
+    the navbar of base.html: transparent on the landing page, with the links on the dashboard
+    """
+    if request.path == '/':
+        return 'landing'
+    if request.path == '/home':
+        return 'dashboard'
+    return 'page'
+
+
+def layout(request):
+    """
+    what the cached fragments of base.html are keyed by
+    """
+    return {
+        'nav_variant': nav_variant(request),
+        'release': current_release(),
+        'fragment_timeout': settings.TEMPLATE_FRAGMENT_TIMEOUT,
+    }
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from registration.benchmark import (
+    BenchRequest, PeakThreads, benchmark_database, call_wsgi, run_asgi, run_wsgi, summarize,
+)
+
+User = get_user_model()
+
+USERNAME = 'benchmark'
+PASSWORD = 'Bench#12345'
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec, latency and thread usage of the sync views (WSGI) and the async views (ASGI).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=16, help='requests in flight at the same time')
+
+    def scenarios(self, session_id):
+        return {
+            'index': lambda: BenchRequest('GET', '/'),
+            'login page': lambda: BenchRequest('GET', '/login'),
+            'login': lambda: BenchRequest('POST', '/login', {'username': USERNAME, 'password': PASSWORD}),
+            'home': lambda: BenchRequest('GET', '/home', cookies={'sessionid': session_id}),
+        }
+
+    def handle(self, *args, **options):
+        with benchmark_database(), override_settings(DEBUG=False, RATELIMIT_ENABLED=False):
+            User.objects.create_user(username=USERNAME, email='benchmark@example.com', password=PASSWORD)
+            wsgi = get_wsgi_application()
+            asgi = get_asgi_application()
+            _, cookies = call_wsgi(wsgi, BenchRequest('POST', '/login', {'username': USERNAME, 'password': PASSWORD}))
+
+            self.stdout.write(f"{'scenario':<12} {'server':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'threads':>8} {'errors':>7}")
+            for name, make_request in self.scenarios(cookies['sessionid']).items():
+                requests = [make_request() for _ in range(options['requests'])]
+                for server in ('wsgi', 'asgi'):
+                    with PeakThreads() as threads:
+                        if server == 'wsgi':
+                            latencies, statuses, elapsed = run_wsgi(wsgi, requests, options['concurrency'])
+                        else:
+                            with override_settings(ROOT_URLCONF='registration.asgi_urls'):
+                                latencies, statuses, elapsed = run_asgi(asgi, requests, options['concurrency'])
+                    stats = summarize(latencies, elapsed)
+                    errors = sum(status >= 400 for status in statuses)
+                    self.stdout.write(
+                        f"{name:<12} {server:<6} {stats['rps']:>8} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+                        f"{stats['p99_ms']:>8} {threads.peak:>8} {errors:>7}"
+                    )
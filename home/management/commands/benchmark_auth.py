@@ -0,0 +1,168 @@
+import json
+import os
+import platform
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from registration.benchmark import (
+    BenchRequest, PeakMemory, QueryCounter, benchmark_database, compare_to_baseline, median_stats, run_asgi, run_wsgi,
+    summarize,
+)
+
+User = get_user_model()
+
+USERNAME = 'benchmark'
+EMAIL = 'benchmark@example.com'
+PASSWORD = 'Bench#12345'
+SERVERS = ['wsgi', 'asgi']
+
+
+def session_id(user):
+    """
+    the session cookie of a logged in `user`, without hashing the password
+    """
+    client = Client()
+    client.force_login(user)
+    return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+
+def cookies(user):
+    return {settings.SESSION_COOKIE_NAME: session_id(user)}
+
+
+def scenarios(server, count, run=0):
+    """
+    name -> function building the `count` requests of the scenario, called right before it runs
+    (the reset token and the sessions must not be outdated by the previous scenarios),
+    `run` keeps the usernames of the repeated runs apart
+    """
+    user = User.objects.get(username=USERNAME)
+
+    def register():
+        return [
+            BenchRequest('POST', reverse('register'), {
+                'first_name': 'bench', 'last_name': 'mark', 'username': f'{server}{run}-{i}', 'email': f'{server}{run}-{i}@example.com',
+                'password1': PASSWORD, 'password2': PASSWORD,
+            })
+            for i in range(count)
+        ]
+
+    def reset_confirm():
+        path = reverse('password_reset_confirm', kwargs={'uidb64': user.pk, 'token': default_token_generator.make_token(user)})
+        return [BenchRequest('GET', path) for _ in range(count)]
+
+    def home():
+        logged_in = cookies(user)
+        return [BenchRequest('GET', reverse('home'), cookies=logged_in) for _ in range(count)]
+
+    return {
+        'index': lambda: [BenchRequest('GET', reverse('index')) for _ in range(count)],
+        'login page': lambda: [BenchRequest('GET', reverse('login')) for _ in range(count)],
+        'login': lambda: [BenchRequest('POST', reverse('login'), {'username': USERNAME, 'password': PASSWORD}) for _ in range(count)],
+        'register': register,
+        'home': home,
+        # every logout ends its own session
+        'logout': lambda: [BenchRequest('GET', reverse('logout'), cookies=cookies(user)) for _ in range(count)],
+        'reset request': lambda: [BenchRequest('POST', reverse('password_reset_request'), {'email': EMAIL}) for _ in range(count)],
+        'reset confirm': reset_confirm,
+        'reset done': lambda: [BenchRequest('GET', reverse('password_reset_done')) for _ in range(count)],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the auth flows (index, login, register, home, logout, password reset) through the WSGI and ASGI apps: '
+        'throughput, latency percentiles, queries per request and peak memory (medians of --repeat runs), '
+        'compared with a baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='requests per scenario')
+        parser.add_argument('--repeat', type=int, default=3, help='runs of each scenario, the medians are reported')
+        parser.add_argument('--concurrency', type=int, default=8, help='requests in flight at the same time')
+        parser.add_argument('--servers', nargs='+', choices=SERVERS, default=SERVERS)
+        parser.add_argument('--scenarios', nargs='+', default=None, help='run only these scenarios (default: all)')
+        parser.add_argument('--output', help='write the results to this JSON file')
+        parser.add_argument('--baseline', help='JSON results of a previous run, the command fails on a regression')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p50, throughput and memory drift against the baseline')
+        parser.add_argument('--p95-tolerance', type=float, default=1.0, help='allowed p95 drift against the baseline')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be 1 or more')
+        baseline = None
+        if options['baseline']:
+            if not os.path.exists(options['baseline']):
+                raise CommandError(f"{options['baseline']} does not exist, record it with --output first")
+            with open(options['baseline']) as file:
+                baseline = json.load(file)['results']
+
+        results = {}
+        # the query budgets and the sampled profiling would be measured too
+        with benchmark_database(), override_settings(
+            DEBUG=False, RATELIMIT_ENABLED=False, PAGE_CACHE_ENABLED=True, QUERY_BUDGET_ENABLED=False, PROFILING_SAMPLE_RATE=0,
+        ):
+            User.objects.create_user(username=USERNAME, email=EMAIL, password=PASSWORD)
+            apps = {'wsgi': get_wsgi_application(), 'asgi': get_asgi_application()}
+
+            self.stdout.write(
+                f"{'scenario':<14} {'server':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                f"{'queries':>8} {'rss MB':>8} {'errors':>7}"
+            )
+            for server in options['servers']:
+                results[server] = {}
+                runs = [scenarios(server, options['requests'], run) for run in range(options['repeat'])]
+                for name in runs[0]:
+                    if options['scenarios'] and name not in options['scenarios']:
+                        continue
+                    stats = median_stats([self.run_scenario(apps, server, run[name](), options['concurrency']) for run in runs])
+                    results[server][name] = stats
+                    self.stdout.write(
+                        f"{name:<14} {server:<6} {stats['rps']:>8} {stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8} "
+                        f"{stats['queries']:>8} {stats['peak_rss_mb']:>8} {stats['errors']:>7}"
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'environment': {
+                        'python': platform.python_version(),
+                        'cpus': os.cpu_count(),
+                        'database': settings.DATABASES['default']['ENGINE'],
+                        'password_hasher': settings.PASSWORD_HASHERS[0],
+                        'requests': options['requests'],
+                        'concurrency': options['concurrency'],
+                        'repeat': options['repeat'],
+                    },
+                    'results': results,
+                }, file, indent=2)
+            self.stdout.write(f"results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare_to_baseline(results, baseline, options['tolerance'], options['p95_tolerance'])
+            if regressions:
+                raise CommandError('regressions against the baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('no regression against the baseline'))
+
+    def run_scenario(self, apps, server, requests, concurrency):
+        with PeakMemory() as memory, QueryCounter() as queries:
+            if server == 'wsgi':
+                latencies, statuses, elapsed = run_wsgi(apps['wsgi'], requests, concurrency)
+            else:
+                with override_settings(ROOT_URLCONF='registration.asgi_urls'):
+                    latencies, statuses, elapsed = run_asgi(apps['asgi'], requests, concurrency)
+        stats = summarize(latencies, elapsed)
+        stats.update(
+            queries=round(queries.count / len(requests), 2),
+            peak_rss_mb=memory.peak_mb,
+            errors=sum(status >= 400 for status in statuses),
+        )
+        return stats
@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from registration.benchmark import benchmark_database, summarize
+
+User = get_user_model()
+
+
+def simulated_request():
+    """
+    what a request costs on the database side: the signals that close the old connections
+    around one small query, return the latency
+    """
+    start = time.perf_counter()
+    request_started.send(sender=simulated_request)
+    User.objects.filter(pk=1).exists()
+    request_finished.send(sender=simulated_request)
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = 'Compare the per request cost of opening a database connection every request and of persistent connections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='simulated requests per setting')
+        parser.add_argument('--threads', type=int, default=8, help='worker threads')
+        parser.add_argument('--max-age', type=int, default=60, help='CONN_MAX_AGE of the persistent run')
+
+    def handle(self, *args, **options):
+        opened = []
+        connection_created.connect(lambda **kwargs: opened.append(1), weak=False, dispatch_uid='benchmark_connections')
+        database = connections.settings['default']
+        original = database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']
+        try:
+            with benchmark_database():
+                self.stdout.write(f"{'setting':<28} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'connections':>12}")
+                for label, max_age, health_checks in [
+                    ('CONN_MAX_AGE=0', 0, False),
+                    (f"CONN_MAX_AGE={options['max_age']}", options['max_age'], False),
+                    (f"CONN_MAX_AGE={options['max_age']} + checks", options['max_age'], True),
+                ]:
+                    # the worker threads open their connections with these settings
+                    connections.close_all()
+                    database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS'] = max_age, health_checks
+                    opened.clear()
+                    start = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                        latencies = list(executor.map(lambda _: simulated_request(), range(options['requests'])))
+                        # close the connections the threads kept open
+                        list(executor.map(lambda _: connections.close_all(), range(options['threads'])))
+                    stats = summarize(latencies, time.perf_counter() - start)
+                    self.stdout.write(f"{label:<28} {stats['rps']:>9} {stats['p50_ms']:>8} {stats['p99_ms']:>8} {len(opened):>12}")
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark_connections')
+            database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS'] = original
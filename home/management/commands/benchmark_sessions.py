@@ -0,0 +1,69 @@
+import tempfile
+import time
+from importlib import import_module
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from registration.benchmark import BenchRequest, benchmark_database, call_wsgi, percentile, run_wsgi, summarize
+
+User = get_user_model()
+
+USERNAME = 'benchmark'
+PASSWORD = 'Bench#12345'
+STORES = ['db', 'cached_db', 'cache', 'file', 'signed_cookies']
+
+
+def time_session_store(engine, session_key, samples):
+    """
+    milliseconds (p50) to load a session, and to change and save it
+    """
+    store_class = import_module(engine).SessionStore
+    loads, saves = [], []
+    for i in range(samples):
+        start = time.perf_counter()
+        session = store_class(session_key)
+        session.load()
+        loads.append(time.perf_counter() - start)
+
+        session = store_class(session_key)
+        session['benchmark'] = i
+        start = time.perf_counter()
+        session.save()
+        saves.append(time.perf_counter() - start)
+        session_key = session.session_key
+    return round(percentile(sorted(loads), 0.5) * 1000, 3), round(percentile(sorted(saves), 0.5) * 1000, 3)
+
+
+class Command(BaseCommand):
+    help = 'Compare the session engines: session load/save latency and the latency of the authenticated home page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='home page requests per engine')
+        parser.add_argument('--concurrency', type=int, default=4, help='requests in flight at the same time')
+        parser.add_argument('--stores', nargs='+', choices=STORES, default=STORES, help='session stores to compare')
+
+    def handle(self, *args, **options):
+        with benchmark_database(), tempfile.TemporaryDirectory() as session_files:
+            User.objects.create_user(username=USERNAME, email='benchmark@example.com', password=PASSWORD)
+
+            self.stdout.write(f"{'store':<15} {'load ms':>8} {'save ms':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+            for store in options['stores']:
+                engine = f'django.contrib.sessions.backends.{store}'
+                with override_settings(SESSION_ENGINE=engine, SESSION_FILE_PATH=session_files, DEBUG=False, RATELIMIT_ENABLED=False):
+                    # the session middleware picks the engine when the handler is built
+                    wsgi = get_wsgi_application()
+                    _, cookies = call_wsgi(wsgi, BenchRequest('POST', '/login', {'username': USERNAME, 'password': PASSWORD}))
+                    session_id = cookies['sessionid']
+
+                    requests = [BenchRequest('GET', '/home', cookies={'sessionid': session_id}) for _ in range(options['requests'])]
+                    latencies, statuses, elapsed = run_wsgi(wsgi, requests, options['concurrency'])
+                    stats = summarize(latencies, elapsed)
+                    load_ms, save_ms = time_session_store(engine, session_id, options['requests'])
+
+                errors = sum(status != 200 for status in statuses)
+                self.stdout.write(
+                    f"{store:<15} {load_ms:>8} {save_ms:>8} {stats['rps']:>8} {stats['p50_ms']:>8} {stats['p99_ms']:>8} {errors:>7}"
+                )
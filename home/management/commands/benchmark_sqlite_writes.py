@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+from django.utils import timezone
+
+from registration.benchmark import benchmark_database, summarize
+
+User = get_user_model()
+
+ENGINES = {
+    'default': 'django.db.backends.sqlite3',
+    'production': 'registration.db_backends.sqlite3',
+}
+
+
+def register(username):
+    """
+    the writes of one registration: the uniqueness check and the insert in a transaction,
+    the last_login update of login() and the session save
+    """
+    try:
+        with transaction.atomic():
+            user = User.objects.filter(username=username).first() or User.objects.create(
+                username=username, email=f'{username}@example.com', password='!',
+            )
+        User.objects.filter(pk=user.pk).update(last_login=timezone.now())
+        SessionStore().create()
+        return None
+    except OperationalError as error:
+        return str(error)
+    finally:
+        # like the end of a request
+        connection.close()
+
+
+def timed_register(username):
+    start = time.perf_counter()
+    error = register(username)
+    return time.perf_counter() - start, error
+
+
+class Command(BaseCommand):
+    help = 'Register users from many threads at once with the default and the production SQLite backend, and count the lock errors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registrations', type=int, default=500, help='registrations per backend')
+        parser.add_argument('--threads', type=int, default=16, help='threads registering at the same time')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            if connection.vendor != 'sqlite':
+                self.stderr.write('the default database is not SQLite')
+                return
+
+            original_engine = connections.settings['default']['ENGINE']
+            try:
+                self.compare(options)
+            finally:
+                connections.close_all()
+                connections.settings['default']['ENGINE'] = original_engine
+
+    def compare(self, options):
+        self.stdout.write(f"{'backend':<12} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}  first error")
+        for name, engine in ENGINES.items():
+            # the threads open their connections with this engine
+            connections.close_all()
+            connections.settings['default']['ENGINE'] = engine
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                results = list(executor.map(timed_register, (f'{name}{i}' for i in range(options['registrations']))))
+            stats = summarize([latency for latency, _ in results], time.perf_counter() - start)
+            errors = [error for _, error in results if error]
+            self.stdout.write(
+                f"{name:<12} {stats['rps']:>9} {stats['p50_ms']:>8} {stats['p99_ms']:>8} {len(errors):>7}  {errors[0] if errors else '-'}"
+            )
@@ -0,0 +1,81 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import AuthenticationForm
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from accounts.forms import CustomPasswordResetForm, NewUserForm
+from registration.benchmark import percentile
+
+User = get_user_model()
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# (name, template, path, authenticated, context)
+PAGES = [
+    ('index', 'home/index.html', '/', False, {}),
+    ('home', 'home/home.html', '/home', True, {}),
+    ('login', 'accounts/login.html', '/login', False, {'login_form': AuthenticationForm}),
+    ('register', 'accounts/register.html', '/register', False, {'register_form': NewUserForm}),
+    ('reset request', 'password-reset/password_reset_request.html', '/password-reset', False, {'form': CustomPasswordResetForm}),
+    ('reset done', 'password-reset/password_reset_done.html', '/password-reset/done', False, {}),
+]
+
+
+def modes():
+    """
+    (name, settings) of the compared setups: no cache at all, the cached loader, the cached loader and fragments
+    """
+    template = settings.TEMPLATES[0]
+    no_fragments = {**settings.CACHES, 'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    for name, loaders, caches in [
+        ('uncached', LOADERS, no_fragments),
+        ('loader', [('django.template.loaders.cached.Loader', LOADERS)], no_fragments),
+        ('loader+fragments', [('django.template.loaders.cached.Loader', LOADERS)], settings.CACHES),
+    ]:
+        yield name, {
+            'TEMPLATES': [{**template, 'OPTIONS': {**template['OPTIONS'], 'loaders': loaders}}],
+            'CACHES': caches,
+        }
+
+
+def time_render(template, request, context, samples):
+    """
+    milliseconds (p50, p99) to render the template, the first render (parsing, cold cache) is not counted
+    """
+    render_to_string(template, context, request)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        render_to_string(template, context, request)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return round(percentile(timings, 0.5) * 1000, 3), round(percentile(timings, 0.99) * 1000, 3)
+
+
+class Command(BaseCommand):
+    help = 'Compare the render time of the pages without template cache, with the cached loader, and with the cached fragments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=500, help='renders per page and setup')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        # never saved, the pages only need an authenticated user
+        user = User(username='benchmark', email='benchmark@example.com')
+
+        self.stdout.write(f"{'page':<15} {'setup':<17} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, template, path, authenticated, context in PAGES:
+            request = factory.get(path)
+            request.user = user if authenticated else AnonymousUser()
+            for mode, mode_settings in modes():
+                with override_settings(**mode_settings):
+                    p50, p99 = time_render(template, request, context, options['samples'])
+                self.stdout.write(f'{name:<15} {mode:<17} {p50:>8} {p99:>8}')
@@ -0,0 +1,61 @@
+import os
+
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+# static images used as backgrounds by style.css -> widths of their variants
+# (banner.jpg is shown blurred, 1280 pixels are enough)
+IMAGES = {
+    'images/banner.jpg': [640, 1280],
+    'images/banner2.jpg': [640, 1280, 1920],
+}
+FORMATS = {
+    'avif': {'quality': 50, 'speed': 4},
+    'webp': {'quality': 80, 'method': 6},
+}
+
+
+def variant_path(path, width, image_format):
+    """
+    images/banner.jpg -> images/responsive/banner-640.webp
+    """
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, 'responsive', f'{os.path.splitext(filename)[0]}-{width}.{image_format}')
+
+
+class Command(BaseCommand):
+    help = 'Build the WebP and AVIF variants (640 to 1920 pixels wide) of the banner images, next to them in responsive/.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='rebuild every variant, even the up to date ones')
+
+    def handle(self, *args, **options):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise CommandError('Pillow is required to build the images (pip install Pillow)')
+
+        for name, widths in IMAGES.items():
+            path = finders.find(name)
+            if path is None:
+                raise CommandError(f'{name} is not a static file')
+            outdated = [
+                (width, image_format) for width in widths for image_format in FORMATS
+                if options['force'] or not os.path.exists(variant_path(path, width, image_format))
+                or os.path.getmtime(variant_path(path, width, image_format)) < os.path.getmtime(path)
+            ]
+            if not outdated:
+                continue
+
+            with Image.open(path) as image:
+                # decode the jpeg at a reduced scale, a 8000 pixels wide banner is never shown that large
+                image.draft('RGB', (max(widths), max(widths)))
+                image = image.convert('RGB')
+                for width, image_format in outdated:
+                    if width > image.width:
+                        continue
+                    output = variant_path(path, width, image_format)
+                    os.makedirs(os.path.dirname(output), exist_ok=True)
+                    resized = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+                    resized.save(output, image_format.upper(), **FORMATS[image_format])
+                    self.stdout.write(f'{os.path.relpath(output)} ({os.path.getsize(output) // 1024}K)')
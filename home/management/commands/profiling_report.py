@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from registration.profiling import CATEGORIES, collect_stats, reset_stats, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Print the request profiling histograms written to PROFILING_DIR by the workers: '
+        'requests, wall time percentiles and the mean db/template/hashing/mail time of each view.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='print the summary and the raw histograms as JSON')
+        parser.add_argument('--view', help='only this url name (e.g. login)')
+        parser.add_argument('--reset', action='store_true', help='remove the histograms of PROFILING_DIR afterwards')
+
+    def handle(self, *args, **options):
+        stats = collect_stats()
+        if options['view']:
+            stats = {name: view_stats for name, view_stats in stats.items() if name == options['view']}
+
+        if options['json']:
+            self.stdout.write(json.dumps({'summary': summarize(stats), 'histograms': stats}, indent=2))
+        elif not stats:
+            self.stdout.write('no profiled request, set PROFILING_DIR and PROFILING_SAMPLE_RATE or send the X-Profile header')
+        else:
+            self.stdout.write(
+                f"{'view':<28} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'mean ms':>8} "
+                + ' '.join(f'{category:>9}' for category in CATEGORIES) + f" {'queries':>8}"
+            )
+            for row in summarize(stats):
+                self.stdout.write(
+                    f"{row['view']:<28} {row['requests']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['max_ms']:>8} "
+                    f"{row['mean_ms']['wall']:>8} "
+                    + ' '.join(f"{row['mean_ms'][category]:>9}" for category in CATEGORIES) + f" {row['queries']:>8}"
+                )
+
+        if options['reset']:
+            reset_stats()
@@ -0,0 +1,43 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+DATABASE_ENGINES = ('django.contrib.sessions.backends.db', 'django.contrib.sessions.backends.cached_db')
+
+
+def purge_expired_sessions(batch_size, pause=0.0):
+    """
+    delete the expired rows of django_session, `batch_size` rows per transaction so the table
+    is never locked for long, return how many were deleted
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        keys = list(Session.objects.filter(expire_date__lt=now).values_list('pk', flat=True)[:batch_size])
+        if keys:
+            deleted += Session.objects.filter(pk__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+class Command(BaseCommand):
+    help = 'Delete the expired sessions in small batches (the replacement of clearsessions for big session tables).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='sessions deleted per transaction (default: SESSION_PURGE_BATCH_SIZE)')
+        parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between batches, to leave room to the other writers')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DATABASE_ENGINES:
+            # file sessions clean themselves here, cache and cookie sessions just expire
+            import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+            self.stdout.write(f'expired sessions cleared ({settings.SESSION_ENGINE})')
+            return
+        deleted = purge_expired_sessions(options['batch_size'] or settings.SESSION_PURGE_BATCH_SIZE, options['pause'])
+        self.stdout.write(f'deleted: {deleted}')
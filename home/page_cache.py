@@ -0,0 +1,141 @@
+"""
+Full page cache of the pages every anonymous visitor gets the same HTML for:
+the landing page and the 403/404/500 pages.
+
+A cached page is served without running the view or rendering a template,
+with an ETag and a Last-Modified header, and a 304 when the browser already
+has it. The cache is skipped when the page depends on the visitor:
+
+- a logged in user (the navbar has the dashboard and logout links),
+- flashed messages waiting to be shown,
+- a response that sets a cookie, uses the CSRF token or writes to the session
+  (it is rendered, but not stored).
+
+The keys contain the host, the path (or only the view for the error pages,
+so scanning random urls does not fill the cache) and the release.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .context_processors import current_release, nav_variant
+
+_stats = {'hits': 0, 'misses': 0, 'bypassed': 0}
+_stats_lock = threading.Lock()
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def page_cache_stats():
+    """
+    hits, misses and requests that could not use the cache
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _must_bypass(request):
+    if request.method not in ('GET', 'HEAD') or not getattr(settings, 'PAGE_CACHE_ENABLED', True):
+        return True
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return True
+    return len(get_messages(request)) > 0
+
+
+def _cache_key(request, name):
+    key = f'{current_release()}:{request.get_host()}:{name}'
+    return f'page_cache:{hashlib.md5(key.encode()).hexdigest()}'
+
+
+def _cacheable(request, response):
+    session = getattr(request, 'session', None)
+    return not (
+        response.streaming
+        or response.cookies
+        or request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        or (session is not None and session.modified)
+    )
+
+
+def _entry(response):
+    content = response.content
+    return (content, response.status_code, response['Content-Type'], f'"{hashlib.md5(content).hexdigest()}"', time.time())
+
+
+def _response(request, entry):
+    content, status, content_type, etag, last_modified = entry
+    response = HttpResponse(content, status=status, content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if status != 200:
+        return response
+    return get_conditional_response(request, etag=etag, last_modified=int(last_modified), response=response)
+
+
+def cache_anonymous_page(view_func=None, *, per_path=True):
+    """
+    cache the page of the view for the anonymous visitors, `per_path=False` keeps a single
+    page for every path (the error handlers)
+    """
+    if view_func is None:
+        return lambda view_func: cache_anonymous_page(view_func, per_path=per_path)
+
+    view_name = f'{view_func.__module__}.{view_func.__qualname__}'
+
+    def key_for(request):
+        return _cache_key(request, request.get_full_path() if per_path else f'{view_name}:{nav_variant(request)}')
+
+    def store(request, response):
+        if not _cacheable(request, response):
+            return response, None
+        entry = _entry(response)
+        return _response(request, entry), entry
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            # loads the user, the session and the messages out of the event loop
+            if await sync_to_async(_must_bypass)(request):
+                _record('bypassed')
+                return await view_func(request, *args, **kwargs)
+            key = key_for(request)
+            entry = await cache.aget(key)
+            if entry is not None:
+                _record('hits')
+                return _response(request, entry)
+            _record('misses')
+            response, entry = store(request, await view_func(request, *args, **kwargs))
+            if entry is not None:
+                await cache.aset(key, entry, getattr(settings, 'PAGE_CACHE_TIMEOUT', 600))
+            return response
+        return _wrapped_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if _must_bypass(request):
+            _record('bypassed')
+            return view_func(request, *args, **kwargs)
+        key = key_for(request)
+        entry = cache.get(key)
+        if entry is not None:
+            _record('hits')
+            return _response(request, entry)
+        _record('misses')
+        response, entry = store(request, view_func(request, *args, **kwargs))
+        if entry is not None:
+            cache.set(key, entry, getattr(settings, 'PAGE_CACHE_TIMEOUT', 600))
+        return response
+    return _wrapped_view
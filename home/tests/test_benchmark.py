@@ -0,0 +1,73 @@
+import threading
+
+from django.test import SimpleTestCase, TransactionTestCase
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+
+from registration.benchmark import QueryCounter, compare_to_baseline, median_stats
+
+User = get_user_model()
+
+STATS = {'rps': 100.0, 'p50_ms': 5.0, 'p95_ms': 10.0, 'p99_ms': 12.0, 'queries': 3.0, 'peak_rss_mb': 60.0, 'errors': 0}
+
+
+### test the benchmark baseline comparison
+class CompareToBaselineTest(SimpleTestCase):
+    def test_no_regression(self):
+        """
+        test a run within the tolerances passes, the p95 may double
+        """
+        results = {'wsgi': {'login': {**STATS, 'p50_ms': 5.9, 'p95_ms': 19.0, 'rps': 85.0}}}
+
+        self.assertEqual(compare_to_baseline(results, {'wsgi': {'login': STATS}}, tolerance=0.2), [])
+
+    def test_regressions(self):
+        """
+        test a slower, hungrier run with a new query is reported metric by metric
+        """
+        results = {'wsgi': {'login': {
+            **STATS, 'p50_ms': 8.0, 'p95_ms': 25.0, 'rps': 50.0, 'queries': 4.0, 'peak_rss_mb': 90.0, 'errors': 1,
+        }}}
+
+        regressions = compare_to_baseline(results, {'wsgi': {'login': STATS}}, tolerance=0.2)
+
+        self.assertEqual(len(regressions), 6)
+        self.assertIn('wsgi login: queries 3.0 -> 4.0', regressions)
+
+    def test_new_scenario_ignored(self):
+        """
+        test a scenario missing from the baseline is not compared
+        """
+        self.assertEqual(compare_to_baseline({'asgi': {'home': STATS}}, {'wsgi': {'home': STATS}}), [])
+
+    def test_median_of_runs(self):
+        """
+        test the repeated runs are reduced to their medians, one slow run does not move them
+        """
+        runs = [{**STATS, 'p95_ms': 10.0}, {**STATS, 'p95_ms': 90.0, 'rps': 20.0, 'errors': 2}, {**STATS, 'p95_ms': 11.0}]
+
+        stats = median_stats(runs)
+
+        self.assertEqual(stats['p95_ms'], 11.0)
+        self.assertEqual(stats['rps'], 100.0)
+        self.assertEqual(stats['errors'], 2)
+
+
+### test the query counter
+class QueryCounterTest(TransactionTestCase):
+    def test_count_queries_of_every_thread(self):
+        """
+        test the queries of the threads serving the requests are counted
+        """
+        def query():
+            User.objects.exists()
+            connections.close_all()
+
+        with QueryCounter() as queries:
+            User.objects.count()
+            thread = threading.Thread(target=query)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(queries.count, 2)
+        self.assertNotIn(queries, connection.execute_wrappers)
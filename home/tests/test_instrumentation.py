@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from registration.instrumentation import ProcessFiles, recording
+
+User = get_user_model()
+
+
+### test the query recordings
+class RecordingTest(TestCase):
+    def test_nested_recordings(self):
+        """
+        test a query counts in every recording around it, the sql is kept only by the recordings asking for it
+        """
+        with recording() as outer:
+            User.objects.count()
+            with recording(sql=True) as inner:
+                User.objects.exists()
+
+        self.assertEqual(outer.count, 2)
+        self.assertIsNone(outer.queries)
+        self.assertEqual(inner.count, 1)
+        self.assertGreater(outer.seconds, inner.seconds)
+        sql, stack = inner.queries[0]
+        self.assertIn(User._meta.db_table, sql)
+        self.assertIn(__file__, [frame.filename for frame in stack])
+
+    def test_outside_recording(self):
+        """
+        test the queries run after a recording are not counted
+        """
+        with recording() as queries:
+            pass
+        User.objects.count()
+
+        self.assertEqual(queries.count, 0)
+
+
+### test the per process files
+class ProcessFilesTest(TestCase):
+    def setUp(self):
+        self.data = None
+        self.files = ProcessFiles('test', 'TEST_FILES_DIR', 'TEST_FILES_INTERVAL', lambda: self.data)
+
+    def test_own_and_other_files(self):
+        """
+        test the data of this process is written, and only the files of the other processes are read back
+        """
+        with tempfile.TemporaryDirectory() as directory, override_settings(TEST_FILES_DIR=directory):
+            with open(os.path.join(directory, 'test-1.json'), 'w') as file:
+                json.dump({'other': 1}, file)
+            with open(os.path.join(directory, 'test-2.json'), 'w') as file:
+                file.write('not json')
+
+            self.files.flush()
+            self.assertEqual(len(self.files.files()), 2)
+            self.data = json.dumps({'own': 1})
+            self.files.flush()
+
+            self.assertTrue(os.path.exists(os.path.join(directory, f'test-{os.getpid()}.json')))
+            self.assertEqual(list(self.files.others()), [{'other': 1}])
+            self.files.remove()
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_no_directory(self):
+        """
+        test nothing is written without the directory setting
+        """
+        self.data = json.dumps({'own': 1})
+        with override_settings(TEST_FILES_DIR=''):
+            self.files.flush()
+            self.assertEqual(self.files.files(), [])
+            self.assertEqual(list(self.files.others()), [])
@@ -0,0 +1,166 @@
+import json
+import os
+import re
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from accounts.outbox import enqueue_mail, drain_outbox
+from registration import metrics
+
+User = get_user_model()
+
+
+def sample(text, name, **labels):
+    """
+    value of the sample `name{labels}` of a /metrics page, 0 when it is missing
+    """
+    for line in text.splitlines():
+        match = re.fullmatch(r'(\w+)(?:\{(.*)\})? (\S+)', line)
+        if match and match[1] == name and dict(re.findall(r'(\w+)="([^"]*)"', match[2] or '')) == labels:
+            return float(match[3])
+    return 0
+
+
+### test the prometheus metrics
+@override_settings(METRICS_DIR='', METRICS_TOKEN='scraper', RATELIMIT_ENABLED=False)
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='metrics', email='metrics@example.com', password='Metr#12345')
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.client = Client()
+
+    def scrape(self):
+        response = Client().get(reverse('metrics'), headers={'authorization': 'Bearer scraper'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_requests_per_view(self):
+        """
+        test the requests are counted per view, method and status, with their latency and queries
+        """
+        self.client.get(reverse('login'))
+        self.client.post(reverse('login'), {'username': 'metrics', 'password': 'Metr#12345'})
+
+        text = self.scrape()
+        self.assertEqual(sample(text, 'http_requests_total', method='GET', status='200', view='login'), 1)
+        self.assertEqual(sample(text, 'http_requests_total', method='POST', status='302', view='login'), 1)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', view='login'), 2)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', le='+Inf', view='login'), 2)
+        self.assertGreater(sample(text, 'http_request_queries_sum', view='login'), 0)
+
+    def test_logins_and_registrations(self):
+        """
+        test the successful and failed logins and the registrations are counted
+        """
+        self.client.post(reverse('login'), {'username': 'metrics', 'password': 'wrong'})
+        self.client.post(reverse('login'), {'username': 'metrics', 'password': 'Metr#12345'})
+        Client().post(reverse('register'), {
+            'first_name': 'new', 'last_name': 'user', 'username': 'newuser', 'email': 'new@example.com',
+            'password1': 'New#123456', 'password2': 'New#123456',
+        })
+
+        text = self.scrape()
+        self.assertEqual(sample(text, 'auth_logins_total', result='success'), 1)
+        self.assertEqual(sample(text, 'auth_logins_total', result='failure'), 1)
+        self.assertEqual(sample(text, 'auth_registrations_total'), 1)
+
+    def test_session_store_latency(self):
+        """
+        test the loads and saves of the session store are timed
+        """
+        self.client.post(reverse('login'), {'username': 'metrics', 'password': 'Metr#12345'})
+        self.client.get(reverse('home'))
+
+        text = self.scrape()
+        self.assertGreaterEqual(sample(text, 'session_store_duration_seconds_count', operation='save'), 1)
+        self.assertGreaterEqual(sample(text, 'session_store_duration_seconds_count', operation='load'), 1)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_timed_session_store_reads_plain_sessions(self):
+        """
+        test a session saved by the store of the engine (Client.login, the session admin) is read by the timed store
+        """
+        self.client.login(username='metrics', password='Metr#12345')
+
+        self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+
+    def test_outbox(self):
+        """
+        test the queue depth is read when scraped, and the sent emails are timed
+        """
+        enqueue_mail('subject', 'body', 'from@example.com', ['to@example.com'])
+        enqueue_mail('subject', 'body', 'from@example.com', ['to@example.com'])
+        self.assertEqual(sample(self.scrape(), 'outbox_emails', status='pending'), 2)
+
+        drain_outbox()
+
+        text = self.scrape()
+        self.assertEqual(sample(text, 'outbox_emails', status='pending'), 0)
+        self.assertEqual(sample(text, 'outbox_emails', status='sent'), 2)
+        self.assertEqual(sample(text, 'outbox_send_duration_seconds_count', result='sent'), 2)
+        self.assertEqual(sample(text, 'outbox_delivery_delay_seconds_count'), 2)
+
+    def test_processes_added_up(self):
+        """
+        test the metrics written by the other processes are added to the ones of the scraped process
+        """
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            with open(os.path.join(directory, 'metrics-1.json'), 'w') as file:
+                json.dump([['auth_logins_total', [['result', 'success']], 4]], file)
+
+            self.client.post(reverse('login'), {'username': 'metrics', 'password': 'Metr#12345'})
+            metrics.flush()
+
+            self.assertTrue(os.path.exists(os.path.join(directory, f'metrics-{os.getpid()}.json')))
+            self.assertEqual(sample(self.scrape(), 'auth_logins_total', result='success'), 5)
+
+    def test_flushed_in_the_background(self):
+        """
+        test a request does not write the metrics file, the flush thread does, every interval
+        """
+        class Stop(Exception):
+            pass
+
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory, METRICS_FLUSH_INTERVAL=7):
+            self.client.get(reverse('login'))
+            path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+            self.assertFalse(os.path.exists(path))
+
+            with patch('registration.instrumentation.time.sleep', side_effect=[None, Stop]) as sleep, \
+                    self.assertRaises(Stop):
+                metrics.files._flush_every_interval()
+
+            sleep.assert_called_with(7)
+            self.assertTrue(os.path.exists(path))
+
+    def test_token(self):
+        """
+        test the scraper must send the token when one is set
+        """
+        self.assertEqual(Client().get(reverse('metrics')).status_code, 401)
+        response = Client().get(reverse('metrics'), headers={'authorization': 'Bearer scraper'})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_staff_only_without_token(self):
+        """
+        test without a token only staff users read the metrics, unless DEBUG is on
+        """
+        self.assertEqual(Client().get(reverse('metrics')).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+        with override_settings(DEBUG=True):
+            self.assertEqual(Client().get(reverse('metrics')).status_code, 200)
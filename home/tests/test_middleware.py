@@ -0,0 +1,33 @@
+import asyncio
+import threading
+
+from django.http import HttpResponse
+from django.test import TestCase, AsyncClient, override_settings
+from django.urls import path
+
+
+async def current_task_view(request):
+    response = HttpResponse('ok')
+    response.task = asyncio.current_task()
+    response.thread = threading.current_thread()
+    return response
+
+
+urlpatterns = [
+    path('current-task', current_task_view, name='current_task'),
+]
+
+
+### test the middlewares under ASGI
+@override_settings(ROOT_URLCONF=__name__, PROFILING_SAMPLE_RATE=1, QUERY_BUDGET_ENABLED=True, METRICS_ENABLED=True)
+class AsyncMiddlewareChainTest(TestCase):
+    async def test_view_awaited_on_the_event_loop(self):
+        """
+        test every middleware runs async under ASGI: the view is awaited by the request's own task,
+        a sync only middleware would run the rest of the chain in a thread and a new task
+        """
+        response = await AsyncClient().get('/current-task')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(response.thread, threading.current_thread())
+        self.assertIs(response.task, asyncio.current_task())
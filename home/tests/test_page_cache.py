@@ -0,0 +1,129 @@
+from django.test import TestCase, Client, AsyncClient, RequestFactory, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.contrib import messages
+from django.urls import reverse
+
+from home.page_cache import cache_anonymous_page, page_cache_stats
+from home.views import index_view
+
+User = get_user_model()
+
+
+### test the full page cache
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def count(self, outcome, function, *args):
+        before = page_cache_stats()[outcome]
+        result = function(*args)
+        return page_cache_stats()[outcome] - before, result
+
+    def test_anonymous_index_cached(self):
+        """
+        test the second anonymous visit is served from the cache, with the same page and ETag
+        """
+        misses, first = self.count('misses', self.client.get, reverse('index'))
+        hits, second = self.count('hits', self.client.get, reverse('index'))
+
+        self.assertEqual((misses, hits), (1, 1))
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertTrue(second.has_header('Last-Modified'))
+
+    def test_conditional_get(self):
+        """
+        test a browser that already has the page gets a 304
+        """
+        etag = self.client.get(reverse('index'))['ETag']
+
+        response = self.client.get(reverse('index'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_authenticated_user_bypass(self):
+        """
+        test a logged in user never gets the anonymous page
+        """
+        self.client.get(reverse('index'))
+        User.objects.create_user(username='david@123', email='david@example.com', password='Test#12345')
+        self.client.login(username='david@123', password='Test#12345')
+
+        bypassed, response = self.count('bypassed', self.client.get, reverse('index'))
+
+        self.assertEqual(bypassed, 1)
+        self.assertContains(response, 'Logout')
+
+    def test_messages_bypass(self):
+        """
+        test a page with flashed messages is rendered, and its messages shown
+        """
+        self.client.get(reverse('index'))
+        request = RequestFactory().get(reverse('index'))
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        messages.error(request, 'Invalid reset link.')
+
+        bypassed, response = self.count('bypassed', index_view, request)
+
+        self.assertEqual(bypassed, 1)
+        self.assertContains(response, 'Invalid reset link.')
+
+    def test_csrf_page_not_stored(self):
+        """
+        test a page using the CSRF token of the visitor is not stored
+        """
+        @cache_anonymous_page
+        def form_view(request):
+            return HttpResponse(get_token(request))
+
+        request = RequestFactory().get('/form')
+        request.user = AnonymousUser()
+        form_view(request)
+
+        misses, _ = self.count('misses', form_view, request)
+        self.assertEqual(misses, 1)
+
+    def test_error_pages_share_one_entry(self):
+        """
+        test scanning random urls renders the 404 page once
+        """
+        self.client.get('/wp-login.php')
+
+        hits, response = self.count('hits', self.client.get, '/.env')
+
+        self.assertEqual(hits, 1)
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        """
+        test PAGE_CACHE_ENABLED=0 renders every page
+        """
+        bypassed, response = self.count('bypassed', self.client.get, reverse('index'))
+
+        self.assertEqual(bypassed, 1)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ROOT_URLCONF='registration.asgi_urls')
+    async def test_async_index_cached(self):
+        """
+        test the async landing page is cached too
+        """
+        client = AsyncClient()
+        first = await client.get(reverse('index'))
+        before = page_cache_stats()['hits']
+        second = await client.get(reverse('index'))
+
+        self.assertEqual(page_cache_stats()['hits'] - before, 1)
+        self.assertEqual(first.content, second.content)
@@ -0,0 +1,158 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+
+from registration import profiling
+
+User = get_user_model()
+
+
+### test the profiling spans
+class SpanTest(SimpleTestCase):
+    def test_nested_spans_count_once(self):
+        """
+        test the time of a span inside another one counts for the outer category only
+        """
+        profile = profiling.RequestProfile()
+        token = profiling._current.set(profile)
+        try:
+            with profiling.span('template'):
+                with profiling.span('db'):
+                    pass
+        finally:
+            profiling._current.reset(token)
+
+        self.assertGreater(profile.seconds['template'], 0)
+        self.assertEqual(profile.seconds['db'], 0)
+
+    def test_no_profile(self):
+        """
+        test a span outside a profiled request does nothing
+        """
+        with profiling.span('db'):
+            self.assertIsNone(profiling._current.get())
+
+    def test_percentile(self):
+        """
+        test the percentiles are read from the buckets
+        """
+        histogram = profiling._empty_histogram()
+        for ms in [1, 2, 3, 40, 7000]:
+            profiling._observe(histogram, ms)
+
+        self.assertEqual(profiling.percentile_ms(histogram, 5, 50), 5)
+        self.assertEqual(profiling.percentile_ms(histogram, 5, 80), 50)
+        self.assertEqual(profiling.percentile_ms(histogram, 5, 100), 10000)
+
+
+### test the profiling middleware
+@override_settings(PROFILING_TOKEN='secret', PROFILING_SAMPLE_RATE=0, PROFILING_DIR='', RATELIMIT_ENABLED=False)
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='profiled', email='profiled@example.com', password='Prof#12345')
+
+    def setUp(self):
+        profiling.reset_stats()
+        self.addCleanup(profiling.reset_stats)
+        self.client = Client()
+
+    def login(self, **headers):
+        return self.client.post(reverse('login'), {'username': 'profiled', 'password': 'Prof#12345'}, headers=headers)
+
+    def test_profile_with_header(self):
+        """
+        test a login sent with the token is split into db, hashing and other time, under its url name
+        """
+        response = self.login(x_profile='secret')
+
+        stats = profiling.collect_stats()['login']
+        self.assertIn('hashing;dur=', response['Server-Timing'])
+        self.assertEqual(stats['count'], 1)
+        self.assertGreater(stats['queries'], 0)
+        self.assertGreater(stats['db']['sum_ms'], 0)
+        self.assertGreater(stats['hashing']['sum_ms'], 0)
+        self.assertEqual(sum(stats['wall']['buckets']), 1)
+
+    def test_template_time(self):
+        """
+        test the render of the login page counts as template time
+        """
+        self.client.get(reverse('login'), headers={'x-profile': 'secret'})
+
+        self.assertGreater(profiling.collect_stats()['login']['template']['sum_ms'], 0)
+
+    def test_not_profiled(self):
+        """
+        test a request without the token, or with a wrong one, is not profiled
+        """
+        response = self.login(x_profile='wrong')
+
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(profiling.collect_stats(), {})
+
+    @override_settings(PROFILING_TOKEN='', PROFILING_SAMPLE_RATE=1)
+    def test_sampled(self):
+        """
+        test the sampled requests are profiled without the header, their timings are not sent back
+        """
+        response = self.client.get(reverse('login'))
+        self.client.get('/no-such-page')
+
+        self.assertFalse(response.has_header('Server-Timing'))
+        stats = profiling.collect_stats()
+        self.assertEqual(stats['login']['count'], 1)
+        self.assertEqual(stats[profiling.UNRESOLVED]['count'], 1)
+
+    def test_call_trees_and_shared_stats(self):
+        """
+        test the slow requests are saved with cProfile, only the slowest ones are kept,
+        and the histograms of the other processes are merged
+        """
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            PROFILING_DIR=directory, PROFILING_SLOW_MS=0, PROFILING_CALLTREES_KEEP=1,
+        ):
+            with open(os.path.join(directory, 'stats-1.json'), 'w') as file:
+                json.dump({'login': profiling._empty_view_stats() | {'count': 2}}, file)
+
+            self.login(x_profile='secret')
+            self.login(x_profile='secret')
+            profiling.flush_stats()
+
+            call_trees = os.listdir(os.path.join(directory, 'calltrees'))
+            self.assertEqual(len(call_trees), 1)
+            self.assertTrue(call_trees[0].startswith('login-'))
+            self.assertTrue(os.path.exists(os.path.join(directory, f'stats-{os.getpid()}.json')))
+            self.assertEqual(profiling.collect_stats()['login']['count'], 4)
+
+    def test_staff_endpoint(self):
+        """
+        test the histograms are served to the staff only
+        """
+        self.login(x_profile='secret')
+        staff = User.objects.create_user(username='staff', email='staff@example.com', password='Staff#12345', is_staff=True)
+
+        self.assertEqual(Client().get(reverse('profiling')).status_code, 302)
+        client = Client()
+        client.force_login(staff)
+        response = client.get(reverse('profiling'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary'][0]['view'], 'login')
+
+    def test_report_command(self):
+        """
+        test the command prints one row per profiled view
+        """
+        self.login(x_profile='secret')
+        out = StringIO()
+
+        call_command('profiling_report', stdout=out)
+
+        self.assertIn('login', out.getvalue())
@@ -0,0 +1,70 @@
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.urls import reverse
+
+from registration.query_budget import QueryBudgetExceeded, QueryBudgetMiddleware
+
+User = get_user_model()
+
+
+def run_n_plus_one(request):
+    for username in ['a', 'b', 'c', 'd']:
+        User.objects.filter(username=username).exists()
+    return HttpResponse()
+
+
+### test the query budgets
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True, RATELIMIT_ENABLED=False)
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='budget', email='budget@example.com', password='Budg#12345')
+
+    def login(self):
+        return Client().post(reverse('login'), {'username': 'budget', 'password': 'Budg#12345'})
+
+    @override_settings(QUERY_BUDGETS={'login': 1})
+    def test_breach_raises(self):
+        """
+        test a request over the budget of the settings (which wins over the decorator) raises, listing its queries
+        """
+        with self.assertLogs('registration.query_budget', 'WARNING'), self.assertRaises(QueryBudgetExceeded) as error:
+            self.login()
+
+        self.assertIn('(view login)', str(error.exception))
+        self.assertIn('its budget is 1', str(error.exception))
+        self.assertIn('django_session', str(error.exception))
+
+    @override_settings(QUERY_BUDGETS={'login': 1}, QUERY_BUDGET_RAISE=False)
+    def test_breach_logged(self):
+        """
+        test without QUERY_BUDGET_RAISE a breach is only logged
+        """
+        with self.assertLogs('registration.query_budget', 'WARNING') as logs:
+            response = self.login()
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('its budget is 1', logs.output[0])
+
+    @override_settings(QUERY_BUDGETS={'login': 1}, QUERY_BUDGET_ENABLED=False)
+    def test_disabled(self):
+        """
+        test nothing is checked when the budgets are disabled (production)
+        """
+        self.assertEqual(self.login().status_code, 302)
+
+    def test_n_plus_one_reported(self):
+        """
+        test a query repeated with other parameters is reported with the stack of the code running it
+        """
+        middleware = QueryBudgetMiddleware(run_n_plus_one)
+
+        with self.assertLogs('registration.query_budget', 'WARNING') as logs:
+            middleware(RequestFactory().get('/'))
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('this query ran 4 times', logs.output[0])
+        self.assertIn('"accounts_customuser"."username" = %s', logs.output[0])
+        self.assertIn('in run_n_plus_one', logs.output[0])
+        self.assertIn('test_query_budget.py', logs.output[0])
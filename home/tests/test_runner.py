@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+from functools import partial
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, tag
+
+from registration.test_runner import SERIAL_TAG, SerialAwareParallelTestSuite, TestRunner
+
+
+def load(case):
+    return unittest.defaultTestLoader.loadTestsFromTestCase(case)
+
+
+### test the test runner
+class TestRunnerTest(SimpleTestCase):
+    # test cases for the runner, nested so that they are not discovered themselves
+    class InProcesses(SimpleTestCase):
+        @tag(SERIAL_TAG)
+        def test_workers(self):
+            pass
+
+        def test_inline(self):
+            pass
+
+    class Inline(SimpleTestCase):
+        def test_inline(self):
+            pass
+
+    def test_tagged_cases_run_in_main_process(self):
+        """
+        test a test case with a test tagged `processes` is kept out of the parallel processes, with its other tests
+        """
+        in_processes, inline = load(self.InProcesses), load(self.Inline)
+
+        suite = SerialAwareParallelTestSuite([in_processes, inline], 2)
+
+        self.assertEqual(suite.subsuites, [inline])
+        self.assertEqual(suite.serial_subsuites, [in_processes])
+        self.assertEqual(list(suite), [inline, in_processes])
+
+    def test_serial_cases_run(self):
+        """
+        test the serial test cases are run, even without a parallel one
+        """
+        result = unittest.TestResult()
+
+        SerialAwareParallelTestSuite([load(self.InProcesses)], 2).run(result)
+
+        self.assertEqual(result.testsRun, 2)
+        self.assertTrue(result.wasSuccessful())
+
+    def test_timings_output(self):
+        """
+        test the run time and the number of tests are written to `--timings-output`
+        """
+        with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull:
+            path = os.path.join(directory, 'timings.json')
+            runner = TestRunner(timings_output=path, verbosity=0)
+            runner.test_runner = partial(unittest.TextTestRunner, stream=devnull)
+            # this test already runs in the test environment, with its databases
+            with patch.object(runner, 'setup_test_environment'), patch.object(runner, 'teardown_test_environment'), \
+                    patch.object(runner, 'build_suite', return_value=load(self.Inline)), \
+                    patch.object(runner, 'run_checks'), patch.object(runner, 'log'):
+                failures = runner.run_tests([])
+
+            with open(path) as file:
+                timings = json.load(file)
+        self.assertEqual(failures, 0)
+        self.assertEqual(timings['tests'], 1)
+        self.assertEqual(timings['failures'], 0)
+        self.assertGreaterEqual(timings['seconds'], 0)
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+User = get_user_model()
+
+
+### test the session engines on the home page
+class SessionEngineTest(TestCase):
+    @classmethod
+    def get_user_data(cls):
+        return {
+            'username': 'david@123',
+            'password': 'Test#12345',
+            'email': 'david@example.com',
+        }
+
+    def setUp(self):
+        User.objects.create_user(**SessionEngineTest.get_user_data())
+
+    def assert_home_query_only_user(self):
+        client = Client()
+        client.login(username=SessionEngineTest.get_user_data()['username'], password=SessionEngineTest.get_user_data()['password'])
+        with self.assertNumQueries(1):
+            response = client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_session_read_from_cache(self):
+        """
+        test the home page only query the user, the session comes from the cache
+        """
+        self.assert_home_query_only_user()
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookies_session(self):
+        """
+        test the signed cookie sessions need no query either
+        """
+        self.assert_home_query_only_user()
+
+
+### test the purge_sessions command
+class PurgeSessionsTest(TestCase):
+    def create_sessions(self, count, expire_date):
+        Session.objects.bulk_create(
+            Session(session_key=f'{expire_date:%s}{i:020}', session_data='', expire_date=expire_date)
+            for i in range(count)
+        )
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_purge_expired_sessions_in_batches(self):
+        """
+        test only the expired sessions are deleted, batch after batch
+        """
+        self.create_sessions(25, timezone.now() - timedelta(days=1))
+        self.create_sessions(5, timezone.now() + timedelta(days=1))
+        out = StringIO()
+
+        with self.assertNumQueries(6):
+            call_command('purge_sessions', batch_size=10, stdout=out)
+
+        self.assertIn('deleted: 25', out.getvalue())
+        self.assertEqual(Session.objects.count(), 5)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_purge_cookie_sessions(self):
+        """
+        test nothing is queried when the sessions are not in the database
+        """
+        out = StringIO()
+
+        with self.assertNumQueries(0):
+            call_command('purge_sessions', stdout=out)
+
+        self.assertIn('signed_cookies', out.getvalue())
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+from django.db import connection
+
+from registration.db_backends.sqlite3.base import DatabaseWrapper
+
+
+### test the production SQLite backend
+class SQLiteProductionBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_dict = {
+            **connection.settings_dict,
+            'NAME': os.path.join(directory.name, 'test.sqlite3'),
+            # a short wait covers opening and closing the WAL, two transactions
+            # writing at the same time would still fail straight away (sqlite does not wait on those)
+            'OPTIONS': {'timeout': 1, 'pragmas': {'busy_timeout': 1000}},
+        }
+
+    def new_connection(self):
+        return DatabaseWrapper(self.settings_dict, alias='production_sqlite')
+
+    def test_pragmas(self):
+        """
+        test every connection use WAL and the tuned pragmas
+        """
+        wrapper = self.new_connection()
+        self.addCleanup(wrapper.close)
+
+        with wrapper.cursor() as cursor:
+            values = {name: cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size')}
+
+        self.assertEqual(values, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 1000, 'cache_size': -20000})
+
+    def test_concurrent_transactions_without_lock_error(self):
+        """
+        test read then write transactions of many threads are serialized instead of failing with "database is locked"
+        """
+        wrapper = self.new_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE registration (name TEXT UNIQUE)')
+        wrapper.close()
+        errors = []
+
+        def register(thread):
+            wrapper = self.new_connection()
+            try:
+                for i in range(20):
+                    wrapper._start_transaction_under_autocommit()
+                    with wrapper.cursor() as cursor:
+                        cursor.execute('SELECT count(*) FROM registration WHERE name = %s', [f'{thread}-{i}'])
+                        cursor.execute('INSERT INTO registration VALUES (%s)', [f'{thread}-{i}'])
+                    wrapper.commit()
+                    with wrapper.cursor() as cursor:
+                        cursor.execute('UPDATE registration SET name = name WHERE name = %s', [f'{thread}-{i}'])
+            except Exception as error:
+                errors.append(error)
+            finally:
+                wrapper.close()
+
+        threads = [threading.Thread(target=register, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        wrapper = self.new_connection()
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            self.assertEqual(cursor.execute('SELECT count(*) FROM registration').fetchone()[0], 160)
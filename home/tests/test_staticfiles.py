@@ -0,0 +1,115 @@
+import os
+import re
+import tempfile
+
+from django.test import SimpleTestCase, AsyncClient, Client, override_settings, tag
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from registration.staticfiles import ParallelCompressedManifestStaticFilesStorage
+from registration.test_runner import SERIAL_TAG
+
+CSS = 'body { color: burlywood; }\n' * 200
+
+
+### test the precompressed static files
+class CompressedStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.storage = ParallelCompressedManifestStaticFilesStorage(location=self.root.name)
+        for name in ['app.css', 'app.js']:
+            self.write(name, CSS)
+        self.write('photo.jpg', CSS)
+
+    def write(self, name, content):
+        with open(os.path.join(self.root.name, name), 'w') as file:
+            file.write(content)
+
+    def compress(self, names):
+        return sorted(compressed for _, compressed in self.storage.compress_files(names))
+
+    @tag(SERIAL_TAG)
+    @override_settings(STATICFILES_COMPRESS_WORKERS=2)
+    def test_compress_in_parallel(self):
+        """
+        test every compressible file gets its brotli, gzip and zstd variants, built by the worker processes
+        """
+        compressed = self.compress(['app.css', 'app.js', 'photo.jpg'])
+
+        self.assertEqual(compressed, ['app.css.br', 'app.css.gz', 'app.css.zst', 'app.js.br', 'app.js.gz', 'app.js.zst'])
+        for name in compressed:
+            self.assertTrue(os.path.exists(os.path.join(self.root.name, name)))
+
+    def test_unchanged_files_skipped(self):
+        """
+        test an incremental run only compresses the files whose content changed
+        """
+        self.compress(['app.css', 'app.js'])
+        self.assertEqual(self.compress(['app.css', 'app.js']), [])
+
+        self.write('app.js', CSS + 'a { color: red; }\n')
+        self.assertEqual(self.compress(['app.css', 'app.js']), ['app.js.br', 'app.js.gz', 'app.js.zst'])
+
+    def test_stale_variants_removed(self):
+        """
+        test the variants of the previous content are removed when the new one is not worth compressing
+        """
+        self.compress(['app.css'])
+        self.write('app.css', 'a{}')
+
+        self.assertEqual(self.compress(['app.css']), [])
+        self.assertFalse(os.path.exists(os.path.join(self.root.name, 'app.css.br')))
+
+    def test_avif_not_compressed(self):
+        """
+        test the AVIF images are not compressed, the variants written before the extension was skipped are removed
+        """
+        self.write('banner.avif', CSS)
+        with override_settings(WHITENOISE_SKIP_COMPRESS_EXTENSIONS=['jpg']):
+            self.assertEqual(self.compress(['banner.avif']), ['banner.avif.br', 'banner.avif.gz', 'banner.avif.zst'])
+
+        self.assertEqual(self.compress(['banner.avif']), [])
+        self.assertEqual(sorted(os.listdir(self.root.name)), ['app.css', 'app.js', 'banner.avif', 'photo.jpg', 'staticfiles.compressed.json'])
+        self.assertNotIn('banner.avif', self.storage.load_compressed_manifest())
+
+
+### test the static files responses
+class StaticFilesResponseTest(SimpleTestCase):
+    def test_best_encoding_and_immutable(self):
+        """
+        test a hashed file is served with the smallest encoding the client accepts, cached forever
+        """
+        url = staticfiles_storage.url('css/style.css')
+
+        response = Client().get(url, HTTP_ACCEPT_ENCODING='gzip, br, zstd')
+        gzip_response = Client().get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(response['Content-Encoding'], ['br', 'zstd'])
+        self.assertEqual(gzip_response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertLess(int(response['Content-Length']), int(gzip_response['Content-Length']))
+
+    async def test_served_under_asgi(self):
+        """
+        test the async middleware serves the same encodings under ASGI
+        """
+        url = staticfiles_storage.url('css/style.css')
+
+        response = await AsyncClient().get(url, headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_responsive_images_exist(self):
+        """
+        test the AVIF/WebP images used by style.css were built (manage.py build_responsive_images)
+        """
+        with open(finders.find('css/style.css')) as file:
+            images = set(re.findall(r"url\('\.\./(images/responsive/[^']+)'\)", file.read()))
+
+        self.assertTrue(images)
+        for image in images:
+            self.assertIsNotNone(finders.find(image), image)
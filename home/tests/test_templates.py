@@ -0,0 +1,72 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.urls import reverse
+
+from home.context_processors import templates_fingerprint
+
+User = get_user_model()
+
+
+### test the template caches
+class TemplateCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def navbar_key(self, variant, authenticated, release=None):
+        return make_template_fragment_key('navbar', [variant, authenticated, release or templates_fingerprint()])
+
+    @override_settings(DEBUG=True)
+    def test_cached_loader(self):
+        """
+        test the templates are parsed once by the cached loader, even with DEBUG
+        """
+        loader = engines['django'].engine.template_loaders[0]
+
+        self.assertIsInstance(loader, CachedLoader)
+        self.client.get(reverse('index'))
+        self.assertIn('home/index.html', {key.split('-')[0] for key in loader.get_template_cache})
+
+    def test_navbar_cached_per_variant_and_authentication(self):
+        """
+        test the navbar is rendered once per variant and authenticated state
+        """
+        response = self.client.get(reverse('index'))
+        self.assertNotContains(response, 'Logout')
+        self.assertIsNotNone(cache.get(self.navbar_key('landing', False)))
+
+        User.objects.create_user(username='david@123', email='david@example.com', password='Test#12345')
+        self.client.login(username='david@123', password='Test#12345')
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Logout')
+        self.assertIsNotNone(cache.get(self.navbar_key('landing', True)))
+
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'custom-navbar')
+        self.assertIsNotNone(cache.get(self.navbar_key('dashboard', True)))
+
+    def test_cached_navbar_reused(self):
+        """
+        test a cached navbar is served without rendering it again
+        """
+        cache.set(self.navbar_key('page', False), '<nav>cached navbar</nav>')
+
+        response = self.client.get(reverse('login'))
+
+        self.assertContains(response, 'cached navbar')
+
+    def test_release_invalidates_fragments(self):
+        """
+        test a new release does not use the fragments cached by the previous one
+        """
+        cache.set(self.navbar_key('page', False), '<nav>previous release</nav>')
+
+        with override_settings(RELEASE='v2'):
+            response = self.client.get(reverse('login'))
+
+        self.assertNotContains(response, 'previous release')
+        self.assertIsNotNone(cache.get(self.navbar_key('page', False, release='v2')))
@@ -1,9 +1,16 @@
 from django.test import TestCase, Client
-from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 
+User = get_user_model()
+
 ### test index page view
 class IndexTest(TestCase):
+    def setUp(self):
+        # an anonymous page cached by a previous test is served without rendering the template
+        cache.clear()
+
     def test_index_view(self):
         client = Client()
         response = client.get(reverse('index'))
@@ -4,9 +4,11 @@ from django.urls import path
 from .views import (
     index_view, 
     home_page_view, 
+    profiling_view,
     )
 
 urlpatterns = [
     path("", index_view, name='index'),
     path('home', home_page_view, name='home'),
+    path('profiling', profiling_view, name='profiling'),
 ]
\ No newline at end of file
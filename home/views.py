@@ -1,7 +1,16 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from registration.profiling import BUCKETS_MS, collect_stats, summarize
+from registration.query_budget import query_budget
+
+from .page_cache import cache_anonymous_page
 
 # Create your views here.
+@query_budget(4)
+@cache_anonymous_page
 def index_view(request):
     """
     landing page when user navigates into the website
@@ -11,6 +20,7 @@ def index_view(request):
     return render(request, template_path)
 
 
+@query_budget(4)
 @login_required
 def home_page_view(request):
     """
@@ -19,18 +29,31 @@ def home_page_view(request):
     return render(request, "home/home.html")
 
 
+@query_budget(2)
+@staff_member_required
+def profiling_view(request):
+    """
+    staff only, the request profiling histograms of every view (see registration/profiling.py)
+    """
+    stats = collect_stats()
+    return JsonResponse({'summary': summarize(stats), 'buckets_ms': BUCKETS_MS, 'histograms': stats})
+
+
+@cache_anonymous_page(per_path=False)
 def custom_permission_denied_403(request, exception):
     """
     a custom permission error handler page for 403 error
     """
     return render(request, 'errors_handler/403.html', status=403)
 
+@cache_anonymous_page(per_path=False)
 def custom_permission_denied_404(request, exception):
     """
     a custom permission error handler page for 404 error
     """
     return render(request, 'errors_handler/404.html', status=404)
 
+@cache_anonymous_page(per_path=False)
 def custom_permission_denied_500(request):
     """
     a custom permission error handler page for 500 error
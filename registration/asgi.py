@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'registration.settings')
+# serve the async versions of the views (see asgi_urls.py)
+os.environ.setdefault('ROOT_URLCONF', 'registration.asgi_urls')
+# the sync parts of the async views run in changing threads, persistent connections would pile up
+os.environ.setdefault('CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -0,0 +1,22 @@
+"""
+URL configuration used under ASGI (see asgi.py).
+
+Same routes and names as urls.py, but the accounts and home routes point to
+the async views, so uvicorn/daphne run them on the event loop instead of
+sending every request through a `sync_to_async` thread.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+from registration.metrics import metrics_view
+
+handler403 = 'home.views.custom_permission_denied_403'
+handler404 = 'home.views.custom_permission_denied_404'
+handler500 = 'home.views.custom_permission_denied_500'
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('', include('home.async_urls')),
+    path('', include('accounts.async_urls')),
+]
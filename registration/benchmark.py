@@ -0,0 +1,350 @@
+"""
+Helpers for the benchmark management commands.
+
+The requests are sent straight to the WSGI and ASGI handlers of the project,
+in process, so the numbers measure django and the application code, not a
+web server or the network.
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# an unmasked CSRF secret, sent as cookie and header so POST requests pass the CSRF check
+CSRF_TOKEN = 'benchmarkcsrftoken0123456789abcd'
+
+
+class BenchRequest:
+    """
+    one request of a benchmark scenario
+    """
+
+    def __init__(self, method, path, data=None, cookies=None):
+        self.method = method
+        self.path = path
+        self.body = urlencode(data or {}).encode()
+        self.cookies = {settings.CSRF_COOKIE_NAME: CSRF_TOKEN, **(cookies or {})}
+
+    @property
+    def cookie_header(self):
+        return '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+
+    def wsgi_environ(self):
+        return {
+            'REQUEST_METHOD': self.method,
+            'PATH_INFO': self.path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(self.body)),
+            'HTTP_COOKIE': self.cookie_header,
+            'HTTP_X_CSRFTOKEN': CSRF_TOKEN,
+            'wsgi.input': BytesIO(self.body),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            'wsgi.version': (1, 0),
+        }
+
+    def asgi_scope(self):
+        return {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': self.method,
+            'scheme': 'http',
+            'path': self.path,
+            'raw_path': self.path.encode(),
+            'root_path': '',
+            'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'content-type', b'application/x-www-form-urlencoded'),
+                (b'content-length', str(len(self.body)).encode()),
+                (b'cookie', self.cookie_header.encode()),
+                (b'x-csrftoken', CSRF_TOKEN.encode()),
+            ],
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+
+
+def call_wsgi(app, request):
+    """
+    send one request to a WSGI application, return the status code and the cookies it set
+    """
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split()[0])
+        response['headers'] = headers
+
+    body = app(request.wsgi_environ(), start_response)
+    try:
+        for _ in body:
+            pass
+    finally:
+        # fires request_finished, like a real server does
+        if hasattr(body, 'close'):
+            body.close()
+    cookies = SimpleCookie()
+    for name, value in response['headers']:
+        if name.lower() == 'set-cookie':
+            cookies.load(value)
+    return response['status'], {name: morsel.value for name, morsel in cookies.items()}
+
+
+async def call_asgi(app, request):
+    """
+    send one request to an ASGI application, return the status code
+    """
+    messages = [{'type': 'http.request', 'body': request.body, 'more_body': False}]
+    disconnected = asyncio.Event()
+    status = {}
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # the client stays connected until the response is sent
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+
+    await app(request.asgi_scope(), receive, send)
+    disconnected.set()
+    return status['code']
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def run_wsgi(app, requests, concurrency):
+    """
+    send the requests from `concurrency` threads, return the latencies, the statuses and the total time
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda request: _timed(call_wsgi, app, request), requests))
+    elapsed = time.perf_counter() - start
+    connections.close_all()
+    return [latency for latency, _ in results], [status for _, (status, _) in results], elapsed
+
+
+def run_asgi(app, requests, concurrency):
+    """
+    send the requests with at most `concurrency` of them in flight on one event loop
+    """
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(request):
+            async with semaphore:
+                start = time.perf_counter()
+                status = await call_asgi(app, request)
+                return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(request) for request in requests))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(main())
+    connections.close_all()
+    return [latency for latency, _ in results], [status for _, status in results], elapsed
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    """
+    throughput and latency percentiles (in milliseconds) of a run
+    """
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def median_stats(runs):
+    """
+    the median of each number of the repeated runs of a scenario, the errors of the worst run
+    """
+    return {
+        key: max(run[key] for run in runs) if key == 'errors' else round(statistics.median(run[key] for run in runs), 2)
+        for key in runs[0]
+    }
+
+
+class PeakThreads:
+    """
+    samples `threading.active_count()` while the block runs
+
+        with PeakThreads() as threads:
+            ...
+        threads.peak
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count() - 1)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+
+def current_rss():
+    """
+    resident memory of the process, in bytes
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        # the peak instead of the current value, ru_maxrss is in kilobytes on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakMemory(PeakThreads):
+    """
+    samples the resident memory of the process while the block runs, `peak_mb`
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            time.sleep(self.interval)
+
+    @property
+    def peak_mb(self):
+        return round(self.peak / 2 ** 20, 1)
+
+
+class QueryCounter:
+    """
+    counts the queries of every thread while the block runs
+
+        with QueryCounter() as queries:
+            ...
+        queries.count
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        # the threads serving the requests open their own connections
+        connection_created.connect(self._install)
+        for connection in connections.all(initialized_only=True):
+            self._install(None, connection)
+        return self
+
+    def __exit__(self, *args):
+        connection_created.disconnect(self._install)
+        for connection in connections.all(initialized_only=True):
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2, p95_tolerance=1.0):
+    """
+    the regressions of `results` against `baseline` (both {server: {scenario: stats}}):
+    slower p50, lower throughput or more memory by more than `tolerance`, a p95 slower by more
+    than `p95_tolerance` (the tail moves a lot from run to run), or more queries or errors
+    """
+    regressions = []
+    for server, scenarios in results.items():
+        for name, stats in scenarios.items():
+            base = baseline.get(server, {}).get(name)
+            if base is None:
+                continue
+            checks = [
+                ('p50_ms', stats['p50_ms'] > base['p50_ms'] * (1 + tolerance)),
+                ('p95_ms', stats['p95_ms'] > base['p95_ms'] * (1 + p95_tolerance)),
+                ('rps', stats['rps'] < base['rps'] * (1 - tolerance)),
+                ('peak_rss_mb', stats['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance)),
+                # a query count is not noisy, half a query more per request is a new query
+                ('queries', stats['queries'] > base['queries'] + 0.5),
+                ('errors', stats['errors'] > base['errors']),
+            ]
+            for metric, regressed in checks:
+                if regressed:
+                    regressions.append(f'{server} {name}: {metric} {base[metric]} -> {stats[metric]}')
+    return regressions
+
+
+@contextmanager
+def benchmark_database():
+    """
+    create a throw away, migrated database for the benchmark and drop it afterwards.
+    sqlite test databases live in memory by default, the benchmark uses a file so that
+    concurrent threads behave like in production
+    """
+    connection = connections['default']
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
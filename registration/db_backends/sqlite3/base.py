@@ -0,0 +1,91 @@
+"""
+SQLite backend for production.
+
+- every connection sets the `PRAGMAS` below (WAL journal, so the readers never wait
+  for a writer), they can be changed with `OPTIONS['pragmas']` in `DATABASES`.
+- the writes of the process go through one writer at a time: a transaction starts with
+  `BEGIN IMMEDIATE` and holds `WRITE_LOCK` until it ends, a write outside of a
+  transaction holds it for the statement. the threads queue on the lock instead of
+  failing with "database is locked", and `busy_timeout` covers the other processes.
+"""
+import re
+import threading
+
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    # 64 MiB of memory mapped reads, 20 MiB of page cache (negative values are KiB)
+    'mmap_size': 2 ** 26,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
+WRITE_LOCK = threading.RLock()
+
+WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.holds_write_lock = False
+        self.execute_wrappers.append(self._serialize_writes)
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **params.pop('pragmas', {})}
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            if name == 'journal_mode' and self.is_in_memory_db():
+                continue
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _serialize_writes(self, execute, sql, params, many, context):
+        if self.holds_write_lock or not WRITE_STATEMENT.match(sql):
+            return execute(sql, params, many, context)
+        with WRITE_LOCK:
+            return execute(sql, params, many, context)
+
+    def _acquire_write_lock(self):
+        WRITE_LOCK.acquire()
+        self.holds_write_lock = True
+
+    def _release_write_lock(self):
+        if self.holds_write_lock:
+            self.holds_write_lock = False
+            WRITE_LOCK.release()
+
+    def _start_transaction_under_autocommit(self):
+        # take the write lock of sqlite now, instead of failing to upgrade a read lock later
+        self._acquire_write_lock()
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._release_write_lock()
@@ -0,0 +1,193 @@
+"""
+What the metrics, the profiling and the query budgets share.
+
+- `recording()` records the queries run in a block (a request): their number,
+  their time and, for the query budgets, their sql and the stack that ran them.
+  One execute wrapper on every connection feeds every recording in progress,
+  the middlewares nest theirs.
+- `ProcessFiles` keeps the data of each process in `<directory>/<prefix>-<pid>.json`,
+  written by a background thread every interval (and at exit), so that any
+  process can add up the data of all of them (gunicorn workers, `send_queued_mail`).
+
+This module must not import models, `accounts.hashing` imports `registration.profiling`.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import re
+import sysconfig
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_recorders = contextvars.ContextVar('query_recorders', default=())
+_installed = False
+# frames of the standard library and the installed packages (django) are left out of the recorded stacks
+_LIBRARY_PATHS = tuple({sysconfig.get_paths()[name] for name in ['stdlib', 'platstdlib', 'purelib', 'platlib']})
+
+
+class QueryRecorder:
+    """
+    the queries run in a `recording()` block: their number, their seconds and,
+    with `sql`, the list of their (sql, stack)
+    """
+
+    def __init__(self, sql=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = [] if sql else None
+
+
+def app_stack():
+    """
+    the frames of the project code that led to the query, innermost last
+    """
+    return [
+        frame for frame in traceback.extract_stack()
+        if frame.filename != __file__ and not frame.filename.startswith(_LIBRARY_PATHS)
+    ]
+
+
+def _record(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    stack = app_stack() if any(recorder.queries is not None for recorder in recorders) else None
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - start
+        for recorder in recorders:
+            recorder.count += 1
+            recorder.seconds += seconds
+            if recorder.queries is not None:
+                recorder.queries.append((sql, stack))
+
+
+def install(connection, **kwargs):
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+connection_created.connect(install)
+
+
+@contextmanager
+def recording(sql=False):
+    """
+    record the queries run in the block, in the recordings around it too
+    """
+    global _installed
+    if not _installed:
+        # the connections opened before this module was imported did not send it connection_created
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        _installed = True
+    recorder = QueryRecorder(sql)
+    token = _recorders.set((*_recorders.get(), recorder))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+class ProcessFiles:
+    """
+    the data of this process in `<directory setting>/<prefix>-<pid>.json`, rewritten with `dump()`
+    (its JSON, None when there is nothing to write) every `<interval setting>` seconds by a thread started on
+    the first `start()`, and at exit. `others()` reads the files of the other processes
+    """
+
+    def __init__(self, prefix, directory_setting, interval_setting, dump):
+        self.prefix = prefix
+        self.directory_setting = directory_setting
+        self.interval_setting = interval_setting
+        self.dump = dump
+        self.started = False
+        self.lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._forget_thread)
+        atexit.register(self.flush)
+
+    def directory(self):
+        # atexit also runs in the processes which never loaded the settings (the hashing workers)
+        return getattr(settings, self.directory_setting, '') if settings.configured else ''
+
+    def own_file(self):
+        return f'{self.prefix}-{os.getpid()}.json'
+
+    def files(self):
+        directory = self.directory()
+        if not directory or not os.path.isdir(directory):
+            return []
+        pattern = re.compile(rf'{re.escape(self.prefix)}-\d+\.json')
+        return [os.path.join(directory, name) for name in os.listdir(directory) if pattern.fullmatch(name)]
+
+    def flush(self):
+        """
+        write the data of this process
+        """
+        directory = self.directory()
+        if not directory:
+            return
+        data = self.dump()
+        if data is None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.own_file())
+        with open(f'{path}.tmp', 'w') as file:
+            file.write(data)
+        os.replace(f'{path}.tmp', path)
+
+    def others(self):
+        """
+        the data written by the other processes, the unreadable files are skipped
+        """
+        for path in self.files():
+            if os.path.basename(path) == self.own_file():
+                continue
+            try:
+                with open(path) as file:
+                    yield json.load(file)
+            except (OSError, ValueError):
+                continue
+
+    def remove(self):
+        for path in self.files():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def start(self):
+        """
+        start the thread writing the data of this process, once per process
+        """
+        if self.started:
+            return
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self._flush_every_interval, name=f'{self.prefix}-flush', daemon=True).start()
+
+    def _flush_every_interval(self):
+        while True:
+            time.sleep(max(getattr(settings, self.interval_setting), 1))
+            try:
+                self.flush()
+            except OSError:
+                logger.exception('could not write %s to %s', self.own_file(), self.directory())
+
+    def _forget_thread(self):
+        # the thread of the parent is not copied into a forked process (gunicorn workers)
+        self.started = False
@@ -0,0 +1,287 @@
+"""
+Prometheus metrics, served at `/metrics` in the text exposition format.
+
+- `http_requests_total`, `http_request_duration_seconds` and `http_request_queries`
+  per view (url name), from `MetricsMiddleware`,
+- `auth_logins_total` (by result) and `auth_registrations_total`, from the accounts views,
+- `outbox_emails` (the queue depth by status, counted when scraped),
+  `outbox_send_duration_seconds` and `outbox_delivery_delay_seconds`, from `drain_outbox`,
+- `session_store_duration_seconds` (load and save), from `TimedSessionMiddleware`.
+
+Each process adds to its own counters in memory (one short lock per update,
+no I/O on the request path) and a background thread writes them to
+`METRICS_DIR/metrics-<pid>.json` every `METRICS_FLUSH_INTERVAL` seconds
+(`registration.instrumentation.ProcessFiles`). `/metrics` adds up the files
+of every process, so any gunicorn worker answers for all of them and the
+`send_queued_mail` worker is included. Without `METRICS_DIR` it only shows
+the process that answers.
+"""
+import json
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from registration.instrumentation import ProcessFiles, recording
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERY_BUCKETS = [0, 1, 2, 3, 5, 8, 13, 21, 50, 100]
+DELAY_BUCKETS = [1, 5, 15, 30, 60, 300, 900, 3600, 21600, 86400]
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+UNRESOLVED = '<unresolved>'
+
+# name -> (type, help, buckets of the histograms)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests served, by view, method and status code.', None),
+    'http_request_duration_seconds': ('histogram', 'Time to answer a request, by view.', LATENCY_BUCKETS),
+    'http_request_queries': ('histogram', 'Database queries run by a request, by view.', QUERY_BUCKETS),
+    'auth_logins_total': ('counter', 'Login attempts, by result (success or failure).', None),
+    'auth_registrations_total': ('counter', 'Users registered through the register view.', None),
+    'outbox_emails': ('gauge', 'Emails in the outbox, by status.', None),
+    'outbox_send_duration_seconds': ('histogram', 'Time to hand one queued email to the mail server, by result.', LATENCY_BUCKETS),
+    'outbox_delivery_delay_seconds': ('histogram', 'Time between queueing and sending an email.', DELAY_BUCKETS),
+    'session_store_duration_seconds': ('histogram', 'Session store latency, by operation (load or save).', LATENCY_BUCKETS),
+}
+
+_values = {}
+_lock = threading.Lock()
+
+
+def _key(name, labels):
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    files.start()
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    files.start()
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        histogram = _values.get(key)
+        if histogram is None:
+            histogram = _values[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(buckets)
+        histogram['buckets'][i] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+
+def _enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def _dump():
+    with _lock:
+        if not _values:
+            return None
+        return json.dumps([[name, list(labels), value] for (name, labels), value in _values.items()])
+
+
+files = ProcessFiles('metrics', 'METRICS_DIR', 'METRICS_FLUSH_INTERVAL', _dump)
+
+
+def flush():
+    """
+    write the metrics of this process to `METRICS_DIR`
+    """
+    files.flush()
+
+
+def _add(into, key, value):
+    if isinstance(value, dict):
+        total = into.setdefault(key, {'buckets': [0] * len(value['buckets']), 'sum': 0.0, 'count': 0})
+        total['buckets'] = [a + b for a, b in zip(total['buckets'], value['buckets'])]
+        total['sum'] += value['sum']
+        total['count'] += value['count']
+    else:
+        into[key] = into.get(key, 0) + value
+
+
+def collect():
+    """
+    (name, labels) -> value or histogram, of this process and of the processes that wrote to `METRICS_DIR`
+    """
+    merged = {}
+    for entries in files.others():
+        for metric, labels, value in entries:
+            if metric in METRICS:
+                _add(merged, (metric, tuple(tuple(label) for label in labels)), value)
+    with _lock:
+        for key, value in _values.items():
+            _add(merged, key, value)
+    return merged
+
+
+def reset():
+    """
+    forget the metrics of this process and remove the files of `METRICS_DIR`
+    """
+    with _lock:
+        _values.clear()
+    files.remove()
+
+
+def outbox_depth():
+    from accounts.models import OutboundEmail
+    from django.db.models import Count
+
+    depth = dict.fromkeys((status for status, _ in OutboundEmail.STATUS_CHOICES), 0)
+    depth.update(OutboundEmail.objects.values_list('status').annotate(Count('pk')).order_by())
+    return depth
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render():
+    """
+    every metric in the Prometheus text format
+    """
+    values = collect()
+    try:
+        depth = outbox_depth()
+    except DatabaseError:
+        # the other metrics are still worth scraping while the database is down
+        depth = {}
+    for status, count in depth.items():
+        values[_key('outbox_emails', {'status': status})] = count
+
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for (metric, labels), value in sorted(values.items()):
+            if metric != name:
+                continue
+            if metric_type != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], value['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", str(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value["sum"])}')
+            lines.append(f'{name}_count{_labels(labels)} {value["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    the metrics for Prometheus, with `METRICS_TOKEN` the scraper sends `Authorization: Bearer <token>`,
+    without it only staff users see them (anyone with DEBUG)
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('missing or wrong metrics token', status=401, content_type='text/plain')
+    if not token and not settings.DEBUG and not request.user.is_staff:
+        return HttpResponse('set METRICS_TOKEN to scrape the metrics', status=403, content_type='text/plain')
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class MetricsMiddleware:
+    """
+    count the requests, their latency and their queries, per view
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _enabled():
+            return self.get_response(request)
+        start = time.perf_counter()
+        with recording() as queries:
+            response = self.get_response(request)
+        return self.observe(request, response, time.perf_counter() - start, queries)
+
+    async def __acall__(self, request):
+        if not _enabled():
+            return await self.get_response(request)
+        start = time.perf_counter()
+        with recording() as queries:
+            response = await self.get_response(request)
+        return self.observe(request, response, time.perf_counter() - start, queries)
+
+    def observe(self, request, response, duration, queries):
+        view = request.resolver_match.view_name if request.resolver_match else UNRESOLVED
+        method = request.method if request.method in METHODS else 'other'
+        inc('http_requests_total', view=view, method=method, status=response.status_code)
+        observe('http_request_duration_seconds', duration, view=view)
+        observe('http_request_queries', queries.count, view=view)
+        return response
+
+
+def timed_session_store(store_class):
+    """
+    subclass of the `SessionStore` of the session engine, timing its loads and saves
+    """
+
+    class TimedSessionStore(store_class):
+
+        @property
+        def key_salt(self):
+            # the salt of the timed store's base class, so the two read each other's signed sessions
+            return f'django.contrib.sessions.{store_class.__qualname__}'
+
+        def load(self):
+            start = time.perf_counter()
+            try:
+                return super().load()
+            finally:
+                observe('session_store_duration_seconds', time.perf_counter() - start, operation='load')
+
+        def save(self, must_create=False):
+            start = time.perf_counter()
+            try:
+                return super().save(must_create)
+            finally:
+                observe('session_store_duration_seconds', time.perf_counter() - start, operation='save')
+
+    TimedSessionStore.__qualname__ = TimedSessionStore.__name__ = f'Timed{store_class.__name__}'
+    return TimedSessionStore
+
+
+class TimedSessionMiddleware(SessionMiddleware):
+    """
+    django's session middleware, the session store latency goes to `session_store_duration_seconds`
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if _enabled():
+            self.SessionStore = timed_session_store(self.SessionStore)
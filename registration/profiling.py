@@ -0,0 +1,343 @@
+"""
+Opt-in request profiling.
+
+`ProfilingMiddleware` profiles a request when it carries the header
+`X-Profile: <PROFILING_TOKEN>`, or when it is picked by `PROFILING_SAMPLE_RATE`
+(0.01 profiles one request in a hundred). Only the requests with the token get
+the parts back in a `Server-Timing` header. The wall time of a profiled request
+is split into:
+
+- `db`: the queries (`registration.instrumentation.recording()`),
+- `template`: the renders of `ProfiledDjangoTemplates`, the template backend,
+- `hashing`: the password hashes of `accounts.hashing`,
+- `mail`: queueing or sending emails (`accounts.outbox`, the email backend),
+- `other`: the rest (python code of the view, middlewares, ...).
+
+The parts do not overlap, a query run while a template renders counts as
+template time. The times go into per view histograms (by url name), read
+with `collect_stats()`, the staff only `/profiling` endpoint or
+`python manage.py profiling_report`. With `PROFILING_DIR` every process
+writes its histograms there every `PROFILING_FLUSH_INTERVAL` seconds, so
+the report covers all the workers, and the requests slower than
+`PROFILING_SLOW_MS` are recorded with cProfile and saved to
+`PROFILING_DIR/calltrees/` (open them with `python -m pstats` or snakeviz).
+Under ASGI there are no call trees, cProfile only sees the event loop thread.
+
+This module must not import models, `accounts.hashing` imports it.
+"""
+import contextvars
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.utils.crypto import constant_time_compare
+
+from registration.instrumentation import ProcessFiles, QueryRecorder, recording
+
+HEADER = 'X-Profile'
+CATEGORIES = ['db', 'template', 'hashing', 'mail', 'other']
+# upper bounds of the histogram buckets in milliseconds, the last bucket has no bound
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+UNRESOLVED = '<unresolved>'
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """
+    seconds spent in each category by one request, and its queries
+    """
+
+    def __init__(self, queries=None):
+        self.seconds = dict.fromkeys(CATEGORIES, 0.0)
+        self.queries = queries or QueryRecorder()
+        # seconds of the queries run inside a span, they count for the span
+        self.spanned_query_seconds = 0.0
+        self.active = None
+
+    def query_seconds(self):
+        """
+        seconds of the queries run outside any span
+        """
+        return self.queries.seconds - self.spanned_query_seconds
+
+
+@contextmanager
+def span(category):
+    """
+    count the time spent in the block as `category` time of the request being profiled,
+    free when no request is profiled. nested spans count for the outer one
+    """
+    profile = _current.get()
+    if profile is None or profile.active is not None:
+        yield
+        return
+    profile.active = category
+    start = time.perf_counter()
+    query_seconds = profile.queries.seconds
+    try:
+        yield
+    finally:
+        profile.seconds[category] += time.perf_counter() - start
+        profile.spanned_query_seconds += profile.queries.seconds - query_seconds
+        profile.active = None
+
+
+class ProfiledTemplate(Template):
+
+    def render(self, context=None, request=None):
+        with span('template'):
+            return super().render(context, request)
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """
+    the django template backend, its renders count as template time
+    """
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return ProfiledTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def _empty_histogram():
+    return {'sum_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(BUCKETS_MS) + 1)}
+
+
+def _observe(histogram, ms):
+    histogram['sum_ms'] += ms
+    histogram['max_ms'] = max(histogram['max_ms'], ms)
+    for i, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            histogram['buckets'][i] += 1
+            return
+    histogram['buckets'][-1] += 1
+
+
+def _empty_view_stats():
+    return {
+        'count': 0,
+        'queries': 0,
+        'wall': _empty_histogram(),
+        **{category: _empty_histogram() for category in CATEGORIES},
+    }
+
+
+def _merge(into, stats):
+    into['count'] += stats['count']
+    into['queries'] += stats['queries']
+    for name in ['wall', *CATEGORIES]:
+        into[name]['sum_ms'] += stats[name]['sum_ms']
+        into[name]['max_ms'] = max(into[name]['max_ms'], stats[name]['max_ms'])
+        into[name]['buckets'] = [a + b for a, b in zip(into[name]['buckets'], stats[name]['buckets'])]
+
+
+def percentile_ms(histogram, count, q):
+    """
+    upper bound of the bucket holding the `q` percentile (the max for the last bucket)
+    """
+    seen = 0
+    for i, bucket in enumerate(histogram['buckets']):
+        seen += bucket
+        if count and seen >= count * q / 100:
+            return BUCKETS_MS[i] if i < len(BUCKETS_MS) else round(histogram['max_ms'], 1)
+    return 0
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record(view_name, profile, wall):
+    """
+    add a finished request to the histograms of its view
+    """
+    ms = {category: seconds * 1000 for category, seconds in profile.seconds.items()}
+    ms['db'] += profile.query_seconds() * 1000
+    ms['other'] = max(wall * 1000 - sum(ms[category] for category in CATEGORIES if category != 'other'), 0)
+    with _stats_lock:
+        stats = _stats.setdefault(view_name, _empty_view_stats())
+        stats['count'] += 1
+        stats['queries'] += profile.queries.count
+        _observe(stats['wall'], wall * 1000)
+        for category in CATEGORIES:
+            _observe(stats[category], ms[category])
+    files.start()
+    return ms
+
+
+def _dump():
+    with _stats_lock:
+        return json.dumps(_stats) if _stats else None
+
+
+files = ProcessFiles('stats', 'PROFILING_DIR', 'PROFILING_FLUSH_INTERVAL', _dump)
+
+
+def flush_stats():
+    """
+    write the histograms of this process to `PROFILING_DIR`
+    """
+    files.flush()
+
+
+def collect_stats():
+    """
+    view name -> count, total queries and the wall/db/template/hashing/mail/other histograms,
+    of this process and of the processes that wrote to `PROFILING_DIR`
+    """
+    merged = {}
+    for stats in files.others():
+        for view_name, view_stats in stats.items():
+            _merge(merged.setdefault(view_name, _empty_view_stats()), view_stats)
+    with _stats_lock:
+        for view_name, view_stats in _stats.items():
+            _merge(merged.setdefault(view_name, _empty_view_stats()), view_stats)
+    return merged
+
+
+def reset_stats():
+    """
+    forget the histograms of this process and remove the files of `PROFILING_DIR`
+    """
+    with _stats_lock:
+        _stats.clear()
+    files.remove()
+
+
+def summarize(stats):
+    """
+    one row per view: requests, wall p50/p95/max and the mean milliseconds of each category
+    """
+    rows = []
+    for view_name, view_stats in sorted(stats.items(), key=lambda item: -item[1]['wall']['sum_ms']):
+        count = view_stats['count']
+        rows.append({
+            'view': view_name,
+            'requests': count,
+            'p50_ms': percentile_ms(view_stats['wall'], count, 50),
+            'p95_ms': percentile_ms(view_stats['wall'], count, 95),
+            'max_ms': round(view_stats['wall']['max_ms'], 1),
+            'mean_ms': {
+                name: round(view_stats[name]['sum_ms'] / count, 2) for name in ['wall', *CATEGORIES]
+            },
+            'queries': round(view_stats['queries'] / count, 2),
+        })
+    return rows
+
+
+def save_call_tree(profiler, view_name, wall):
+    """
+    write the cProfile stats of a slow request to `PROFILING_DIR/calltrees/`,
+    only the `PROFILING_CALLTREES_KEEP` slowest requests of each view are kept
+    """
+    directory = os.path.join(settings.PROFILING_DIR, 'calltrees')
+    os.makedirs(directory, exist_ok=True)
+    prefix = re.sub(r'[^\w.-]', '_', view_name)
+    path = os.path.join(directory, f'{prefix}-{time.time_ns()}-{round(wall * 1000)}ms.prof')
+    profiler.dump_stats(path)
+
+    pattern = re.compile(rf'{re.escape(prefix)}-\d+-(\d+)ms\.prof')
+    saved = [(int(match[1]), name) for name in os.listdir(directory) if (match := pattern.fullmatch(name))]
+    for _, name in sorted(saved, reverse=True)[getattr(settings, 'PROFILING_CALLTREES_KEEP', 20):]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def has_token(request):
+    token = getattr(settings, 'PROFILING_TOKEN', '')
+    return bool(token) and constant_time_compare(request.headers.get(HEADER, ''), token)
+
+
+def is_sampled():
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+class ProfilingMiddleware:
+    """
+    profile the requests asked with the `X-Profile` header or sampled, see the module docstring.
+    the response of a request with the token gets a `Server-Timing` header with its parts,
+    a sampled one does not (anyone could read the timings)
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        asked = has_token(request)
+        if not asked and not is_sampled():
+            return self.get_response(request)
+
+        profiler = cProfile.Profile() if getattr(settings, 'PROFILING_DIR', '') else None
+        start = time.perf_counter()
+        with self.profiling(profiler) as profile:
+            response = self.get_response(request)
+        return self.finish(request, response, asked, profile, time.perf_counter() - start, profiler)
+
+    async def __acall__(self, request):
+        asked = has_token(request)
+        if not asked and not is_sampled():
+            return await self.get_response(request)
+
+        # no call tree: cProfile sees only the event loop thread, which runs the other requests too
+        start = time.perf_counter()
+        with self.profiling(None) as profile:
+            response = await self.get_response(request)
+        return self.finish(request, response, asked, profile, time.perf_counter() - start, None)
+
+    @contextmanager
+    def profiling(self, profiler):
+        """
+        the `RequestProfile` of the block, run under `profiler` when given
+        """
+        with recording() as queries:
+            profile = RequestProfile(queries)
+            token = _current.set(profile)
+            try:
+                if profiler is not None:
+                    try:
+                        profiler.enable()
+                    except ValueError:
+                        # another profiler is running on this thread
+                        profiler = None
+                yield profile
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                _current.reset(token)
+
+    def finish(self, request, response, asked, profile, wall, profiler):
+        view_name = request.resolver_match.view_name if request.resolver_match else UNRESOLVED
+        ms = record(view_name, profile, wall)
+        if profiler is not None and wall * 1000 >= getattr(settings, 'PROFILING_SLOW_MS', 1000):
+            save_call_tree(profiler, view_name, wall)
+        if asked:
+            response['Server-Timing'] = ', '.join(
+                [f'{category};dur={ms[category]:.1f}' for category in CATEGORIES] + [f'total;dur={wall * 1000:.1f}']
+            )
+        return response
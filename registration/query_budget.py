@@ -0,0 +1,113 @@
+"""
+Per view query budgets.
+
+A view declares how many queries a request to it may run, with the
+`@query_budget(4)` decorator or in the `QUERY_BUDGETS` setting (url name ->
+budget, it wins over the decorator). `QueryBudgetMiddleware` counts the
+queries of every request (the session and the user lookups included) when
+`QUERY_BUDGET_ENABLED` is set (`registration.instrumentation.recording()`),
+by default with `DEBUG` and in the test runs (`registration.test_runner.TestRunner`):
+
+- a request over its budget is logged on the `registration.query_budget`
+  logger, with every query it ran, and raises `QueryBudgetExceeded` with
+  `QUERY_BUDGET_RAISE` (the test runs),
+- a query run `QUERY_BUDGET_DUPLICATES` times or more by one request, with
+  different parameters or not, is reported as a N+1 with the stack of its
+  first run, budget or not.
+"""
+import logging
+import traceback
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from registration.instrumentation import recording
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    raised when a request runs more queries than the budget of its view (with `QUERY_BUDGET_RAISE`)
+    """
+
+
+def query_budget(queries):
+    """
+    decorator setting the number of queries a request to the view may run
+    """
+    def decorator(view_func):
+        view_func.query_budget = queries
+        return view_func
+    return decorator
+
+
+def duplicates(queries, threshold):
+    """
+    (sql, times, stack of the first run) of the queries run `threshold` times or more
+    """
+    counts = Counter(sql for sql, _ in queries)
+    first_stacks = {}
+    for sql, stack in queries:
+        first_stacks.setdefault(sql, stack)
+    return [(sql, times, first_stacks[sql]) for sql, times in counts.most_common() if times >= threshold]
+
+
+def _format_stack(stack):
+    return ''.join(traceback.format_list(stack)) or '  (no project frame)\n'
+
+
+class QueryBudgetMiddleware:
+    """
+    check the queries of every request against the budget of its view, see the module docstring
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            return self.get_response(request)
+        with recording(sql=True) as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder.queries)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            return await self.get_response(request)
+        with recording(sql=True) as recorder:
+            response = await self.get_response(request)
+        self.check(request, recorder.queries)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+    def check(self, request, queries):
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name, getattr(request, 'query_budget', None))
+
+        repeated = duplicates(queries, getattr(settings, 'QUERY_BUDGET_DUPLICATES', 3))
+        for sql, times, stack in repeated:
+            logger.warning(
+                'possible N+1 in %s %s (view %s): this query ran %d times\n  %s\nfirst run from:\n%s',
+                request.method, request.path, view_name, times, sql, _format_stack(stack),
+            )
+
+        if budget is None or len(queries) <= budget:
+            return
+        message = (
+            f'{request.method} {request.path} (view {view_name}) ran {len(queries)} queries, its budget is {budget}:\n'
+            + '\n'.join(f'  {i}. {sql}' for i, (sql, _) in enumerate(queries, 1))
+        )
+        logger.warning(message)
+        if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(message)
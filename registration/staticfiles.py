@@ -0,0 +1,172 @@
+"""
+Precompressed static files, built at collectstatic and served by WhiteNoise.
+
+`ParallelCompressedManifestStaticFilesStorage` extends WhiteNoise's manifest storage:
+
+- every compressible file gets a `.br` (with the `brotli` package), a `.gz` and a
+  `.zst` (with the `zstandard` package, `STATICFILES_ZSTD`) variant, compressed by
+  `STATICFILES_COMPRESS_WORKERS` processes (default: one per core),
+- `staticfiles.compressed.json` keeps the content hash of every compressed file,
+  a file whose hash did not change keeps its variants, so an incremental
+  collectstatic only compresses the files that changed.
+
+`CompressedStaticMiddleware` is WhiteNoise's middleware serving the `.zst` variants
+too. WhiteNoise sends the smallest variant the browser accepts, and the hashed
+files (`style.3f2a1b4c5d6e.css`) with a far future `immutable` Cache-Control.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from wsgiref.headers import Headers
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.compress import Compressor
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import MissingFileError, StaticFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSED_MANIFEST = 'staticfiles.compressed.json'
+# Content-Encoding -> suffix of the variant
+ENCODINGS = {'br': '.br', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+class StaticCompressor(Compressor):
+    """
+    WhiteNoise's compressor (brotli and gzip) plus zstd
+    """
+
+    def __init__(self, use_zstd=True, **kwargs):
+        super().__init__(**kwargs)
+        self.use_zstd = use_zstd and zstandard is not None
+
+    def compress(self, path):
+        yield from super().compress(path)
+        if self.use_zstd:
+            with open(path, 'rb') as file:
+                stat_result = os.fstat(file.fileno())
+                data = file.read()
+            compressed = zstandard.ZstdCompressor(level=19).compress(data)
+            if self.is_compressed_effectively('Zstandard', path, len(data), compressed):
+                yield self.write_data(path, compressed, '.zst', stat_result)
+
+
+def compress_file(path, extensions, use_zstd):
+    """
+    write the variants of `path`, return their suffixes (runs in the worker processes)
+    """
+    # a variant of the previous content would be served if the new one is not worth compressing
+    for suffix in ENCODINGS.values():
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    compressor = StaticCompressor(use_zstd=use_zstd, extensions=extensions, quiet=True)
+    return [compressed_path[len(path):] for compressed_path in compressor.compress(path)]
+
+
+def content_hash(path):
+    with open(path, 'rb') as file:
+        return hashlib.file_digest(file, 'md5').hexdigest()
+
+
+class ParallelCompressedManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def load_compressed_manifest(self):
+        try:
+            with open(self.path(COMPRESSED_MANIFEST)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_compressed_manifest(self, manifest):
+        with open(self.path(COMPRESSED_MANIFEST), 'w') as file:
+            json.dump(manifest, file, indent=0, sort_keys=True)
+
+    def compress_files(self, names):
+        extensions = getattr(settings, 'WHITENOISE_SKIP_COMPRESS_EXTENSIONS', None)
+        use_zstd = getattr(settings, 'STATICFILES_ZSTD', True)
+        compressor = self.create_compressor(extensions=extensions, quiet=True)
+        manifest = self.load_compressed_manifest()
+
+        changed = []
+        for name in sorted(names):
+            if not compressor.should_compress(name):
+                # compressed before its extension was skipped (WHITENOISE_SKIP_COMPRESS_EXTENSIONS)
+                for suffix in manifest.pop(name, {}).get('variants', []):
+                    if os.path.exists(self.path(name) + suffix):
+                        os.remove(self.path(name) + suffix)
+                continue
+            path = self.path(name)
+            digest = content_hash(path)
+            entry = manifest.get(name)
+            if entry and entry['hash'] == digest and all(os.path.exists(path + suffix) for suffix in entry['variants']):
+                continue
+            changed.append((name, path, digest))
+
+        workers = getattr(settings, 'STATICFILES_COMPRESS_WORKERS', 0) or os.cpu_count()
+        paths = [path for _, path, _ in changed]
+        if workers > 1 and len(changed) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(compress_file, paths, repeat(extensions), repeat(use_zstd), chunksize=8))
+        else:
+            results = list(map(compress_file, paths, repeat(extensions), repeat(use_zstd)))
+
+        for (name, _, digest), suffixes in zip(changed, results):
+            manifest[name] = {'hash': digest, 'variants': suffixes}
+        self.save_compressed_manifest(manifest)
+        for (name, _, _), suffixes in zip(changed, results):
+            for suffix in suffixes:
+                yield name, name + suffix
+
+
+class CompressedStaticMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware, with the zstd variants, and async (WhiteNoise 6.6 is sync only,
+    django would run the whole ASGI chain under it in a thread)
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        # same as WhiteNoiseMiddleware.__call__, the files are looked up and opened out of the event loop
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+    def get_static_file(self, path, url, stat_cache=None):
+        # same as WhiteNoise.get_static_file, which only knows the gzip and brotli variants
+        if stat_cache is None and not os.path.exists(path):
+            raise MissingFileError(path)
+        headers = Headers([])
+        self.add_mime_headers(headers, path, url)
+        self.add_cache_headers(headers, path, url)
+        if self.allow_all_origins:
+            headers['Access-Control-Allow-Origin'] = '*'
+        if self.add_headers_function is not None:
+            self.add_headers_function(headers, path, url)
+        return StaticFile(
+            path,
+            headers.items(),
+            stat_cache=stat_cache,
+            encodings={encoding: path + suffix for encoding, suffix in ENCODINGS.items()},
+        )
@@ -0,0 +1,87 @@
+import json
+import time
+import unittest
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner, ParallelTestSuite
+
+# tag of the tests starting their own processes (hashing pool, import and compress workers),
+# the `--parallel` processes are daemons which cannot have children
+SERIAL_TAG = 'processes'
+
+
+def _tags(test):
+    method = getattr(test, test._testMethodName, None)
+    return set(getattr(test, 'tags', ())) | set(getattr(method, 'tags', ()))
+
+
+class SerialAwareParallelTestSuite(ParallelTestSuite):
+    """
+    django's parallel suite, the test cases tagged `processes` run after the others, in the main process
+    """
+
+    def __init__(self, subsuites, *args, **kwargs):
+        self.serial_subsuites = [subsuite for subsuite in subsuites if any(SERIAL_TAG in _tags(test) for test in subsuite)]
+        super().__init__([subsuite for subsuite in subsuites if subsuite not in self.serial_subsuites], *args, **kwargs)
+
+    def run(self, result):
+        if self.subsuites:
+            result = super().run(result)
+        if self.serial_subsuites and not result.shouldStop:
+            # one suite, so that unittest sets up and tears down each test case class once
+            unittest.TestSuite(self.serial_subsuites).run(result)
+        return result
+
+    def __iter__(self):
+        return iter([*self.subsuites, *self.serial_subsuites])
+
+
+class TestRunner(DiscoverRunner):
+    """
+    django's test runner, a view running more queries than its budget fails the test
+    (see registration/query_budget.py), the total run time is printed at the end
+    (and written to `--timings-output` for the CI)
+    """
+    parallel_test_suite = SerialAwareParallelTestSuite
+
+    def __init__(self, timings_output=None, **kwargs):
+        super().__init__(**kwargs)
+        self.timings_output = timings_output
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--timings-output', metavar='PATH',
+            help='Write the run time and the number of tests of the run to this JSON file.',
+        )
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._query_budget_settings = settings.QUERY_BUDGET_ENABLED, settings.QUERY_BUDGET_RAISE
+        settings.QUERY_BUDGET_ENABLED = True
+        settings.QUERY_BUDGET_RAISE = True
+
+    def teardown_test_environment(self, **kwargs):
+        settings.QUERY_BUDGET_ENABLED, settings.QUERY_BUDGET_RAISE = self._query_budget_settings
+        super().teardown_test_environment(**kwargs)
+
+    def run_suite(self, suite, **kwargs):
+        self._result = super().run_suite(suite, **kwargs)
+        return self._result
+
+    def run_tests(self, test_labels, **kwargs):
+        self._result = None
+        start = time.perf_counter()
+        failures = super().run_tests(test_labels, **kwargs)
+        seconds = time.perf_counter() - start
+
+        tests = self._result.testsRun if self._result else 0
+        self.log(f'Total test run time: {seconds:.2f}s ({tests} tests, settings {settings.SETTINGS_MODULE})')
+        if self.timings_output:
+            with open(self.timings_output, 'w') as file:
+                json.dump({
+                    'seconds': round(seconds, 3), 'tests': tests, 'failures': failures,
+                    'settings': settings.SETTINGS_MODULE, 'parallel': self.parallel,
+                }, file, indent=2)
+        return failures
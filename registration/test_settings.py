@@ -0,0 +1,41 @@
+"""
+Settings of the fast test runs:
+
+    python manage.py test --settings=registration.test_settings --parallel
+
+settings.py, minus what makes the tests slow without being what they test:
+
+- MD5 password hashes instead of Argon2 (the hashers tests set their own hashers),
+- an in-memory SQLite database, each `--parallel` process gets its own copy,
+- emails kept in `django.core.mail.outbox`, the cache in process memory (the dummy cache
+  would break the sessions, rate limits and page cache tests).
+
+The variables settings.py requires get test values, so no `.env` is needed.
+"""
+import os
+
+for name, value in {
+    'SECRET_KEY': 'test-secret-key', 'DEBUG': '', 'EMAIL_HOST': 'localhost', 'EMAIL_PORT': '25',
+    'MAILGUN_DOMAIN': 'example.com', 'MAILGUN_API_KEY': 'test', 'EMAIL_HOST_USER': 'test', 'EMAIL_HOST_PASSWORD': 'test',
+}.items():
+    os.environ.setdefault(name, value)
+
+from .settings import *  # noqa: E402,F401,F403
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+    },
+}
@@ -18,12 +18,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls import handler403, handler404, handler500
 
+from registration.metrics import metrics_view
+
 handler403 = 'home.views.custom_permission_denied_403'
 handler404 = 'home.views.custom_permission_denied_404'
 handler500 = 'home.views.custom_permission_denied_500'
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('home.urls')),
     path('', include('accounts.urls')),
 ]